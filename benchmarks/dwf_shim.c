@@ -0,0 +1,94 @@
+/* A stand-in for libdwf used by the benchmarks.  It implements the DWF
+ * functions the SPI, I2C and power supply benchmarks call with the same C
+ * signatures as dwf.h, and returns immediately, so the time measured is the
+ * time spent in Python and ctypes.
+ *
+ *   cc -O2 -shared -fPIC -o libdwf_shim.so dwf_shim.c
+ *
+ * run_benchmarks.py --backend shim builds it automatically.
+ */
+#include <string.h>
+
+typedef int HDWF;
+
+#define SETTER(name, ...) int name(HDWF hdwf, __VA_ARGS__) { return 1; }
+
+/* Device */
+int FDwfGetLastError(int *perror) { *perror = 0; return 1; }
+int FDwfGetLastErrorMsg(char szError[512]) { szError[0] = 0; return 1; }
+int FDwfEnum(int enumfilter, int *pcDevice) { *pcDevice = 1; return 1; }
+int FDwfEnumSN(int idxDevice, char szSN[32]) { strcpy(szSN, "SHIM00000001"); return 1; }
+int FDwfEnumDeviceName(int idxDevice, char szDeviceName[32]) { strcpy(szDeviceName, "Analog Discovery 2"); return 1; }
+int FDwfEnumUserName(int idxDevice, char szUserName[32]) { strcpy(szUserName, "Shim"); return 1; }
+int FDwfEnumDeviceIsOpened(int idxDevice, int *pfIsUsed) { *pfIsUsed = 0; return 1; }
+int FDwfDeviceConfigOpen(int idxDev, int idxCfg, HDWF *phdwf) { *phdwf = 1; return 1; }
+int FDwfDeviceClose(HDWF hdwf) { return 1; }
+SETTER(FDwfDeviceAutoConfigureSet, int fAutoConfigure)
+
+/* AnalogIO: V+ and V- with enable, voltage and current nodes */
+static double analog_io[2][3];
+int FDwfAnalogIOStatus(HDWF hdwf) { return 1; }
+SETTER(FDwfAnalogIOEnableSet, int fMasterEnable)
+int FDwfAnalogIOChannelNodeSet(HDWF hdwf, int idxChannel, int idxNode, double value) { analog_io[idxChannel & 1][idxNode % 3] = value; return 1; }
+int FDwfAnalogIOChannelNodeStatus(HDWF hdwf, int idxChannel, int idxNode, double *pvalue) { *pvalue = analog_io[idxChannel & 1][idxNode % 3]; return 1; }
+int FDwfAnalogIOChannelCount(HDWF hdwf, int *pnChannel) { *pnChannel = 2; return 1; }
+int FDwfAnalogIOChannelName(HDWF hdwf, int idxChannel, char szName[32], char szLabel[16]) { strcpy(szName, idxChannel ? "V-" : "V+"); strcpy(szLabel, idxChannel ? "V-" : "V+"); return 1; }
+int FDwfAnalogIOChannelInfo(HDWF hdwf, int idxChannel, int *pnNodes) { *pnNodes = 3; return 1; }
+int FDwfAnalogIOChannelNodeName(HDWF hdwf, int idxChannel, int idxNode, char szNodeName[32], char szNodeUnits[16]) { strcpy(szNodeName, idxNode == 1 ? "Voltage" : idxNode == 2 ? "Current" : "Enable"); strcpy(szNodeUnits, idxNode == 1 ? "V" : idxNode == 2 ? "A" : ""); return 1; }
+int FDwfAnalogIOChannelNodeInfo(HDWF hdwf, int idxChannel, int idxNode, unsigned char *panalogio) { *panalogio = (unsigned char)(idxNode + 1); return 1; }
+int FDwfAnalogIOChannelNodeStatusInfo(HDWF hdwf, int idxChannel, int idxNode, double *pmin, double *pmax, int *pnSteps) { *pmin = -5; *pmax = 5; *pnSteps = idxNode ? 4096 : 0; return 1; }
+
+/* SPI: MISO loops back MOSI */
+static unsigned int spi_last;
+int FDwfDigitalSpiReset(HDWF hdwf) { return 1; }
+SETTER(FDwfDigitalSpiFrequencySet, double hz)
+SETTER(FDwfDigitalSpiClockSet, int idxChannel)
+SETTER(FDwfDigitalSpiDataSet, int idxDQ, int idxChannel)
+SETTER(FDwfDigitalSpiIdleSet, int idxDQ, int idle)
+SETTER(FDwfDigitalSpiModeSet, int iMode)
+SETTER(FDwfDigitalSpiOrderSet, int fMSBLSB)
+SETTER(FDwfDigitalSpiSelect, int idxChannel, int level)
+#define SPI(suffix, word) \
+int FDwfDigitalSpiWriteRead##suffix(HDWF hdwf, int cDQ, int cBitPerWord, word *rgTX, int cTX, word *rgRX, int cRX) \
+{ for (int i = 0; i < cRX; i++) rgRX[i] = i < cTX ? rgTX[i] : 0; return 1; } \
+int FDwfDigitalSpiRead##suffix(HDWF hdwf, int cDQ, int cBitPerWord, word *rgRX, int cRX) \
+{ for (int i = 0; i < cRX; i++) rgRX[i] = (word)spi_last; return 1; } \
+int FDwfDigitalSpiWrite##suffix(HDWF hdwf, int cDQ, int cBitPerWord, word *rgTX, int cTX) \
+{ if (cTX > 0) spi_last = rgTX[cTX - 1]; return 1; }
+SPI(, unsigned char)
+SPI(16, unsigned short)
+SPI(32, unsigned int)
+int FDwfDigitalSpiWriteOne(HDWF hdwf, int cDQ, int cBits, unsigned int vTX) { spi_last = vTX; return 1; }
+
+/* I2C: a register map device at address 0x18 */
+static unsigned char registers[256];
+static unsigned char pointer;
+int FDwfDigitalI2cReset(HDWF hdwf) { return 1; }
+int FDwfDigitalI2cClear(HDWF hdwf, int *pfFree) { *pfFree = 1; return 1; }
+SETTER(FDwfDigitalI2cRateSet, double hz)
+SETTER(FDwfDigitalI2cSclSet, int idxChannel)
+SETTER(FDwfDigitalI2cSdaSet, int idxChannel)
+SETTER(FDwfDigitalI2cStretchSet, int fEnable)
+SETTER(FDwfDigitalI2cReadNakSet, int fNakLastReadByte)
+int FDwfDigitalI2cWrite(HDWF hdwf, unsigned char adr8bits, unsigned char *rgbTx, int cTx, int *pNak)
+{
+    *pNak = (adr8bits >> 1) == 0x18 ? 0 : 1;
+    if (*pNak == 0 && cTx > 0) {
+        pointer = rgbTx[0];
+        for (int i = 1; i < cTx; i++) registers[pointer++] = rgbTx[i];
+    }
+    return 1;
+}
+int FDwfDigitalI2cWriteOne(HDWF hdwf, unsigned char adr8bits, unsigned char bTx, int *pNak) { return FDwfDigitalI2cWrite(hdwf, adr8bits, &bTx, 1, pNak); }
+int FDwfDigitalI2cRead(HDWF hdwf, unsigned char adr8bits, unsigned char *rgbRx, int cRx, int *pNak)
+{
+    *pNak = (adr8bits >> 1) == 0x18 ? 0 : 1;
+    if (*pNak == 0) for (int i = 0; i < cRx; i++) rgbRx[i] = registers[pointer++];
+    return 1;
+}
+int FDwfDigitalI2cWriteRead(HDWF hdwf, unsigned char adr8bits, unsigned char *rgbTx, int cTx, unsigned char *rgbRx, int cRx, int *pNak)
+{
+    *pNak = (adr8bits >> 1) == 0x18 ? 0 : 1;
+    if (*pNak == 0 && cTx > 0) pointer = rgbTx[0];
+    return FDwfDigitalI2cRead(hdwf, adr8bits, rgbRx, cRx, pNak);
+}
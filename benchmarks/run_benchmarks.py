@@ -0,0 +1,274 @@
+#! /usr/bin/env python3
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+''' Measures the per-call overhead of the wrapper and the sustained streaming
+    throughput, and writes the results as JSON.
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --compare baseline.json
+
+    The SPI, I2C and power supply benchmarks run against a stand-in libdwf
+    (dwf_shim.c, built with the system C compiler) whose functions return
+    immediately, so they measure Python and ctypes marshalling; --backend
+    simulator runs them against the pure Python simulator instead.  The
+    record mode benchmarks always use the simulator.  --compare flags results
+    that got worse than the baseline by more than --threshold and exits with
+    status 1 if there are any.
+'''
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from pyanalogdiscovery2 import PyAnalogDiscovery2, Configuration, Pins, Polarity, ClockPhase, I2cClockRate, AnalogInChannel
+from pyanalogdiscovery2_simulator import SimulatedDwf, I2cRegisterMap
+
+SPI_SIZES = (1, 16, 256, 4096)
+I2C_SIZES = (1, 16, 64)
+
+def build_shim():
+    ''' Compiles dwf_shim.c and returns the path of the shared library.
+    '''
+    source = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dwf_shim.c")
+    library = os.path.join(tempfile.mkdtemp(), "libdwf_shim.so")
+    subprocess.check_call([os.environ.get("CC", "cc"), "-O2", "-shared", "-fPIC", "-o", library, source])
+    return library
+
+def calls_per_second(function, min_time, repeat):
+    ''' Returns the best rate of function calls per second over repeat runs
+        of at least min_time seconds each.
+    '''
+    function()
+    best = 0.0
+    for i in range(repeat):
+        calls = 0
+        batch = 1
+        start = time.perf_counter()
+        elapsed = 0.0
+        while (elapsed < min_time):
+            for j in range(batch):
+                function()
+            calls += batch
+            batch *= 2
+            elapsed = time.perf_counter() - start
+        best = max(best, calls / elapsed)
+    return best
+
+def allocations_per_call(function, calls = 1000):
+    ''' Returns (peak_bytes, retained_blocks) per call measured with
+        tracemalloc.  tracemalloc sees live memory only, so the transient
+        allocations of a call show up in the peak of a single call.
+    '''
+    function()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        function()
+        peak = tracemalloc.get_traced_memory()[1] - before
+        first = tracemalloc.take_snapshot()
+        for i in range(calls):
+            function()
+        second = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    retained = sum(stat.count_diff for stat in second.compare_to(first, "lineno"))
+    return peak, retained / float(calls)
+
+def result(value, unit, higher_is_better, **details):
+    entry = {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+    entry.update(details)
+    return entry
+
+def benchmark_spi(backend, options):
+    results = {}
+    device = PyAnalogDiscovery2(Configuration.SCOPE_8K_WAVEGEN_4K_LOGIC_4K_PATTERNS_1K, backend=backend)
+    try:
+        spi = device.acquire_serial_peripheral_interface()
+        spi.configure_bus(Pins.DIO_0, Pins.DIO_1, Pins.DIO_2, Pins.DIO_3, 1000000.0, Polarity.IDLE_LOW, ClockPhase.FIRST_EDGE, Polarity.IDLE_HIGH)
+        for size in SPI_SIZES:
+            write_data = list(range(256)) * (size // 256) + list(range(size % 256))
+            write_buffer = bytes(write_data)
+            read_buffer = bytearray(size)
+            rate = calls_per_second(lambda: spi.write_read(write_data, size), options.min_time, options.repeat)
+            results["spi.write_read[%d]" % size] = result(rate, "calls/s", True)
+            rate = calls_per_second(lambda: spi.write_read_into(write_buffer, read_buffer), options.min_time, options.repeat)
+            results["spi.write_read_into[%d]" % size] = result(rate, "calls/s", True)
+            peak, retained = allocations_per_call(lambda: spi.write_read(write_data, size))
+            results["spi.write_read[%d].peak_bytes" % size] = result(peak, "bytes/call", False)
+            results["spi.write_read[%d].retained_blocks" % size] = result(retained, "blocks/call", False)
+        transactions = [[0x80 | register, 0] for register in range(64)]
+        rate = calls_per_second(lambda: spi.transfer_many(transactions, [2] * 64), options.min_time, options.repeat)
+        results["spi.transfer_many[64x2]"] = result(rate * 64, "transactions/s", True)
+    finally:
+        device.release()
+    return results
+
+def benchmark_i2c(backend, options):
+    results = {}
+    device = PyAnalogDiscovery2(Configuration.SCOPE_8K_WAVEGEN_4K_LOGIC_4K_PATTERNS_1K, backend=backend)
+    try:
+        i2c = device.acquire_inter_integrated_circuit()
+        i2c.configure_bus(I2cClockRate.FOUR_HUNDRED_KHZ, 0x18, Pins.DIO_0, Pins.DIO_1)
+        for size in I2C_SIZES:
+            rate = calls_per_second(lambda: i2c.write_read([0x00], size), options.min_time, options.repeat)
+            results["i2c.write_read[%d]" % size] = result(rate, "calls/s", True)
+            rate = calls_per_second(lambda: i2c.read_registers(0x00, size), options.min_time, options.repeat)
+            results["i2c.read_registers[%d]" % size] = result(rate, "calls/s", True)
+            peak, retained = allocations_per_call(lambda: i2c.write_read([0x00], size))
+            results["i2c.write_read[%d].peak_bytes" % size] = result(peak, "bytes/call", False)
+            results["i2c.write_read[%d].retained_blocks" % size] = result(retained, "blocks/call", False)
+    finally:
+        device.release()
+    return results
+
+def benchmark_power_supply(backend, options):
+    results = {}
+    device = PyAnalogDiscovery2(Configuration.SCOPE_8K_WAVEGEN_4K_LOGIC_4K_PATTERNS_1K, backend=backend)
+    try:
+        ps = device.acquire_power_supply()
+        ps.configure_positive_voltage_supply_output(3.3, 0.5)
+        ps.enable_all_outputs(True)
+        rate = calls_per_second(ps.read_positive_supply_output, options.min_time, options.repeat)
+        results["power_supply.read_positive_supply_output.latency"] = result(1e6 / rate, "us", False)
+        rate = calls_per_second(ps.read_all, options.min_time, options.repeat)
+        results["power_supply.read_all.latency"] = result(1e6 / rate, "us", False, nodes=len(ps.telemetry_nodes()))
+    finally:
+        device.release()
+    return results
+
+def benchmark_record(options):
+    ''' Sustained record mode throughput against the simulator, which hands
+        out samples_per_status samples on every status poll.
+    '''
+    results = {}
+    samples_per_status = 65536
+    duration_samples = options.record_samples
+
+    device = PyAnalogDiscovery2(Configuration.SCOPE_16K_WAVEGEN_1K_LOGIC_1K_PATTERNS_NONE, backend=SimulatedDwf(samples_per_status=samples_per_status))
+    try:
+        scope = device.acquire_oscilloscope()
+        channels = (AnalogInChannel.CHANNEL_1, AnalogInChannel.CHANNEL_2)
+        sample_rate = 10000000.0
+        scope.configure_record(sample_rate, channels, duration_samples / sample_rate)
+        best = 0.0
+        for i in range(options.repeat):
+            start = time.perf_counter()
+            scope.start()
+            for chunk in scope.read_chunks():
+                pass
+            best = max(best, scope.total_samples / (time.perf_counter() - start))
+        results["oscilloscope.record[2ch]"] = result(best / 1e6, "MS/s", True, samples_per_status=samples_per_status)
+
+        logic = device.acquire_logic_analyzer()
+        logic.configure_record(100000000.0, duration_samples)
+        best = 0.0
+        for i in range(options.repeat):
+            start = time.perf_counter()
+            samples = logic.record(duration_samples)
+            best = max(best, len(samples) / (time.perf_counter() - start))
+        results["logic_analyzer.record"] = result(best / 1e6, "MS/s", True, samples_per_status=samples_per_status)
+    finally:
+        device.release()
+    return results
+
+def compare(baseline, current, threshold):
+    ''' Prints the change of every result present in both runs and returns
+        the names of the results that regressed by more than threshold.
+    '''
+    regressions = []
+    if (baseline.get("backend") != current.get("backend")):
+        print("Warning: comparing %s results against a %s baseline" % (current.get("backend"), baseline.get("backend")))
+    for name in sorted(current["results"]):
+        if (name not in baseline["results"]):
+            continue
+        old = baseline["results"][name]["value"]
+        new = current["results"][name]["value"]
+        if (old == 0):
+            continue
+        change = (new - old) / abs(old)
+        worse = -change if current["results"][name]["higher_is_better"] else change
+        flag = ""
+        if (worse > threshold):
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print("%-50s %14.3f -> %14.3f %-12s %+7.1f%%%s" % (name, old, new, current["results"][name]["unit"], change * 100.0, flag))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="pyanalogdiscovery2 benchmarks")
+    parser.add_argument("--backend", choices=("shim", "simulator"), default="shim", help="DWF stand-in for the per-call benchmarks")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against a previous JSON result")
+    parser.add_argument("--current", metavar="RESULTS", help="with --compare, compare this JSON result instead of running")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative change flagged as a regression (default 0.10)")
+    parser.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per measurement")
+    parser.add_argument("--repeat", type=int, default=3, help="measurements per benchmark, the best is kept")
+    parser.add_argument("--record-samples", type=int, default=4000000, help="samples per record mode run")
+    options = parser.parse_args()
+
+    if (options.current is not None):
+        with open(options.current) as f:
+            current = json.load(f)
+    else:
+        backend = build_shim() if options.backend == "shim" else SimulatedDwf(i2c_slaves={0x18: I2cRegisterMap()})
+        results = {}
+        results.update(benchmark_spi(backend, options))
+        results.update(benchmark_i2c(backend, options))
+        results.update(benchmark_power_supply(backend, options))
+        results.update(benchmark_record(options))
+        current = {
+            "backend": options.backend,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        }
+        if (options.output is not None):
+            with open(options.output, "w") as f:
+                json.dump(current, f, indent=2, sort_keys=True)
+        else:
+            json.dump(current, sys.stdout, indent=2, sort_keys=True)
+            print("")
+
+    if (options.compare is not None):
+        with open(options.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, options.threshold)
+        if (len(regressions) > 0):
+            print("%d regression(s)" % len(regressions))
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
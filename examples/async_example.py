@@ -0,0 +1,65 @@
+#! /usr/bin/env python3
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from pyanalogdiscovery2 import PyAnalogDiscovery2Exception, Configuration, enumerate_devices
+from pyanalogdiscovery2_async import AsyncPyAnalogDiscovery2
+import asyncio
+
+# This examples demonstrates how to drive the Power Supply of every attached
+# Analog Discovery 2 concurrently from an asyncio event loop.
+
+async def measure(device_index, voltage_level, current_limit):
+    analogdiscovery2 = await AsyncPyAnalogDiscovery2.open(Configuration.SCOPE_8K_WAVEGEN_4K_LOGIC_4K_PATTERNS_1K, device_index)
+    try:
+        ps = await analogdiscovery2.acquire_power_supply()
+        await ps.configure_positive_voltage_supply_output(voltage_level, current_limit)
+        await ps.enable_all_outputs(True)
+        await asyncio.sleep(1)
+        return await ps.read_positive_supply_output()
+    finally:
+        await analogdiscovery2.release()
+
+async def main():
+    # Power Supply Configuration
+    voltage_level = 1.0
+    current_limit = 0.5
+
+    # Device indexes of the attached boards that are not in use
+    device_indexes = [device.device_index for device in enumerate_devices() if not device.is_opened]
+
+    results = await asyncio.gather(*[measure(i, voltage_level, current_limit) for i in device_indexes])
+    for i, (voltage_measurement, current_measurement) in zip(device_indexes, results):
+        print("Device [%d]: %f V\t%f A" % (i, voltage_measurement, current_measurement))
+
+try:
+    asyncio.run(main())
+except PyAnalogDiscovery2Exception as e:
+    print("Error/Warning %d occurred\n%s" % (e.status, e))
+
+# Console Output
+# -----------------------
+# Device [0]: 1.000000 V	1.000000 A
+# Device [1]: 1.000000 V	1.000000 A
@@ -0,0 +1,77 @@
+#! /usr/bin/env python3
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from pyanalogdiscovery2 import PyAnalogDiscovery2, PyAnalogDiscovery2Exception, Configuration, AnalogInChannel
+from pyanalogdiscovery2_capture import CaptureReader
+
+# This examples demonstrates how to record the oscilloscope channels of an
+# Analog Discovery 2 to a capture file, and how to look at a time window and
+# an overview of the capture without loading all of it.
+
+try:
+    # Oscilloscope Configuration
+    sample_rate = 1000000.0 # 1MHz
+    voltage_range = 5.0
+    record_length = 2.0 # seconds
+    filename = "capture.pad2"
+
+    analogdiscovery2 = PyAnalogDiscovery2(Configuration.SCOPE_16K_WAVEGEN_1K_LOGIC_1K_PATTERNS_NONE)
+    scope = analogdiscovery2.acquire_oscilloscope()
+
+    scope.configure_channel(AnalogInChannel.CHANNEL_1, voltage_range)
+    scope.configure_record(sample_rate, (AnalogInChannel.CHANNEL_1,), record_length)
+    sample_count = scope.capture(filename)
+
+    print("Wrote %d samples, %d lost" % (sample_count, scope.lost_samples))
+
+    # The file is memory-mapped, only the samples you look at are read from disk
+    with CaptureReader(filename) as capture:
+        print("%s: %.1f seconds at %.0f Hz in %d chunks" % (capture.channels[0], capture.duration(), capture.sample_rate, capture.chunk_count))
+
+        window = capture.to_volts(capture.read(1.0, 1.001))
+        print("1ms window at 1s: %d samples, mean %f V" % (window.shape[1], window.mean()))
+
+        # Min/max per chunk are stored in the file, so the overview reads no samples
+        times, minimum, maximum = capture.overview(points = 4)
+        minimum = capture.to_volts(minimum)
+        maximum = capture.to_volts(maximum)
+        for i in range(len(times)):
+            print("From %.3f s: min %f V, max %f V" % (times[i], minimum[0, i], maximum[0, i]))
+
+except PyAnalogDiscovery2Exception as e:
+    print("Error/Warning %d occurred\n%s" % (e.status, e))
+finally:
+    analogdiscovery2.release()
+
+# Console Output
+# -----------------------
+# Wrote 2000000 samples, 0 lost
+# Channel 1: 2.0 seconds at 1000000 Hz in 31 chunks
+# 1ms window at 1s: 1000 samples, mean 0.000000 V
+# From 0.000 s: min -0.999985 V, max 0.999985 V
+# From 0.459 s: min -0.999985 V, max 0.999985 V
+# From 0.983 s: min -0.999985 V, max 0.999985 V
+# From 1.507 s: min -0.999985 V, max 0.999985 V
@@ -64,7 +64,10 @@ try:
     i2c.configure_bus(clock_rate, address, scl, sda)
 
     # Write and read from the bus
-    data_read = i2c.write_read(data_to_write, data_read_size)
+    transfer = i2c.write_read(data_to_write, data_read_size)
+    if (transfer.nak != 0):
+        print("Device Data NAK at byte %d" % transfer.nak)
+    data_read = transfer.data
 
     print("Received %d bytes:" % len(data_read))
     for i in range(len(data_read)):
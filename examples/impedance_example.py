@@ -0,0 +1,80 @@
+#! /usr/bin/env python3
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from pyanalogdiscovery2 import PyAnalogDiscovery2, PyAnalogDiscovery2Exception, Configuration, ImpedanceMode
+import numpy as np
+
+# This examples demonstrates how to sweep the impedance of a component with the
+# impedance analyzer of a Digilent Analog Discovery 2.
+
+try:
+    # For impedance analyzer wiring (ImpedanceMode.W1_C1_DUT_C2_R_GND):
+    # Waveform generator 1 and oscilloscope channel 1 connect to one end of the DUT
+    # Oscilloscope channel 2 connects to the other end of the DUT and, through the
+    # reference resistor, to GND
+    reference_resistance = 1000.0 # 1k
+    mode = ImpedanceMode.W1_C1_DUT_C2_R_GND
+
+    # Sweep Configuration
+    start_frequency = 100.0 # 100Hz
+    stop_frequency = 1000000.0 # 1MHz
+    steps = 5
+
+    # Set to True to remove the effect of the test fixture.  The open and short
+    # compensation is kept by the device, so it is measured once per configuration.
+    compensate = False
+
+    analogdiscovery2 = PyAnalogDiscovery2(Configuration.SCOPE_8K_WAVEGEN_4K_LOGIC_4K_PATTERNS_1K)
+    impedance_analyzer = analogdiscovery2.acquire_impedance_analyzer()
+
+    impedance_analyzer.configure(reference_resistance, amplitude = 1.0, mode = mode)
+    impedance_analyzer.configure_sweep(start_frequency, stop_frequency, steps)
+
+    if (compensate and not impedance_analyzer.is_compensated()):
+        input("Remove the DUT and press Enter")
+        impedance_analyzer.measure_open_compensation()
+        input("Short the DUT terminals and press Enter")
+        impedance_analyzer.measure_short_compensation()
+        input("Connect the DUT and press Enter")
+
+    result = impedance_analyzer.sweep()
+
+    for i in range(len(result.frequency)):
+        print("%10.1f Hz: |Z| = %9.3f ohms, phase = %7.2f deg, Rs = %9.3f ohms, Xs = %9.3f ohms" %
+              (result.frequency[i], result.impedance[i], np.degrees(result.phase[i]), result.resistance[i], result.reactance[i]))
+
+except PyAnalogDiscovery2Exception as e:
+    print("Error/Warning %d occurred\n%s" % (e.status, e))
+finally:
+    analogdiscovery2.release()
+
+# Console Output
+# -----------------------
+#      100.0 Hz: |Z| =   998.082 ohms, phase =   -3.60 deg, Rs =   996.117 ohms, Xs =   -62.588 ohms
+#     1000.0 Hz: |Z| =   846.763 ohms, phase =  -32.14 deg, Rs =   716.987 ohms, Xs =  -450.487 ohms
+#    10000.0 Hz: |Z| =   157.176 ohms, phase =  -80.94 deg, Rs =    24.752 ohms, Xs =  -155.214 ohms
+#   100000.0 Hz: |Z| =    15.901 ohms, phase =  -88.91 deg, Rs =     0.303 ohms, Xs =   -15.898 ohms
+#  1000000.0 Hz: |Z| =     1.467 ohms, phase =  -87.95 deg, Rs =     0.053 ohms, Xs =    -1.466 ohms
@@ -0,0 +1,56 @@
+#! /usr/bin/env python3
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from pyanalogdiscovery2 import PyAnalogDiscovery2, PyAnalogDiscovery2Exception, Configuration, Pins, TriggerSlope, digital_edges
+
+# This examples demonstrates how to record the 16 digital I/O pins of an
+# Analog Discovery 2 into a memory-mapped file and find the edges on a pin.
+
+try:
+    # Logic Analyzer Configuration
+    sample_rate = 10000000.0 # 10MHz
+    sample_count = 10000000 # 1 second
+    filename = "capture.npy"
+
+    analogdiscovery2 = PyAnalogDiscovery2(Configuration.SCOPE_512_WAVEGEN_256_LOGIC_16K_PATTERNS_16K)
+    logic = analogdiscovery2.acquire_logic_analyzer()
+
+    logic.configure_record(sample_rate, sample_count)
+    samples = logic.record(sample_count, filename)
+
+    rising_edges = digital_edges(samples, Pins.DIO_0, TriggerSlope.RISE)
+    print("Recorded %d samples, %d lost, %d corrupt" % (len(samples), logic.lost_samples, logic.corrupt_samples))
+    print("%s: %d rising edges" % (Pins.DIO_0, len(rising_edges)))
+
+except PyAnalogDiscovery2Exception as e:
+    print("Error/Warning %d occurred\n%s" % (e.status, e))
+finally:
+    analogdiscovery2.release()
+
+# Console Output
+# -----------------------
+# Recorded 10000000 samples, 0 lost, 0 corrupt
+# Dio 0: 1000 rising edges
@@ -0,0 +1,59 @@
+#! /usr/bin/env python3
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+import numpy as np
+from pyanalogdiscovery2 import PyAnalogDiscovery2, PyAnalogDiscovery2Exception, Configuration
+
+# This examples demonstrates how to output precomputed digital test vectors
+# with the pattern generator of an Analog Discovery 2.
+
+try:
+    # Pattern Generator Configuration
+    sample_rate = 1000000.0 # 1MHz
+
+    analogdiscovery2 = PyAnalogDiscovery2(Configuration.SCOPE_512_WAVEGEN_256_LOGIC_16K_PATTERNS_16K)
+    patterns = analogdiscovery2.acquire_pattern_generator()
+
+    # A 4-bit counter on DIO 0 to DIO 3, one row per sample
+    counter = np.arange(4096) % 16
+    vectors = (counter[:, None] >> np.arange(4)) & 1
+
+    # The vectors are packed once, later runs reuse the cached buffer
+    for run in range(3):
+        patterns.play(vectors, sample_rate)
+        patterns.wait()
+
+    print("Packed %d time(s), reused %d time(s)" % (patterns.cache_misses, patterns.cache_hits))
+
+except PyAnalogDiscovery2Exception as e:
+    print("Error/Warning %d occurred\n%s" % (e.status, e))
+finally:
+    analogdiscovery2.release()
+
+# Console Output
+# -----------------------
+# Packed 1 time(s), reused 2 time(s)
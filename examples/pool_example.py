@@ -0,0 +1,54 @@
+#! /usr/bin/env python3
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from pyanalogdiscovery2 import DevicePool, PyAnalogDiscovery2Exception, Configuration, Polarity, ClockPhase, Pins
+
+# This examples demonstrates how to run the same SPI test on every attached
+# Analog Discovery 2 in parallel, each device in its own worker process.
+
+def read_who_am_i(analogdiscovery2):
+    # Runs in the worker process that owns the device, see spi_example.py
+    spi = analogdiscovery2.acquire_serial_peripheral_interface()
+    spi.configure_bus(Pins.DIO_0, Pins.DIO_1, Pins.DIO_2, Pins.DIO_3, 10000000.0, Polarity.IDLE_LOW, ClockPhase.FIRST_EDGE, Polarity.IDLE_HIGH)
+    return spi.write_read([ 0x8F, 0 ], 2)[1]
+
+if __name__ == "__main__":
+    try:
+        with DevicePool(Configuration.SCOPE_8K_WAVEGEN_4K_LOGIC_4K_PATTERNS_1K) as pool:
+            results = pool.run_all(read_who_am_i, return_exceptions=True)
+            for serial_number, result in sorted(results.items()):
+                if (isinstance(result, PyAnalogDiscovery2Exception)):
+                    print("%s: failed\n%s" % (serial_number, result))
+                else:
+                    print("%s: WHO_AM_I = 0x%02x" % (serial_number, result))
+
+    except PyAnalogDiscovery2Exception as e:
+        print("Error/Warning %d occurred\n%s" % (e.status, e))
+
+# Console Output
+# -----------------------
+# SN:210321A1B2C3: WHO_AM_I = 0x6c
+# SN:210321A1B2C4: WHO_AM_I = 0x6c
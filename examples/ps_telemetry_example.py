@@ -0,0 +1,67 @@
+#! /usr/bin/env python3
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+from pyanalogdiscovery2 import PyAnalogDiscovery2, PyAnalogDiscovery2Exception, Configuration
+
+# This examples demonstrates how to profile the current draw of a circuit
+# powered from the V+ Power Supply line of an Analog Discovery 2.
+
+try:
+    # Power Supply Configuration
+    voltage_level = 3.3
+    current_limit = 0.5
+    rate = 50 # samples per second
+
+    analogdiscovery2 = PyAnalogDiscovery2(Configuration.SCOPE_8K_WAVEGEN_4K_LOGIC_4K_PATTERNS_1K)
+    ps = analogdiscovery2.acquire_power_supply()
+
+    ps.configure_positive_voltage_supply_output(voltage_level, current_limit)
+    ps.enable_all_outputs(True)
+
+    # Every sample reads all monitored nodes after a single status request
+    recorder = ps.create_recorder(rate, filename="telemetry.npy")
+    try:
+        recorder.run(duration=10.0)
+    finally:
+        recorder.close()
+
+    for name, statistics in sorted(recorder.statistics(rate).items()):
+        print("%-16s min %f\tmax %f\tmean %f" % (name, statistics["min"], statistics["max"], statistics["mean"]))
+
+except PyAnalogDiscovery2Exception as e:
+    print("Error/Warning %d occurred\n%s" % (e.status, e))
+finally:
+    analogdiscovery2.release()
+
+# Console Output
+# -----------------------
+# USB Current      min 0.312000	max 0.334000	mean 0.321503
+# USB Voltage      min 5.010000	max 5.030000	mean 5.020214
+# V+ Current       min 0.012000	max 0.014000	mean 0.012970
+# V+ Voltage       min 3.298000	max 3.302000	mean 3.300120
+# V- Current       min 0.000000	max 0.000000	mean 0.000000
+# V- Voltage       min 0.000000	max 0.000000	mean 0.000000
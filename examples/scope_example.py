@@ -0,0 +1,62 @@
+#! /usr/bin/env python3
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from pyanalogdiscovery2 import PyAnalogDiscovery2, PyAnalogDiscovery2Exception, Configuration, AnalogInChannel
+
+# This examples demonstrates how to continuously record the oscilloscope
+# channels of an Analog Discovery 2 into a ring buffer.
+
+try:
+    # Oscilloscope Configuration
+    sample_rate = 1000000.0 # 1MHz
+    voltage_range = 5.0
+    record_length = 1.0 # seconds
+
+    analogdiscovery2 = PyAnalogDiscovery2(Configuration.SCOPE_16K_WAVEGEN_1K_LOGIC_1K_PATTERNS_NONE)
+    scope = analogdiscovery2.acquire_oscilloscope()
+
+    scope.configure_channel(AnalogInChannel.CHANNEL_1, voltage_range)
+    scope.configure_record(sample_rate, (AnalogInChannel.CHANNEL_1,), record_length)
+    scope.start()
+
+    # Each chunk is a view into the ring buffer, scale it to volts only when needed
+    for chunk in scope.read_chunks():
+        volts = scope.to_volts(chunk)
+        print("Received %d samples, mean %f V" % (chunk.shape[1], volts.mean()))
+
+    print("Total: %d samples, %d lost, %d corrupt" % (scope.total_samples, scope.lost_samples, scope.corrupt_samples))
+
+except PyAnalogDiscovery2Exception as e:
+    print("Error/Warning %d occurred\n%s" % (e.status, e))
+finally:
+    analogdiscovery2.release()
+
+# Console Output
+# -----------------------
+# Received 1024 samples, mean 0.001831 V
+# Received 2048 samples, mean 0.001754 V
+# ...
+# Total: 1000000 samples, 0 lost, 0 corrupt
@@ -0,0 +1,78 @@
+#! /usr/bin/env python3
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from pyanalogdiscovery2 import PyAnalogDiscovery2, PyAnalogDiscovery2Exception, Configuration, AnalogInChannel, TriggerSlope
+from pyanalogdiscovery2 import SegmentedCapture, segment_rms, segment_peak_to_peak, segment_rise_time
+
+# This examples demonstrates how to capture one oscilloscope segment per
+# trigger on an Analog Discovery 2 and keep only per-segment statistics, here
+# of a 1kHz sine wave.
+
+try:
+    # Oscilloscope Configuration
+    sample_rate = 1000000.0 # 1MHz
+    voltage_range = 5.0
+    samples_per_segment = 1024
+    segment_count = 1000
+
+    # Trigger on the rising edge of channel 1 crossing 0.5V
+    trigger_level = 0.5
+
+    # Keep the raw samples of the segments whose peak-to-peak is out of limits
+    minimum_peak_to_peak = 1.9
+    maximum_peak_to_peak = 2.1
+
+    analogdiscovery2 = PyAnalogDiscovery2(Configuration.SCOPE_16K_WAVEGEN_1K_LOGIC_1K_PATTERNS_NONE)
+    scope = analogdiscovery2.acquire_oscilloscope()
+
+    scope.configure_channel(AnalogInChannel.CHANNEL_1, voltage_range)
+    scope.configure_trigger(AnalogInChannel.CHANNEL_1, trigger_level, TriggerSlope.RISE)
+    scope.configure_segments(sample_rate, samples_per_segment, (AnalogInChannel.CHANNEL_1,))
+
+    def out_of_limits(reductions):
+        peak_to_peak = reductions["peak_to_peak"][:, 0]
+        return (peak_to_peak < minimum_peak_to_peak) | (peak_to_peak > maximum_peak_to_peak)
+
+    capture = SegmentedCapture(scope, [("rms", segment_rms), ("peak_to_peak", segment_peak_to_peak), ("rise_time", segment_rise_time)],
+                               keep_raw = out_of_limits)
+    capture.run(segment_count)
+
+    reductions = capture.reductions()
+    print("Captured %d segments at %.0f segments/s" % (capture.segments, capture.achieved_rate()))
+    print("RMS: mean %f V, peak-to-peak: max %f V, rise time: mean %.1f us" %
+          (reductions["rms"].mean(), reductions["peak_to_peak"].max(), reductions["rise_time"].mean() * 1e6))
+    print("%d segments out of limits" % (len(capture.raw_segments) + capture.raw_segments_dropped))
+
+except PyAnalogDiscovery2Exception as e:
+    print("Error/Warning %d occurred\n%s" % (e.status, e))
+finally:
+    analogdiscovery2.release()
+
+# Console Output
+# -----------------------
+# Captured 1000 segments at 16919 segments/s
+# RMS: mean 0.698803 V, peak-to-peak: max 1.999969 V, rise time: mean 295.2 us
+# 0 segments out of limits
@@ -0,0 +1,72 @@
+#! /usr/bin/env python3
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+from pyanalogdiscovery2 import PyAnalogDiscovery2, PyAnalogDiscovery2Exception, Configuration, Pins, UartParity
+
+# This examples demonstrates how to talk to a UART device using the digital
+# lines on a Digilent Analog Discovery 2.  Received bytes are buffered on a
+# background thread, so nothing is lost between reads.
+
+try:
+    # For UART wiring:
+    # TX output maps to Digital I/O Pin 0 on AnalogDiscovery2 device
+    # RX input maps to Digital I/O Pin 1 on AnalogDiscovery2 device
+    # Connect Pin 0 to Pin 1 to loop the transmitted data back.
+    tx = Pins.DIO_0
+    rx = Pins.DIO_1
+
+    # Channel Configuration
+    baud_rate = 115200
+    data_bits = 8
+    parity = UartParity.NONE
+    stop_bits = 1
+
+    analogdiscovery2 = PyAnalogDiscovery2(Configuration.SCOPE_8K_WAVEGEN_4K_LOGIC_4K_PATTERNS_1K)
+    uart = analogdiscovery2.acquire_uart()
+
+    uart.configure_bus(baud_rate, tx, rx, data_bits, parity, stop_bits)
+    uart.start()
+
+    uart.write(b"Hello UART\n")
+
+    # Wait up to a second for the line to come back
+    line = uart.readline(timeout = 1.0)
+    print("Received %d bytes: %r" % (len(line), line))
+
+    statistics = uart.statistics()
+    print("Overflows: %d, parity errors: %d" % (statistics["overflows"], statistics["parity_errors"]))
+
+    uart.stop()
+
+except PyAnalogDiscovery2Exception as e:
+    print("Error/Warning %d occurred\n%s" % (e.status, e))
+finally:
+    analogdiscovery2.release()
+
+# Console Output
+# -----------------------
+# Received 11 bytes: b'Hello UART\n'
+# Overflows: 0, parity errors: 0
@@ -0,0 +1,64 @@
+#! /usr/bin/env python3
+
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+import numpy as np
+from pyanalogdiscovery2 import PyAnalogDiscovery2, PyAnalogDiscovery2Exception, Configuration, AnalogOutChannel
+
+# This examples demonstrates how to stream a long waveform to the waveform
+# generator of an Analog Discovery 2 without holding it in memory.
+
+def chirp(sample_rate, seconds, chunk_size = 100000):
+    # Generates the waveform one chunk at a time
+    for start in range(0, int(sample_rate * seconds), chunk_size):
+        t = np.arange(start, start + chunk_size) / sample_rate
+        yield np.sin(2 * np.pi * (100.0 + 1000.0 * t) * t)
+
+try:
+    # Waveform Generator Configuration
+    sample_rate = 100000.0 # 100kHz
+    amplitude = 1.0 # volts
+    offset = 0.0 # volts
+
+    analogdiscovery2 = PyAnalogDiscovery2(Configuration.SCOPE_2K_WAVEGEN_16K_LOGIC_NONE_PATTERNS_NONE)
+    wavegen = analogdiscovery2.acquire_waveform_generator()
+
+    wavegen.configure_channel(AnalogOutChannel.CHANNEL_1, amplitude, offset)
+    wavegen.play(chirp(sample_rate, 10.0), sample_rate)
+
+    # Recorded signals can be replayed straight from a memory-mapped file:
+    #   wavegen.play("recording.npy", sample_rate)
+
+    print("Played %d samples, %d lost, %d corrupt" % (wavegen.total_samples, wavegen.lost_samples, wavegen.corrupt_samples))
+
+except PyAnalogDiscovery2Exception as e:
+    print("Error/Warning %d occurred\n%s" % (e.status, e))
+finally:
+    analogdiscovery2.release()
+
+# Console Output
+# -----------------------
+# Played 1000000 samples, 0 lost, 0 corrupt
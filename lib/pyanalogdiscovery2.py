@@ -22,9 +22,31 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-from ctypes import create_string_buffer, c_double, c_uint8, c_int, cdll, byref
+from ctypes import create_string_buffer, c_bool, c_char, c_double, c_uint8, c_int, c_short, c_uint, c_ubyte, c_ulonglong, c_ushort, c_void_p, cdll, byref, cast, string_at, CDLL, _SimpleCData
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, deque, namedtuple
 from enum import IntEnum
+import hashlib
+import inspect
+import json
+import multiprocessing
+import os
+import queue
+import re
 import sys
+import threading
+import time
+import traceback
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def _require_numpy(feature):
+    if (np is None):
+        raise ImportError("NumPy is required for " + feature)
 
 class Pins(IntEnum):
     DIO_0 = 0
@@ -59,6 +81,20 @@ class AnalogIoProperty(IntEnum):
     def __str__(self):
         return self.name.replace("_", " ").title()
 
+class AnalogIoNodeType(IntEnum):
+    ENABLE = 1
+    VOLTAGE = 2
+    CURRENT = 3
+    POWER = 4
+    TEMPERATURE = 5
+    DMM = 6
+    RANGE = 7
+    MEASURE = 8
+    TIME = 9
+    FREQUENCY = 10
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
 class I2cClockRate(IntEnum):
     ONE_HUNDRED_KHZ = 100000
     FOUR_HUNDRED_KHZ = 400000
@@ -78,26 +114,211 @@ class Polarity(IntEnum):
     def __str__(self):
         return self.name.replace("_", " ").title()
 
+class AnalogInChannel(IntEnum):
+    CHANNEL_1 = 0
+    CHANNEL_2 = 1
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
+class AcquisitionMode(IntEnum):
+    SINGLE = 0
+    SCAN_SHIFT = 1
+    SCAN_SCREEN = 2
+    RECORD = 3
+    OVERS = 4
+    SINGLE1 = 5
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
+class InstrumentState(IntEnum):
+    READY = 0
+    ARMED = 1
+    DONE = 2
+    RUNNING = 3
+    CONFIG = 4
+    PREFILL = 5
+    WAIT = 7
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
+class TriggerSource(IntEnum):
+    NONE = 0
+    PC = 1
+    DETECTOR_ANALOG_IN = 2
+    DETECTOR_DIGITAL_IN = 3
+    ANALOG_IN = 4
+    DIGITAL_IN = 5
+    DIGITAL_OUT = 6
+    ANALOG_OUT_1 = 7
+    ANALOG_OUT_2 = 8
+    ANALOG_OUT_3 = 9
+    ANALOG_OUT_4 = 10
+    EXTERNAL_1 = 11
+    EXTERNAL_2 = 12
+    EXTERNAL_3 = 13
+    EXTERNAL_4 = 14
+    HIGH = 15
+    LOW = 16
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
+class SpiDataLanes(IntEnum):
+    SISO = 0 # Half duplex on DQ0
+    STANDARD = 1 # MOSI on DQ0, MISO on DQ1
+    DUAL = 2 # DQ0 and DQ1
+    QUAD = 4 # DQ0 to DQ3
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
+class TriggerSlope(IntEnum):
+    RISE = 0
+    FALL = 1
+    EITHER = 2
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
+class AnalogOutChannel(IntEnum):
+    CHANNEL_1 = 0
+    CHANNEL_2 = 1
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
+class AnalogOutNode(IntEnum):
+    CARRIER = 0
+    FM = 1
+    AM = 2
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
+class WaveformFunction(IntEnum):
+    DC = 0
+    SINE = 1
+    SQUARE = 2
+    TRIANGLE = 3
+    RAMP_UP = 4
+    RAMP_DOWN = 5
+    NOISE = 6
+    PULSE = 7
+    TRAPEZIUM = 8
+    SINE_POWER = 9
+    CUSTOM = 30
+    PLAY = 31
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
+class DigitalOutType(IntEnum):
+    PULSE = 0
+    CUSTOM = 1
+    RANDOM = 2
+    ROM = 3
+    STATE = 4
+    PLAY = 5
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
+class DigitalOutIdle(IntEnum):
+    INIT = 0
+    LOW = 1
+    HIGH = 2
+    HIGH_IMPEDANCE = 3
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
+class UartParity(IntEnum):
+    NONE = 0
+    ODD = 1
+    EVEN = 2
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
+class CanStatus(IntEnum):
+    NO_DATA = 0
+    FRAME_RECEIVED = 1
+    BIT_STUFFING_ERROR = 2
+    CRC_ERROR = 3
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
+class ImpedanceMode(IntEnum):
+    W1_C1_DUT_C2_R_GND = 0 # DUT between the wavegen and the reference resistor
+    W1_C1_R_C2_DUT_GND = 1 # Reference resistor between the wavegen and the DUT
+    IMPEDANCE_ANALYZER_ADAPTER = 8 # Impedance Analyzer for Analog Discovery
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
+class ImpedanceMeasure(IntEnum):
+    IMPEDANCE = 0 # Ohms
+    IMPEDANCE_PHASE = 1 # Radians
+    RESISTANCE = 2 # Ohms
+    REACTANCE = 3 # Ohms
+    ADMITTANCE = 4 # Siemens
+    ADMITTANCE_PHASE = 5 # Radians
+    CONDUCTANCE = 6 # Siemens
+    SUSCEPTANCE = 7 # Siemens
+    SERIES_CAPACITANCE = 8 # Farads
+    PARALLEL_CAPACITANCE = 9 # Farads
+    SERIES_INDUCTANCE = 10 # Henries
+    PARALLEL_INDUCTANCE = 11 # Henries
+    DISSIPATION = 12 # factor
+    QUALITY = 13 # factor
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
 class Status(IntEnum):
     SUCCESS = 0
     ERROR_FAILED_TO_OPEN_DEVICE = -1
     ERROR_I2C_BUS_ERROR_CHECK_THE_PULLUPS = -2
+    ERROR_DEVICE_NOT_FOUND = -3
+    ERROR_DEVICE_POOL_WORKER_FAILED = -4
+    ERROR_DWF_CALL_FAILED = -5
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
+class DwfError(IntEnum):
+    NO_ERROR = 0
+    UNKNOWN_ERROR = 1
+    API_LOCK_TIMEOUT = 2
+    ALREADY_OPENED = 3
+    NOT_SUPPORTED = 4
+    INVALID_PARAMETER_0 = 0x10
+    INVALID_PARAMETER_1 = 0x11
+    INVALID_PARAMETER_2 = 0x12
+    INVALID_PARAMETER_3 = 0x13
+    INVALID_PARAMETER_4 = 0x14
+    def __str__(self):
+        return self.name.replace("_", " ").title()
+
+class ErrorChecking(IntEnum):
+    EVERY_CALL = 0 # every DWF call raises as soon as it fails
+    BATCH = 1 # SPI and I2C transfers only test the return codes they already get
     def __str__(self):
         return self.name.replace("_", " ").title()
 
 class PyAnalogDiscovery2Exception(Exception):
-    def __init__(self, status, dwf, hdwf):
+    def __init__(self, status, dwf, hdwf, message = None, error_code = None):
         self.status = status
         self.dwf = dwf
         self.hdwf = hdwf
+        self.message = message
+        self.error_code = error_code
+        # The DWF error state is cleared by the next call, so read it now
+        if (message is None and dwf is not None):
+            self.error_code, self.message = _last_error(dwf)
 
     def __str__(self):
-        string_buffer = create_string_buffer(512)
-        self.dwf.FDwfGetLastErrorMsg(string_buffer)
-        if (len(string_buffer.value) == 0):
+        message = self.error_message()
+        if (len(message) == 0):
             return str(self.status)
         else:
-            return str(self.status) + "\n" + str(string_buffer.value.decode('utf-8'))
+            return str(self.status) + "\n" + message
+
+    def error_message(self):
+        ''' Returns the message attached to the error, which for DWF
+            failures is the message the library reported when the call failed.
+        '''
+        if (self.message is None):
+            return ""
+        return self.message
 
 class Configuration(IntEnum):
     SCOPE_8K_WAVEGEN_4K_LOGIC_4K_PATTERNS_1K = 0
@@ -110,6 +331,1226 @@ class Configuration(IntEnum):
     def __str__(self):
         return self.name.replace("_", " ").title()
 
+DeviceInfo = namedtuple("DeviceInfo", ["device_index", "serial_number", "device_name", "user_name", "is_opened"])
+
+# C types of the dwf.h scalar parameters.  Pointers and arrays are passed as
+# c_void_p, which accepts bytes, ctypes arrays, byref() and raw addresses.
+_C_TYPES = {
+    "int": c_int,
+    "unsigned int": c_uint,
+    "short": c_short,
+    "unsigned short": c_ushort,
+    "char": c_char,
+    "unsigned char": c_ubyte,
+    "unsigned long long": c_ulonglong,
+    "bool": c_bool,
+    "double": c_double,
+}
+
+# Search path of dwf.h, the copy next to this module first
+_HEADER_PATHS = (
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "dwf.h"),
+    "/usr/include/digilent/waveforms/dwf.h",
+    "/Library/Frameworks/dwf.framework/Headers/dwf.h",
+    "C:\\Program Files (x86)\\Digilent\\WaveFormsSDK\\inc\\dwf.h",
+    "C:\\Program Files\\Digilent\\WaveFormsSDK\\inc\\dwf.h",
+)
+
+# Loaded libraries and the parsed prototypes, shared by every device
+_libraries = {}
+_prototypes = None
+_library_lock = threading.Lock()
+
+def _parse_prototypes(header):
+    ''' Returns {function name: argtypes} for every function declared in the
+        dwf.h text header.
+    '''
+    header = re.sub(r"//[^\n]*|/\*.*?\*/", "", header, flags=re.S)
+    typedefs = dict((name, base) for base, name in re.findall(r"typedef\s+([\w ]+?)\s+(\w+)\s*;", header))
+    prototypes = {}
+    for name, parameters in re.findall(r"DWFAPI\s+int\s+(FDwf\w+)\s*\(([^)]*)\)\s*;", header):
+        argtypes = []
+        for parameter in parameters.split(","):
+            parameter = parameter.strip()
+            if (parameter == "" or parameter == "void"):
+                continue
+            if ("*" in parameter or "[" in parameter):
+                argtypes.append(c_void_p)
+                continue
+            type_name = " ".join(parameter.split()[:-1])
+            while (type_name in typedefs):
+                type_name = typedefs[type_name]
+            argtypes.append(_C_TYPES[type_name])
+        prototypes[name] = tuple(argtypes)
+    return prototypes
+
+def _load_prototypes():
+    global _prototypes
+    if (_prototypes is None):
+        for path in _HEADER_PATHS:
+            if (os.path.exists(path)):
+                with open(path) as header:
+                    _prototypes = _parse_prototypes(header.read())
+                break
+        else:
+            raise IOError("dwf.h was not found next to pyanalogdiscovery2.py or in the WaveForms SDK")
+    return _prototypes
+
+# array.array typecode of an unsigned 32-bit word
+_UINT32_TYPECODE = "I" if array("I").itemsize == 4 else "L"
+
+def _load_dwf(backend = None):
+    ''' Loads the DWF library.  backend is "dwf" for the Digilent library,
+        "simulator" for the simulated device in pyanalogdiscovery2_simulator,
+        the path of a DWF compatible shared library, or an object
+        implementing the DWF functions, such as a configured SimulatedDwf.
+        By default the PYANALOGDISCOVERY2_BACKEND environment variable is
+        used, falling back to "dwf".
+    '''
+    if (backend is None):
+        backend = os.environ.get("PYANALOGDISCOVERY2_BACKEND", "dwf")
+    if (not isinstance(backend, str)):
+        return backend
+    if (backend == "simulator"):
+        from pyanalogdiscovery2_simulator import SimulatedDwf
+        return SimulatedDwf()
+
+    if (backend != "dwf"):
+        path = backend
+    elif sys.platform.startswith("win"):
+        path = "dwf.dll"
+    elif sys.platform.startswith("darwin"):
+        path = "/Library/Frameworks/dwf.framework/dwf"
+    else:
+        path = "libdwf.so"
+
+    # The library is loaded and its prototypes declared once per process
+    with _library_lock:
+        dwf = _libraries.get(path)
+        if (dwf is None):
+            dwf = _declare_prototypes(cdll.LoadLibrary(path))
+            _libraries[path] = dwf
+    return dwf
+
+def _declare_prototypes(dwf, errcheck = None):
+    for name, argtypes in _load_prototypes().items():
+        function = getattr(dwf, name, None)
+        if (function is not None):
+            function.argtypes = argtypes
+            function.restype = c_int
+            if (errcheck is not None and name not in _UNCHECKED_FUNCTIONS):
+                function.errcheck = errcheck
+    return dwf
+
+# Functions that report the error state and are never checked themselves
+_UNCHECKED_FUNCTIONS = ("FDwfGetLastError", "FDwfGetLastErrorMsg")
+
+def _last_error(dwf):
+    ''' Returns the DWF error code and message of the last failed call.
+    '''
+    error_code = c_int(0)
+    message = create_string_buffer(512)
+    dwf.FDwfGetLastError(byref(error_code))
+    dwf.FDwfGetLastErrorMsg(message)
+    try:
+        code = DwfError(error_code.value)
+    except ValueError:
+        code = error_code.value
+    return code, message.value.decode("utf-8", "replace").strip()
+
+def _dwf_failure(dwf, hdwf, operation):
+    ''' Returns the exception for a failed DWF call, with the error read
+        right away.
+    '''
+    error_code, message = _last_error(dwf)
+    return PyAnalogDiscovery2Exception(Status.ERROR_DWF_CALL_FAILED, dwf, hdwf, "%s failed: %s" % (operation, message), error_code)
+
+def _error_check(dwf):
+    ''' Returns an errcheck hook that raises when a DWF function returns 0.
+        The error is read from dwf, the unchecked library.
+    '''
+    def errcheck(result, function, arguments):
+        if (result == 0):
+            raise _dwf_failure(dwf, None, function.__name__)
+        return result
+    return errcheck
+
+class _CheckedBackend(object):
+    ''' Checked view of a DWF backend that is not a shared library, such as
+        a SimulatedDwf.  Other attributes are passed through.
+    '''
+    def __init__(self, dwf):
+        self._dwf = dwf
+        self._errcheck = _error_check(dwf)
+
+    def __getattr__(self, name):
+        attribute = getattr(self._dwf, name)
+        if (not name.startswith("FDwf") or name in _UNCHECKED_FUNCTIONS):
+            return attribute
+        errcheck = self._errcheck
+        def function(*arguments):
+            return errcheck(attribute(*arguments), function, arguments)
+        function.__name__ = name
+        self.__dict__[name] = function
+        return function
+
+def _checked_dwf(dwf):
+    ''' Returns a view of the library loaded by _load_dwf whose functions
+        raise a PyAnalogDiscovery2Exception as soon as they fail.  The
+        checked library shares the handle of dwf and is created once.
+    '''
+    if (not isinstance(dwf, CDLL)):
+        return _CheckedBackend(dwf)
+    with _library_lock:
+        checked = _libraries.get((dwf._name, ErrorChecking.EVERY_CALL))
+        if (checked is None):
+            checked = _declare_prototypes(cdll.LoadLibrary(dwf._name), _error_check(dwf))
+            _libraries[(dwf._name, ErrorChecking.EVERY_CALL)] = checked
+    return checked
+
+def _unprototyped(dwf, name):
+    ''' Returns the DWF function without the argument conversions of its
+        prototype, for hot loops that only pass prepared ctypes objects.
+    '''
+    if (isinstance(dwf, CDLL)):
+        return dwf._FuncPtr((name, dwf))
+    return getattr(dwf, name)
+
+def _argument(index):
+    return lambda arguments: arguments[index]
+
+def _pointed(index):
+    ''' Returns the count stored by the call through its pointer argument.
+    '''
+    def count(arguments):
+        pointer = getattr(arguments[index], "_obj", arguments[index])
+        return pointer.value if isinstance(pointer, _SimpleCData) else c_int.from_address(pointer).value
+    return count
+
+def _payload(pointer, size):
+    ''' Returns size bytes of a data argument for the transaction trace.
+    '''
+    if (pointer is None or size <= 0):
+        return b""
+    if (isinstance(pointer, (bytes, bytearray))):
+        return bytes(pointer[:size])
+    if (isinstance(pointer, int)):
+        return string_at(pointer, size)
+    return string_at(cast(pointer, c_void_p).value, size)
+
+# Data moved by the DWF functions: name -> (write, read, trace payload).  write
+# and read are (pointer argument index, count(arguments), bytes per item).
+_TRANSFERS = {
+    "FDwfDigitalSpiWriteRead": ((3, _argument(4), 1), (5, _argument(6), 1), True),
+    "FDwfDigitalSpiWriteRead16": ((3, _argument(4), 2), (5, _argument(6), 2), True),
+    "FDwfDigitalSpiWriteRead32": ((3, _argument(4), 4), (5, _argument(6), 4), True),
+    "FDwfDigitalSpiWrite": ((3, _argument(4), 1), None, True),
+    "FDwfDigitalSpiWrite16": ((3, _argument(4), 2), None, True),
+    "FDwfDigitalSpiWrite32": ((3, _argument(4), 4), None, True),
+    "FDwfDigitalSpiRead": (None, (3, _argument(4), 1), True),
+    "FDwfDigitalSpiRead16": (None, (3, _argument(4), 2), True),
+    "FDwfDigitalSpiRead32": (None, (3, _argument(4), 4), True),
+    "FDwfDigitalI2cWriteRead": ((2, _argument(3), 1), (4, _argument(5), 1), True),
+    "FDwfDigitalI2cWrite": ((2, _argument(3), 1), None, True),
+    "FDwfDigitalI2cRead": (None, (2, _argument(3), 1), True),
+    "FDwfDigitalUartTx": ((1, _argument(2), 1), None, True),
+    "FDwfDigitalUartRx": (None, (1, _pointed(3), 1), True),
+    "FDwfDigitalCanTx": ((5, _argument(4), 1), None, True),
+    "FDwfDigitalCanRx": (None, (5, _pointed(4), 1), True),
+    "FDwfAnalogInStatusData16": (None, (2, _argument(4), 2), False),
+    "FDwfDigitalInStatusData2": (None, (1, _argument(3), 1), False),
+    "FDwfAnalogOutNodeDataSet": ((3, _argument(4), 8), None, False),
+    "FDwfAnalogOutNodePlayData": ((3, _argument(4), 8), None, False),
+    "FDwfDigitalOutPlayDataSet": ((1, lambda arguments: (arguments[2] * arguments[3] + 7) // 8, 1), None, False),
+}
+
+class Instrumentation(object):
+    ''' Measures a device: the calls, latency histogram, errors and bytes
+        transferred of every DWF function, and the calls and latency of every
+        public method of the device and its sessions.  With trace, each call
+        is also kept as a timestamped event, SPI, I2C, UART and CAN calls
+        with their payloads, for export_chrome_trace().  At most
+        max_trace_events are kept, the oldest are dropped.
+
+        Pass it to PyAnalogDiscovery2(..., instrumentation = Instrumentation())
+        and read device.stats().  Without instrumentation the DWF library is
+        called directly, so it costs nothing.  Set enabled to False to pause
+        the measurements.
+    '''
+    # Upper edges of the latency histogram buckets, in seconds
+    LATENCY_BUCKETS = (1e-6, 2e-6, 5e-6, 10e-6, 20e-6, 50e-6, 100e-6, 200e-6, 500e-6, 1e-3, 2e-3, 5e-3, 10e-3, 20e-3, 50e-3, 100e-3, float("inf"))
+
+    def __init__(self, trace = False, max_trace_events = 100000):
+        self.enabled = True
+        self.trace = trace
+        self.start_time = time.perf_counter()
+        self._functions = {}
+        self._methods = {}
+        self._events = deque(maxlen=max_trace_events)
+        self._lock = threading.Lock()
+
+    def reset(self):
+        ''' Clears the statistics and the trace.
+        '''
+        with self._lock:
+            self.start_time = time.perf_counter()
+            self._functions.clear()
+            self._methods.clear()
+            self._events.clear()
+
+    def wrap(self, dwf):
+        ''' Returns an instrumented view of a DWF backend.
+        '''
+        return _InstrumentedBackend(dwf, self)
+
+    def instrument(self, target):
+        ''' Measures the public methods of target, a device or a session,
+            by shadowing them on the instance.  The sessions returned by the
+            acquire_* methods are instrumented too.  Generator methods and
+            stats() are left alone.
+        '''
+        prefix = type(target).__name__ + "."
+        for name, attribute in inspect.getmembers(type(target), inspect.isfunction):
+            if (name.startswith("_") or name == "stats" or inspect.isgeneratorfunction(attribute)):
+                continue
+            setattr(target, name, self._method(prefix + name, getattr(target, name), name.startswith("acquire_")))
+        return target
+
+    def stats(self):
+        ''' Returns a snapshot of the statistics: totals over the DWF
+            functions, and per DWF function ("functions") and per method
+            ("methods") the calls, errors, total/mean/max seconds, bytes
+            written and read, and a latency histogram over LATENCY_BUCKETS.
+        '''
+        with self._lock:
+            functions = dict((name, self._snapshot(values)) for name, values in self._functions.items())
+            methods = dict((name, self._snapshot(values)) for name, values in self._methods.items())
+        return {
+            "elapsed": time.perf_counter() - self.start_time,
+            "calls": sum(values["calls"] for values in functions.values()),
+            "time": sum(values["total_time"] for values in functions.values()),
+            "bytes_written": sum(values["bytes_written"] for values in functions.values()),
+            "bytes_read": sum(values["bytes_read"] for values in functions.values()),
+            "latency_buckets": self.LATENCY_BUCKETS,
+            "functions": functions,
+            "methods": methods,
+        }
+
+    def hot_spots(self, count = 10):
+        ''' Returns the count DWF functions and methods that took the most
+            time, as (name, total seconds, calls) tuples.
+        '''
+        with self._lock:
+            totals = [(name, values[2], values[0]) for table in (self._functions, self._methods) for name, values in table.items()]
+        return sorted(totals, key=lambda total: total[1], reverse=True)[:count]
+
+    def trace_events(self):
+        ''' Returns the traced calls as dictionaries in chronological order
+            of their start.
+        '''
+        with self._lock:
+            events = list(self._events)
+        return [{"name": name, "category": category, "start": start - self.start_time, "duration": duration, "thread": thread, "arguments": arguments}
+                for name, category, start, duration, thread, arguments in sorted(events, key=lambda event: event[2])]
+
+    def export_chrome_trace(self, filename):
+        ''' Writes the trace in the Chrome trace event format, for
+            chrome://tracing or Perfetto.
+        '''
+        process = os.getpid()
+        events = []
+        for event in self.trace_events():
+            events.append({
+                "name": event["name"],
+                "cat": event["category"],
+                "ph": "X",
+                "ts": event["start"] * 1e6,
+                "dur": event["duration"] * 1e6,
+                "pid": process,
+                "tid": event["thread"],
+                "args": event["arguments"] or {},
+            })
+        with open(filename, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def _method(self, name, method, acquire):
+        def measured(*args, **kwargs):
+            if (not self.enabled):
+                result = method(*args, **kwargs)
+                return self.instrument(result) if acquire else result
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = method(*args, **kwargs)
+                failed = False
+            finally:
+                self._record(self._methods, name, "method", start, time.perf_counter() - start, failed, 0, 0, None)
+            return self.instrument(result) if acquire else result
+        measured.__name__ = method.__name__
+        measured.__doc__ = method.__doc__
+        return measured
+
+    def _call(self, name, function, arguments):
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = function(*arguments)
+            failed = (result == 0)
+            return result
+        finally:
+            duration = time.perf_counter() - start
+            written = read = 0
+            trace = None
+            transfer = _TRANSFERS.get(name)
+            if (transfer is not None):
+                write_spec, read_spec, payload = transfer
+                if (write_spec is not None):
+                    written = write_spec[1](arguments) * write_spec[2]
+                if (read_spec is not None and not failed):
+                    read = read_spec[1](arguments) * read_spec[2]
+                if (self.trace and payload):
+                    trace = self._payload_arguments(arguments, write_spec, written, read_spec, read)
+            if (self.trace and trace is None):
+                trace = dict(("argument_%d" % i, argument) for i, argument in enumerate(arguments) if i > 0 and isinstance(argument, (int, float)))
+            self._record(self._functions, name, "dwf", start, duration, failed, written, read, trace)
+
+    def _payload_arguments(self, arguments, write_spec, written, read_spec, read):
+        trace = dict(("argument_%d" % i, argument) for i, argument in enumerate(arguments) if i > 0 and isinstance(argument, (int, float)))
+        if (write_spec is not None):
+            trace["write"] = _payload(arguments[write_spec[0]], written).hex()
+        if (read_spec is not None):
+            trace["read"] = _payload(arguments[read_spec[0]], read).hex()
+        return trace
+
+    def _record(self, table, name, category, start, duration, failed, written, read, trace):
+        bucket = bisect_left(self.LATENCY_BUCKETS, duration)
+        with self._lock:
+            values = table.get(name)
+            if (values is None):
+                # calls, errors, total time, max time, bytes written, bytes read, histogram
+                values = table[name] = [0, 0, 0.0, 0.0, 0, 0, [0] * len(self.LATENCY_BUCKETS)]
+            values[0] += 1
+            values[1] += failed
+            values[2] += duration
+            values[3] = max(values[3], duration)
+            values[4] += written
+            values[5] += read
+            values[6][bucket] += 1
+            if (self.trace):
+                self._events.append((name, category, start, duration, threading.get_ident(), trace))
+
+    def _snapshot(self, values):
+        calls, errors, total, maximum, written, read, histogram = values
+        return {
+            "calls": calls,
+            "errors": errors,
+            "total_time": total,
+            "mean_time": total / calls if calls > 0 else 0.0,
+            "max_time": maximum,
+            "bytes_written": written,
+            "bytes_read": read,
+            "latency_histogram": list(histogram),
+        }
+
+class _InstrumentedBackend(object):
+    ''' Instrumented view of a DWF backend, see Instrumentation.  Other
+        attributes are passed through.
+    '''
+    def __init__(self, dwf, instrumentation):
+        self._dwf = dwf
+        self._instrumentation = instrumentation
+
+    def __getattr__(self, name):
+        attribute = getattr(self._dwf, name)
+        if (not name.startswith("FDwf")):
+            return attribute
+        instrumentation = self._instrumentation
+        def function(*arguments):
+            if (not instrumentation.enabled):
+                return attribute(*arguments)
+            return instrumentation._call(name, attribute, arguments)
+        function.__name__ = name
+        self.__dict__[name] = function
+        return function
+
+# Result of an I2C transfer.  nak is 0 when every byte was acknowledged,
+# otherwise the 1-based position of the byte that was not (1 is the address).
+I2cTransfer = namedtuple("I2cTransfer", ["data", "nak", "attempts"])
+
+TelemetryNode = namedtuple("TelemetryNode", ["channel", "node", "name", "units"])
+
+# A received CAN frame.  time is the host time.perf_counter() when the frame
+# was drained from the device and data holds dlc bytes (none for remote frames).
+CanFrame = namedtuple("CanFrame", ["time", "id", "extended", "remote", "data"])
+
+# The result of an impedance sweep, one NumPy array per field.  impedance is
+# |Z| in ohms, phase in radians, resistance and reactance the series Rs and Xs.
+ImpedanceSweep = namedtuple("ImpedanceSweep", ["frequency", "impedance", "phase", "resistance", "reactance"])
+
+CAN_FRAME_DTYPE = [("time", "f8"), ("id", "u4"), ("extended", "?"), ("remote", "?"), ("dlc", "u1"), ("data", "u1", (8,))]
+
+def _coalesce_registers(registers, max_burst_length, max_gap = 0):
+    ''' Groups register addresses into (start_register, register_count)
+        bursts of at most max_burst_length registers.
+    '''
+    bursts = []
+    for register in sorted(set(registers)):
+        if (len(bursts) > 0):
+            start_register, register_count = bursts[-1]
+            end_register = start_register + register_count
+            if (register - end_register <= max_gap and register - start_register < max_burst_length):
+                bursts[-1] = (start_register, register - start_register + 1)
+                continue
+        bursts.append((register, 1))
+    return bursts
+
+def _buffer_argument(buffer):
+    ''' Returns an object that can be passed as a c_void_p argument pointing
+        at the memory of a bytes-like object (bytes, bytearray, memoryview,
+        array.array or NumPy array), and its size in bytes.  Writable buffers
+        are passed in place, read-only ones are copied as a single block.
+    '''
+    if (isinstance(buffer, bytes)):
+        return buffer, len(buffer)
+    size = memoryview(buffer).nbytes
+    try:
+        return (c_ubyte * size).from_buffer(buffer), size
+    except TypeError:
+        return (c_ubyte * size).from_buffer_copy(buffer), size
+
+def enumerate_devices(backend = None):
+    ''' Returns a DeviceInfo for every Digilent device attached to the
+        computer.  The device_index can be passed to PyAnalogDiscovery2.
+    '''
+    dwf = _load_dwf(backend)
+    device_count = c_int(0)
+    is_opened = c_int(0)
+    serial_number = create_string_buffer(32)
+    device_name = create_string_buffer(32)
+    user_name = create_string_buffer(32)
+    devices = []
+    dwf.FDwfEnum(0, byref(device_count)) # 0 enumfilterAll
+    for i in range(device_count.value):
+        dwf.FDwfEnumSN(i, serial_number)
+        dwf.FDwfEnumDeviceName(i, device_name)
+        dwf.FDwfEnumUserName(i, user_name)
+        dwf.FDwfEnumDeviceIsOpened(i, byref(is_opened))
+        devices.append(DeviceInfo(i, serial_number.value.decode('utf-8'), device_name.value.decode('utf-8'), user_name.value.decode('utf-8'), is_opened.value != 0))
+    return devices
+
+def _enumerated_serial_number(dwf, device_index):
+    ''' Returns the serial number of the opened device at device_index, or
+        None if it cannot be told.  A device opened with device_index -1 is
+        only identified when it is the one device attached.
+    '''
+    device_count = c_int(0)
+    serial_number = create_string_buffer(32)
+    dwf.FDwfEnum(0, byref(device_count)) # 0 enumfilterAll
+    if (device_index < 0):
+        if (device_count.value != 1):
+            return None
+        device_index = 0
+    if (device_index >= device_count.value):
+        return None
+    dwf.FDwfEnumSN(device_index, serial_number)
+    return serial_number.value.decode('utf-8') or None
+
+def find_device_index(serial_number, backend = None):
+    ''' Returns the device_index of the device with the given serial number.
+    '''
+    for device in enumerate_devices(backend):
+        if (device.serial_number == serial_number):
+            return device.device_index
+    raise PyAnalogDiscovery2Exception(Status.ERROR_DEVICE_NOT_FOUND, None, None, "No device with serial number " + serial_number)
+
+def digital_pins(samples):
+    ''' Unpacks packed uint16 logic analyzer samples into a (samples x 16)
+        uint8 array of 0/1 values, column n holding Pins.DIO_n.
+    '''
+    samples = np.ascontiguousarray(samples, dtype="<u2")
+    return np.unpackbits(samples.view(np.uint8).reshape(-1, 2), axis=1, bitorder="little")
+
+def digital_pin(samples, pin):
+    ''' Returns the 0/1 levels of one pin of packed logic analyzer samples.
+    '''
+    return ((samples >> pin) & 1).astype(np.uint8)
+
+def digital_edges(samples, pin, slope = TriggerSlope.EITHER):
+    ''' Returns the sample indexes at which a pin changes level; the index is
+        that of the first sample after the transition.
+    '''
+    levels = digital_pin(samples, pin)
+    edges = np.flatnonzero(np.diff(levels)) + 1
+    if (slope == TriggerSlope.RISE):
+        return edges[levels[edges] == 1]
+    elif (slope == TriggerSlope.FALL):
+        return edges[levels[edges] == 0]
+    return edges
+
+# Segment reducers take a (segments x channels x samples) array of volts and the
+# sample rate, and return an array whose first axis is the segment.
+
+def segment_mean(segments, sample_rate):
+    ''' Returns the (segments x channels) mean voltages.
+    '''
+    return segments.mean(axis=-1)
+
+def segment_rms(segments, sample_rate):
+    ''' Returns the (segments x channels) RMS voltages.
+    '''
+    return np.sqrt(np.einsum("...i,...i->...", segments, segments) / segments.shape[-1])
+
+def segment_peak_to_peak(segments, sample_rate):
+    ''' Returns the (segments x channels) peak-to-peak voltages.
+    '''
+    return np.ptp(segments, axis=-1)
+
+def segment_rise_time(segments, sample_rate, low = 0.1, high = 0.9):
+    ''' Returns the (segments x channels) time in seconds the first rising
+        edge takes from the low to the high fraction of the segment's
+        peak-to-peak range, or NaN where there is no such edge.
+    '''
+    minimum = segments.min(axis=-1, keepdims=True)
+    span = segments.max(axis=-1, keepdims=True) - minimum
+    low_level = minimum + low * span
+    high_level = minimum + high * span
+    # The edge starts at the last sample below the low level before the
+    # first sample above the high level
+    first_high = np.argmax(segments >= high_level, axis=-1)
+    index = np.arange(segments.shape[-1])
+    below_low_before = (segments < low_level) & (index < first_high[..., None])
+    last_low = segments.shape[-1] - 1 - np.argmax(below_low_before[..., ::-1], axis=-1)
+    # Interpolate the crossings between samples
+    start = _crossing(segments, last_low, low_level[..., 0])
+    stop = _crossing(segments, np.maximum(first_high - 1, 0), high_level[..., 0])
+    rise_time = (stop - start) / float(sample_rate)
+    return np.where(below_low_before.any(axis=-1) & (span[..., 0] > 0), rise_time, np.nan)
+
+def _crossing(segments, index, level):
+    ''' Returns the fractional sample index at which the segments cross
+        level between sample index and the next one.
+    '''
+    before = np.take_along_axis(segments, index[..., None], axis=-1)[..., 0]
+    after = np.take_along_axis(segments, np.minimum(index + 1, segments.shape[-1] - 1)[..., None], axis=-1)[..., 0]
+    step = after - before
+    return index + np.where(step != 0, (level - before) / np.where(step != 0, step, 1), 0.0)
+
+def segment_spectrum(segments, sample_rate):
+    ''' Returns the (segments x channels x bins) single-sided amplitude
+        spectrum in volts, Hann windowed.  Bin n is n * sample_rate /
+        samples Hz.
+    '''
+    window = np.hanning(segments.shape[-1])
+    return np.abs(np.fft.rfft(segments * window, axis=-1)) * (2.0 / window.sum())
+
+class I2cPoller(object):
+    ''' Reads a set of (address, register, length) targets from one I2C bus
+        at a fixed rate and keeps per-address latency histograms.  Cycles run
+        on an absolute schedule, so a slow cycle does not shift the ones after
+        it; cycles that cannot start on time are skipped and counted as
+        overruns.
+    '''
+    # Upper edges of the latency histogram buckets, in seconds
+    LATENCY_BUCKETS = (50e-6, 100e-6, 200e-6, 500e-6, 1e-3, 2e-3, 5e-3, 10e-3, 20e-3, 50e-3, 100e-3, float("inf"))
+
+    def __init__(self, i2c, targets, rate):
+        self.i2c = i2c
+        self.targets = list(targets)
+        self.rate = rate
+        self.cycles = 0
+        self.overruns = 0
+        self.elapsed = 0.0
+        self.latency_histograms = dict((address, [0] * len(self.LATENCY_BUCKETS)) for address, register, length in self.targets)
+
+    def run(self, duration = None, cycles = None, callback = None):
+        ''' Polls until duration seconds have elapsed or cycles cycles have
+            run.  callback(timestamp, results) is called after each cycle with
+            a dictionary of I2cTransfer keyed by (address, register).
+        '''
+        period = 1.0 / self.rate
+        start = time.perf_counter()
+        deadline = start
+        cycle = 0
+        while ((cycles is None or cycle < cycles) and (duration is None or deadline - start < duration)):
+            now = time.perf_counter()
+            if (deadline > now):
+                time.sleep(deadline - now)
+            results = {}
+            for address, register, length in self.targets:
+                before = time.perf_counter()
+                results[(address, register)] = self.i2c.read_registers(register, length, address)
+                latency = time.perf_counter() - before
+                self.latency_histograms[address][bisect_left(self.LATENCY_BUCKETS, latency)] += 1
+            if (callback is not None):
+                callback(deadline, results)
+            cycle += 1
+            deadline += period
+            now = time.perf_counter()
+            if (now > deadline):
+                missed = int((now - deadline) / period) + 1
+                self.overruns += missed
+                deadline += missed * period
+        self.cycles += cycle
+        self.elapsed += time.perf_counter() - start
+
+    def achieved_rate(self):
+        ''' Returns the average number of cycles per second run so far.
+        '''
+        return self.cycles / self.elapsed if self.elapsed > 0 else 0.0
+
+    def statistics(self):
+        ''' Returns a snapshot of the poller statistics.
+        '''
+        return {
+            "cycles": self.cycles,
+            "overruns": self.overruns,
+            "target_rate": self.rate,
+            "achieved_rate": self.achieved_rate(),
+            "latency_buckets": self.LATENCY_BUCKETS,
+            "latency_histograms": dict((address, list(counts)) for address, counts in self.latency_histograms.items()),
+        }
+
+class PowerSupplyRecorder(object):
+    ''' Records every power supply telemetry node into a columnar ring
+        buffer, one FDwfAnalogIOStatus per sample, and optionally streams the
+        samples to a .npy file of records with a "time" field and one field
+        per node, and/or to a capture file (see pyanalogdiscovery2_capture)
+        with a "time" channel and one channel per node.  Rolling
+        min/max/mean are computed on demand over the ring buffer, so
+        recording at tens of Hz costs almost nothing.
+    '''
+    def __init__(self, power_supply, rate = None, capacity = 4096, filename = None, capture_filename = None):
+        _require_numpy("the power supply recorder")
+        self.power_supply = power_supply
+        self.nodes = power_supply.telemetry_nodes()
+        self.columns = ["time"] + [node.name for node in self.nodes]
+        self.rate = rate
+        self.capacity = capacity
+        self.filename = filename
+        self.capture_filename = capture_filename
+        self.samples = 0
+        self.overruns = 0
+        self.elapsed = 0.0
+
+        # One row per column, time first, written in place every sample
+        self.buffer = np.zeros((len(self.columns), capacity))
+        self._values = np.ctypeslib.as_array(power_supply._values) if len(self.nodes) > 0 else np.zeros(0)
+        self._dtype = np.dtype([(name, np.float64) for name in self.columns])
+        self._file = None
+        self._capture = None
+        self._written = 0
+        self._records = 0
+        self._start = None
+
+    def run(self, duration = None, samples = None, callback = None):
+        ''' Records until duration seconds have elapsed or samples samples
+            were taken.  Samples run on an absolute schedule like I2cPoller;
+            samples that cannot start on time are counted as overruns.
+            callback(timestamp, values) is called after each sample with a
+            view of the newest buffer column.
+        '''
+        if (self.filename is not None and self._file is None):
+            self._file = open(self.filename, "wb")
+            self._file.write(self._npy_header(0))
+        if (self.capture_filename is not None and self._capture is None):
+            from pyanalogdiscovery2_capture import CaptureWriter
+            device = self.power_supply._device
+            self._capture = CaptureWriter(self.capture_filename, self.columns, np.float64, self.rate or 0.0,
+                                          serial_number = device._capture_serial_number(), configuration = device.configuration, chunk_size = 4096)
+        period = 1.0 / self.rate if self.rate else 0.0
+        start = time.perf_counter()
+        if (self._start is None):
+            self._start = start
+        deadline = start
+        count = 0
+        try:
+            while ((samples is None or count < samples) and (duration is None or deadline - start < duration)):
+                if (period > 0.0):
+                    now = time.perf_counter()
+                    if (deadline > now):
+                        time.sleep(deadline - now)
+                timestamp = time.perf_counter()
+                if (self.power_supply._read_nodes()):
+                    column = self.samples % self.capacity
+                    self.buffer[0, column] = timestamp - self._start
+                    self.buffer[1:, column] = self._values
+                    self.samples += 1
+                    count += 1
+                    if ((self._file is not None or self._capture is not None) and self.samples - self._written >= self.capacity // 2):
+                        self.flush()
+                    if (callback is not None):
+                        callback(timestamp, self.buffer[:, column])
+                if (period > 0.0):
+                    deadline += period
+                    now = time.perf_counter()
+                    if (now > deadline):
+                        missed = int((now - deadline) / period) + 1
+                        self.overruns += missed
+                        deadline += missed * period
+                else:
+                    deadline = timestamp
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+    def latest(self, count = None):
+        ''' Returns a (columns x samples) copy of the newest count samples
+            in chronological order, at most the ring buffer capacity.
+        '''
+        available = min(self.samples, self.capacity)
+        count = available if count is None else min(count, available)
+        first = self.samples - count
+        indices = np.arange(first, self.samples) % self.capacity
+        return self.buffer[:, indices]
+
+    def statistics(self, window = None):
+        ''' Returns {column: {"min", "max", "mean"}} over the newest window
+            samples, by default everything still in the ring buffer.
+        '''
+        samples = self.latest(window)
+        if (samples.shape[1] == 0):
+            return {}
+        minimum = samples.min(axis=1)
+        maximum = samples.max(axis=1)
+        mean = samples.mean(axis=1)
+        return dict((name, {"min": minimum[i], "max": maximum[i], "mean": mean[i]}) for i, name in enumerate(self.columns) if i > 0)
+
+    def achieved_rate(self):
+        ''' Returns the average number of samples per second so far.
+        '''
+        return self.samples / self.elapsed if self.elapsed > 0 else 0.0
+
+    def flush(self):
+        ''' Appends the samples not yet on disk to the files.
+        '''
+        if (self._file is None and self._capture is None):
+            return
+        pending = self.samples - self._written
+        if (pending > self.capacity):
+            # The ring buffer wrapped before it was written out
+            self.overruns += pending - self.capacity
+            pending = self.capacity
+        block = self.latest(pending)
+        if (self._file is not None):
+            records = np.empty(pending, dtype=self._dtype)
+            for i, name in enumerate(self.columns):
+                records[name] = block[i]
+            records.tofile(self._file)
+        if (self._capture is not None):
+            self._capture.write(block)
+        self._written = self.samples
+        self._records += pending
+
+    def close(self):
+        ''' Flushes the remaining samples and finalizes the files.
+        '''
+        self.flush()
+        if (self._capture is not None):
+            self._capture.close()
+            self._capture = None
+        if (self._file is None):
+            return
+        self._file.seek(0)
+        self._file.write(self._npy_header(self._records))
+        self._file.close()
+        self._file = None
+
+    def _npy_header(self, count):
+        ''' Returns a version 1.0 .npy header whose size does not depend on
+            count, so the record count can be rewritten in place when the file
+            is closed.
+        '''
+        header = "{'descr': %r, 'fortran_order': False, 'shape': (%%s,), }" % (np.lib.format.dtype_to_descr(self._dtype),)
+        # Leave room for a 20 digit count and align the data to 64 bytes
+        length = (len(header % ("9" * 20)) + 10 + 1 + 63) // 64 * 64 - 10
+        header = (header % count).ljust(length - 1) + "\n"
+        return b"\x93NUMPY\x01\x00" + length.to_bytes(2, "little") + header.encode("latin1")
+
+def _write_capture(writer, chunks, instrument, sample_count):
+    ''' Writes the chunks of an acquisition to a CaptureWriter, recording the
+        samples the instrument lost before each chunk as a gap.
+    '''
+    lost = instrument.lost_samples
+    try:
+        for chunk in chunks:
+            writer.skip(instrument.lost_samples - lost)
+            lost = instrument.lost_samples
+            if (sample_count is not None):
+                chunk = chunk[..., :sample_count - writer.samples]
+            writer.write(chunk)
+            if (sample_count is not None and writer.samples >= sample_count):
+                break
+    finally:
+        chunks.close()
+
+class SegmentedCapture(object):
+    ''' Captures one oscilloscope segment per trigger and keeps only its
+        reductions, so tens of thousands of events take bounded memory.
+
+        reducers maps a name to a reducer such as segment_rms, called with a
+        batch of segments in volts.  Segments are reduced in batches while
+        the oscilloscope is armed for the next trigger.  keep_raw(reductions)
+        returns a boolean mask of the segments of a batch whose raw samples
+        should be kept as well, for example the failures; at most
+        max_raw_segments are kept.
+
+            capture = SegmentedCapture(scope, {"rms": segment_rms, "rise": segment_rise_time},
+                                       keep_raw = lambda r: r["rms"][:, 0] > 1.2)
+            capture.run(segment_count = 10000)
+            rms = capture.reductions()["rms"]
+    '''
+    def __init__(self, oscilloscope, reducers, keep_raw = None, max_raw_segments = 100):
+        _require_numpy("segmented capture")
+        self.oscilloscope = oscilloscope
+        self.reducers = OrderedDict(reducers)
+        self.keep_raw = keep_raw
+        self.max_raw_segments = max_raw_segments
+        self.segments = 0
+        self.raw_segments = [] # (segment index, channels x samples int16 copy)
+        self.raw_segments_dropped = 0
+        self.elapsed = 0.0
+        self.reduce_time = 0.0
+        self._times = []
+        self._reductions = OrderedDict((name, []) for name in self.reducers)
+
+    def run(self, segment_count = None, duration = None, batch_size = 64, timeout = None):
+        ''' Captures until segment_count segments were captured, duration
+            seconds have elapsed, or no trigger arrived for timeout seconds.
+        '''
+        scope = self.oscilloscope
+        start = time.perf_counter()
+        remaining = segment_count
+        segments = scope.read_segments(remaining, batch_size, timeout)
+        try:
+            for times, raw in segments:
+                self._reduce(times, raw)
+                if (remaining is not None):
+                    remaining -= len(times)
+                if (duration is not None and time.perf_counter() - start >= duration):
+                    break
+        finally:
+            segments.close()
+            self.elapsed += time.perf_counter() - start
+
+    def reductions(self):
+        ''' Returns {name: array} of every reduction so far, plus "time", the
+            time.perf_counter() at which each segment was read.
+        '''
+        result = OrderedDict()
+        result["time"] = np.concatenate(self._times) if len(self._times) > 0 else np.zeros(0)
+        for name, batches in self._reductions.items():
+            result[name] = np.concatenate(batches) if len(batches) > 0 else np.zeros(0)
+        return result
+
+    def achieved_rate(self):
+        ''' Returns the average number of segments per second so far.
+        '''
+        return self.segments / self.elapsed if self.elapsed > 0 else 0.0
+
+    def statistics(self):
+        ''' Returns a snapshot of the capture statistics.
+        '''
+        return {
+            "segments": self.segments,
+            "achieved_rate": self.achieved_rate(),
+            "reduce_time": self.reduce_time,
+            "raw_segments": len(self.raw_segments),
+            "raw_segments_dropped": self.raw_segments_dropped,
+        }
+
+    def _reduce(self, times, raw):
+        before = time.perf_counter()
+        scope = self.oscilloscope
+        volts = scope.to_volts(raw)
+        batch = OrderedDict((name, reducer(volts, scope.sample_rate)) for name, reducer in self.reducers.items())
+        for name, values in batch.items():
+            self._reductions[name].append(values)
+        self._times.append(times.copy())
+        if (self.keep_raw is not None):
+            for i in np.flatnonzero(self.keep_raw(batch)):
+                if (len(self.raw_segments) < self.max_raw_segments):
+                    self.raw_segments.append((self.segments + int(i), raw[i].copy()))
+                else:
+                    self.raw_segments_dropped += 1
+        self.segments += len(times)
+        self.reduce_time += time.perf_counter() - before
+
+class BackgroundReader(object):
+    ''' Polls an instrument on a dedicated thread and hands the acquired
+        samples to the consumer as fixed-size blocks.  The DWF calls run with
+        the GIL released, so the consumer can plot, write to disk or run
+        checks without stalling the hardware FIFO.
+
+        Blocks come from a preallocated pool.  When the consumer falls behind
+        and the pool is empty, the reader keeps draining the device and drops
+        the block it is filling instead of blocking.
+    '''
+    def __init__(self, drain, channel_count, block_size = 65536, block_count = 16, dtype = None, poll_interval = 0.001):
+        _require_numpy("background acquisition")
+        self.block_size = block_size
+        self.block_count = block_count
+        self.poll_interval = poll_interval
+        self.blocks_queued = 0
+        self.blocks_dropped = 0
+        self.max_latency = 0.0
+        self.max_queue_depth = 0
+        self.error = None
+
+        self._drain = drain
+        self._free = deque(np.empty((channel_count, block_size), dtype=dtype or np.int16) for i in range(block_count))
+        self._filled = queue.Queue()
+        self._running = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="PyAnalogDiscovery2 reader")
+        self._thread.daemon = True
+
+    def start(self):
+        ''' Starts the reader thread.
+        '''
+        self._running.set()
+        self._thread.start()
+
+    def stop(self):
+        ''' Stops the reader thread and waits for it to exit.  Blocks that
+            were already queued can still be read.
+        '''
+        self._running.clear()
+        if (self._thread.is_alive()):
+            self._thread.join()
+
+    def blocks(self, timeout = None):
+        ''' Yields the filled blocks as (channels x samples) views.  A block
+            is returned to the pool when the next one is requested, so copy it
+            if you need to keep it.  The generator ends when the acquisition is
+            done or the reader is stopped.
+        '''
+        previous = None
+        while True:
+            if (previous is not None):
+                self._free.append(previous)
+                previous = None
+            item = self._filled.get(timeout=timeout)
+            if (item is None):
+                if (self.error is not None):
+                    raise self.error
+                return
+            block, count, filled_time = item
+            self.max_latency = max(self.max_latency, time.perf_counter() - filled_time)
+            previous = block
+            yield block[:, :count]
+
+    def statistics(self):
+        ''' Returns a snapshot of the backpressure statistics.
+        '''
+        return {
+            "blocks_queued": self.blocks_queued,
+            "blocks_dropped": self.blocks_dropped,
+            "queue_depth": self._filled.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "max_latency": self.max_latency,
+        }
+
+    def _hand_off(self, block, count):
+        if (len(self._free) == 0):
+            # The consumer is behind, reuse this block rather than stall
+            self.blocks_dropped += 1
+            return block
+        self._filled.put((block, count, time.perf_counter()))
+        self.blocks_queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self._filled.qsize())
+        return self._free.popleft()
+
+    def _run(self):
+        block = self._free.popleft()
+        fill = 0
+        try:
+            while (self._running.is_set()):
+                done, chunks = self._drain()
+                for chunk in chunks:
+                    offset = 0
+                    while (offset < chunk.shape[1]):
+                        count = min(chunk.shape[1] - offset, self.block_size - fill)
+                        block[:, fill:fill + count] = chunk[:, offset:offset + count]
+                        fill += count
+                        offset += count
+                        if (fill == self.block_size):
+                            block = self._hand_off(block, fill)
+                            fill = 0
+                if (done):
+                    break
+                if (len(chunks) == 0):
+                    time.sleep(self.poll_interval)
+            if (fill > 0):
+                self._hand_off(block, fill)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._running.clear()
+            self._filled.put(None)
+
+class _DrainThread(object):
+    ''' Calls drain() on a dedicated thread until stopped, sleeping
+        poll_interval whenever it returns False because nothing was
+        received.  An exception stops the thread and is kept in error.
+        condition is notified when the thread exits, so consumers waiting on
+        it can raise the error.
+    '''
+    def __init__(self, drain, poll_interval, name, condition):
+        self.poll_interval = poll_interval
+        self.error = None
+        self._drain = drain
+        self._condition = condition
+        self._running = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name)
+        self._thread.daemon = True
+
+    def start(self):
+        self._running.set()
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        if (self._thread.is_alive()):
+            self._thread.join()
+
+    def check(self):
+        ''' Raises the error that stopped the thread, if any.
+        '''
+        if (self.error is not None):
+            raise self.error
+
+    def _run(self):
+        try:
+            while (self._running.is_set()):
+                if (not self._drain()):
+                    time.sleep(self.poll_interval)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._running.clear()
+            with self._condition:
+                self._condition.notify_all()
+
+def _wait(condition, predicate, reader, timeout):
+    ''' Waits on condition, which must be held, until predicate() is true,
+        the reader thread failed or timeout seconds passed.  Returns the
+        result of predicate().
+    '''
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    while True:
+        if (predicate()):
+            return True
+        reader.check()
+        if (deadline is None):
+            condition.wait()
+        else:
+            remaining = deadline - time.perf_counter()
+            if (remaining <= 0):
+                return predicate()
+            condition.wait(remaining)
+
+class _PlaybackConverter(object):
+    ''' Converts playback chunks from volts to the normalized float64
+        samples the device expects.  A thread converts into two alternating
+        buffers while the consumer writes the other one to the device.
+    '''
+    def __init__(self, source, chunk_size, amplitude, offset):
+        self.chunk_size = chunk_size
+        self.scale = 1.0 / amplitude
+        self.offset = offset
+        self.error = None
+
+        self._source = iter(source)
+        self._free = queue.Queue()
+        for i in range(2):
+            self._free.put(np.empty(chunk_size))
+        self._filled = queue.Queue()
+        self._buffer = None
+        self._index = 0
+        self._count = 0
+        self._done = False
+        self._running = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="PyAnalogDiscovery2 playback")
+        self._thread.daemon = True
+
+    def start(self):
+        self._running.set()
+        self._thread.start()
+
+    def stop(self):
+        self._running.clear()
+        self._free.put(None)
+        self._thread.join()
+
+    def exhausted(self):
+        ''' Returns True once every converted sample has been handed out.
+        '''
+        if (self._index == self._count and not self._done):
+            self._next_buffer(block = False)
+        return self._done and self._index == self._count
+
+    def next_segment(self, limit):
+        ''' Returns the address and length of up to limit converted samples
+            that are ready, or a length of 0 if there are none yet.
+        '''
+        if (self._index == self._count and not self._next_buffer(block = False)):
+            return 0, 0
+        count = min(limit, self._count - self._index)
+        address = self._buffer.ctypes.data + self._index * 8
+        self._index += count
+        return address, count
+
+    def read_into(self, samples):
+        ''' Fills samples with converted samples, waiting for the converter,
+            and returns how many were written.
+        '''
+        index = 0
+        while (index < len(samples)):
+            if (self._index == self._count and not self._next_buffer(block = True)):
+                break
+            count = min(len(samples) - index, self._count - self._index)
+            samples[index:index + count] = self._buffer[self._index:self._index + count]
+            self._index += count
+            index += count
+        return index
+
+    def _next_buffer(self, block):
+        if (self._done):
+            return False
+        try:
+            item = self._filled.get(block = block)
+        except queue.Empty:
+            return False
+        if (self._buffer is not None):
+            self._free.put(self._buffer)
+            self._buffer = None
+        if (item is None):
+            self._done = True
+            self._index = self._count = 0
+            if (self.error is not None):
+                raise self.error
+            return False
+        self._buffer, self._count = item
+        self._index = 0
+        return True
+
+    def _run(self):
+        try:
+            for chunk in self._source:
+                chunk = np.asarray(chunk).reshape(-1)
+                for start in range(0, len(chunk), self.chunk_size):
+                    piece = chunk[start:start + self.chunk_size]
+                    buffer = self._free.get()
+                    if (buffer is None or not self._running.is_set()):
+                        return
+                    converted = buffer[:len(piece)]
+                    np.subtract(piece, self.offset, out=converted, casting="unsafe")
+                    converted *= self.scale
+                    np.clip(converted, -1.0, 1.0, out=converted)
+                    self._filled.put((buffer, len(piece)))
+        except Exception as e:
+            self.error = e
+        finally:
+            self._filled.put(None)
+
 class PyAnalogDiscovery2:
     '''Analog Discovery 2 is a hardware device sold by Digilent which
        integrates a mixed-signal oscilloscope, function generator, digital
@@ -117,29 +1558,125 @@ class PyAnalogDiscovery2:
        form-factor device.  This class simply wraps that C-API, allowing us
        to control the device from python.
     '''
-    def __init__(self, configuration, device_index = -1, device_name = ''):
+    def __init__(self, configuration, device_index = -1, device_name = '', backend = None, error_checking = ErrorChecking.EVERY_CALL, instrumentation = None, serial_number = None):
         ''' Initialize the Analog Discovery 2 library.  This must be called at least
-            once for the application.
+            once for the application.  backend is "dwf" for the Digilent
+            library, "simulator" to run without a device, the path of a DWF
+            compatible shared library, or an object implementing the DWF
+            functions such as a configured SimulatedDwf.
+            The PYANALOGDISCOVERY2_BACKEND environment variable sets the
+            default.
+
+            Every DWF call that fails raises a PyAnalogDiscovery2Exception
+            with the error code and message of that call.  With
+            error_checking set to ErrorChecking.BATCH, SPI and I2C transfers
+            skip the per-call check and test the return codes instead,
+            stopping a batch at the first failed transaction.
+
+            Pass an Instrumentation to measure every DWF call and method of
+            the device and its sessions, see stats().
+
+            serial_number, when known, is recorded in capture files.
+            Otherwise it is enumerated when the first capture file is written.
         '''
+        dwf = _load_dwf(backend)
+        self.configuration = configuration
         self.device_name = device_name
-        if sys.platform.startswith("win"):
-            self.dwf = cdll.LoadLibrary("dwf.dll")
-        elif sys.platform.startswith("darwin"):
-            self.dwf = cdll.LoadLibrary("/Library/Frameworks/dwf.framework/dwf")
-        else:
-            self.dwf = cdll.LoadLibrary("libdwf.so")
+        self.device_index = device_index
+        self.serial_number = serial_number
+        self.error_checking = error_checking
+        self.instrumentation = instrumentation
+        self.dwf = _checked_dwf(dwf)
         self.hdwf = c_int(0)
-        self.dwf.FDwfDeviceConfigOpen(c_int(device_index), c_int(configuration), byref(self.hdwf))
+        if (instrumentation is not None):
+            self.dwf = instrumentation.wrap(self.dwf)
+            dwf = instrumentation.wrap(dwf)
+            instrumentation.instrument(self)
+        self._unchecked_dwf = dwf
+        # Functions called once per transaction by the SPI and I2C sessions
+        self._transaction_dwf = self.dwf if (error_checking == ErrorChecking.EVERY_CALL) else dwf
+        # Last value written to each setting, see _write_setting
+        self._settings = {}
+        self.auto_configure = True
+        # Open/short compensation sweeps per impedance analyzer configuration
+        self._impedance_compensations = {}
+        dwf.FDwfDeviceConfigOpen(device_index, configuration, byref(self.hdwf))
         if (self.hdwf.value == 0):
-            raise PyAnalogDiscovery2Exception(Status.ERROR_FAILED_TO_OPEN_DEVICE, self.dwf, self.hdwf)
+            raise PyAnalogDiscovery2Exception(Status.ERROR_FAILED_TO_OPEN_DEVICE, dwf, self.hdwf)
 
     def release(self):
         ''' Finalize the AnalogDiscovery2 library.
         '''
+        self._settings = {}
         self.dwf.FDwfDeviceClose(self.hdwf)
         self.dwf = None
         self.hdwf = None
 
+    def reset_device(self):
+        ''' Resets every instrument of the device to its default
+            configuration and forgets the settings it was sent.
+        '''
+        self._settings = {}
+        self.dwf.FDwfDeviceReset(self.hdwf)
+
+    def forget_settings(self):
+        ''' Forgets the settings the device was sent, so that the next
+            configure calls send all of them again.  Call it after the device
+            was reset outside this object, for example by another
+            PyAnalogDiscovery2 on the same handle or after a reconnect.
+        '''
+        self._settings = {}
+
+    def stats(self):
+        ''' Returns a snapshot of the call statistics of the device, or None
+            if it was opened without instrumentation.  See
+            Instrumentation.stats().
+        '''
+        if (self.instrumentation is None):
+            return None
+        return self.instrumentation.stats()
+
+    def _capture_serial_number(self):
+        ''' Returns the serial number for a capture file header, enumerating
+            it the first time if it was not given.
+        '''
+        if (self.serial_number is None):
+            self.serial_number = _enumerated_serial_number(self._unchecked_dwf, self.device_index)
+        return self.serial_number
+
+    def enable_auto_configure(self, enable):
+        ''' Enables or disables sending every setting to the device as soon
+            as it is written.  When disabled, the settings of an instrument
+            are sent together when it is configured or started, saving a
+            round trip per setting.
+        '''
+        self.dwf.FDwfDeviceAutoConfigureSet(self.hdwf, 1 if enable else 0)
+        self.auto_configure = enable
+
+    def _write_setting(self, function_name, *arguments):
+        ''' Calls the DWF setter function_name unless the device already
+            holds the value.  The last argument is the value, the others
+            select the setting.  Returns True if the setter was called.
+
+            The cache assumes that only this object changes the settings of
+            the device.  It is cleared by reset_device, release and the
+            reset_instrument of the sessions.  Anything else that resets the
+            device must be followed by forget_settings.
+        '''
+        key = (function_name,) + arguments[:-1]
+        if (key in self._settings and self._settings[key] == arguments[-1]):
+            return False
+        getattr(self.dwf, function_name)(self.hdwf, *arguments)
+        self._settings[key] = arguments[-1]
+        return True
+
+    def _forget_settings(self, prefix):
+        ''' Forgets the settings of the functions starting with prefix, after
+            the instrument they belong to was reset.
+        '''
+        for key in [key for key in self._settings if key[0].startswith(prefix)]:
+            del self._settings[key]
+
 #------------------------------------------------------------------------------
 
     def acquire_power_supply(self):
@@ -152,6 +1689,14 @@ class PyAnalogDiscovery2:
         def __init__(self, outer):
             self.dwf =  outer.dwf
             self.hdwf = outer.hdwf
+            self._device = outer
+
+            # Readings are stored in arguments that are allocated once
+            self._voltage = c_double(0.0)
+            self._current = c_double(0.0)
+            self._nodes = None
+            self._values = None
+            self._pointers = None
 
         def configure_positive_voltage_supply_output(self, voltage_level, current_limit):
             ''' Configures a positive voltage output on the V+ pin. This
@@ -159,9 +1704,10 @@ class PyAnalogDiscovery2:
                 configure to output voltage.
             '''
             if (voltage_level >= 0):
-                self.dwf.FDwfAnalogIOChannelNodeSet(self.hdwf, c_int(AnalogIoChannel.POSITIVE_SUPPLY), c_int(AnalogIoProperty.ENABLE), c_double(True))
-                self.dwf.FDwfAnalogIOChannelNodeSet(self.hdwf, c_int(AnalogIoChannel.POSITIVE_SUPPLY), c_int(AnalogIoProperty.VOLTAGE), c_double(voltage_level))
-                self.dwf.FDwfAnalogIOChannelNodeSet(self.hdwf, c_int(AnalogIoChannel.POSITIVE_SUPPLY), c_int(AnalogIoProperty.CURRENT), c_double(current_limit))
+                self._configure([
+                    self._device._write_setting("FDwfAnalogIOChannelNodeSet", AnalogIoChannel.POSITIVE_SUPPLY, AnalogIoProperty.ENABLE, True),
+                    self._device._write_setting("FDwfAnalogIOChannelNodeSet", AnalogIoChannel.POSITIVE_SUPPLY, AnalogIoProperty.VOLTAGE, voltage_level),
+                    self._device._write_setting("FDwfAnalogIOChannelNodeSet", AnalogIoChannel.POSITIVE_SUPPLY, AnalogIoProperty.CURRENT, current_limit)])
 
         def configure_negative_voltage_supply_output(self, voltage_level, current_limit):
             ''' Configures a voltage output on the specified channel. This
@@ -169,37 +1715,112 @@ class PyAnalogDiscovery2:
                 configure to output voltage.
             '''
             if (voltage_level <= 0):
-                self.dwf.FDwfAnalogIOChannelNodeSet(self.hdwf, c_int(AnalogIoChannel.NEGATIVE_SUPPLY), c_int(AnalogIoProperty.ENABLE), c_double(True))
-                self.dwf.FDwfAnalogIOChannelNodeSet(self.hdwf, c_int(AnalogIoChannel.NEGATIVE_SUPPLY), c_int(AnalogIoProperty.VOLTAGE), c_double(voltage_level))
-                self.dwf.FDwfAnalogIOChannelNodeSet(self.hdwf, c_int(AnalogIoChannel.NEGATIVE_SUPPLY), c_int(AnalogIoProperty.CURRENT), c_double(current_limit))
+                self._configure([
+                    self._device._write_setting("FDwfAnalogIOChannelNodeSet", AnalogIoChannel.NEGATIVE_SUPPLY, AnalogIoProperty.ENABLE, True),
+                    self._device._write_setting("FDwfAnalogIOChannelNodeSet", AnalogIoChannel.NEGATIVE_SUPPLY, AnalogIoProperty.VOLTAGE, voltage_level),
+                    self._device._write_setting("FDwfAnalogIOChannelNodeSet", AnalogIoChannel.NEGATIVE_SUPPLY, AnalogIoProperty.CURRENT, current_limit)])
 
         def enable_all_outputs(self, enable_outputs):
             ''' Enables or disables all outputs on all channels of the
                 instrument.
             '''
-            self.dwf.FDwfAnalogIOEnableSet(self.hdwf, c_int(enable_outputs))
+            self._configure([self._device._write_setting("FDwfAnalogIOEnableSet", enable_outputs)])
+
+        def _configure(self, changed):
+            ''' Sends the settings written when auto configure is disabled.
+                changed holds the results of _write_setting.
+            '''
+            if (any(changed) and not self._device.auto_configure):
+                self.dwf.FDwfAnalogIOConfigure(self.hdwf)
 
         def read_positive_supply_output(self):
-            ''' Reads the voltage and current levels of the specified channel.
+            ''' Reads the voltage and current levels of the V+ supply.
             '''
-            actual_voltage_level = c_double(0.0)
-            actual_current_level = c_double(0.0)
-            if (self.dwf.FDwfAnalogIOStatus(self.hdwf) != 0):
-                self.dwf.FDwfAnalogIOChannelNodeStatus(self.hdwf, c_int(AnalogIoChannel.POSITIVE_SUPPLY), c_int(AnalogIoProperty.VOLTAGE), byref(actual_voltage_level))
-                self.dwf.FDwfAnalogIOChannelNodeStatus(self.hdwf, c_int(AnalogIoChannel.POSITIVE_SUPPLY), c_int(AnalogIoProperty.CURRENT), byref(actual_current_level))
-            return actual_voltage_level.value, actual_current_level.value
+            return self._read_supply_output(AnalogIoChannel.POSITIVE_SUPPLY)
 
         def read_negative_supply_output(self):
-            ''' Reads the voltage and current levels of the specified channel.
+            ''' Reads the voltage and current levels of the V- supply.
             '''
-            actual_voltage_level = c_double(0.0)
-            actual_current_level = c_double(0.0)
-            if (self.dwf.FDwfAnalogIOStatus(self.hdwf) != 0):
-                self.dwf.FDwfAnalogIOChannelNodeStatus(self.hdwf, c_int(AnalogIoChannel.POSITIVE_SUPPLY), c_int(AnalogIoProperty.VOLTAGE), byref(actual_voltage_level))
-                self.dwf.FDwfAnalogIOChannelNodeStatus(self.hdwf, c_int(AnalogIoChannel.POSITIVE_SUPPLY), c_int(AnalogIoProperty.CURRENT), byref(actual_current_level))
-            return actual_voltage_level.value, actual_current_level.value
+            return self._read_supply_output(AnalogIoChannel.NEGATIVE_SUPPLY)
 
-#------------------------------------------------------------------------------
+        def telemetry_nodes(self):
+            ''' Returns the TelemetryNode list of every monitored node the
+                device reports (V+/V- voltage and current, and the USB or
+                auxiliary supply monitors where present).  The list is
+                discovered once and cached.
+            '''
+            if (self._nodes is None):
+                nodes = []
+                channel_count = c_int(0)
+                node_count = c_int(0)
+                node_type = c_ubyte(0)
+                minimum = c_double(0.0)
+                maximum = c_double(0.0)
+                steps = c_int(0)
+                label = create_string_buffer(16)
+                name = create_string_buffer(32)
+                node_name = create_string_buffer(32)
+                units = create_string_buffer(16)
+                self.dwf.FDwfAnalogIOChannelCount(self.hdwf, byref(channel_count))
+                for channel in range(channel_count.value):
+                    self.dwf.FDwfAnalogIOChannelName(self.hdwf, channel, name, label)
+                    self.dwf.FDwfAnalogIOChannelInfo(self.hdwf, channel, byref(node_count))
+                    for node in range(node_count.value):
+                        self.dwf.FDwfAnalogIOChannelNodeInfo(self.hdwf, channel, node, byref(node_type))
+                        if (node_type.value == AnalogIoNodeType.ENABLE):
+                            continue
+                        # Nodes that are only settings have no status range
+                        steps.value = 0
+                        self.dwf.FDwfAnalogIOChannelNodeStatusInfo(self.hdwf, channel, node, byref(minimum), byref(maximum), byref(steps))
+                        if (steps.value <= 0):
+                            continue
+                        self.dwf.FDwfAnalogIOChannelNodeName(self.hdwf, channel, node, node_name, units)
+                        nodes.append(TelemetryNode(channel, node, "%s %s" % (label.value.decode(), node_name.value.decode()), units.value.decode()))
+                self._nodes = nodes
+                self._values = (c_double * len(nodes))()
+                self._pointers = [(c_int(node.channel), c_int(node.node), byref(self._values, i * 8)) for i, node in enumerate(nodes)]
+                self._node_status = _unprototyped(self.dwf, "FDwfAnalogIOChannelNodeStatus")
+            return self._nodes
+
+        def read_all(self):
+            ''' Reads every telemetry node after a single FDwfAnalogIOStatus
+                and returns the values in telemetry_nodes() order.
+            '''
+            self._read_nodes()
+            return list(self._values)
+
+        def create_recorder(self, rate = None, capacity = 4096, filename = None, capture_filename = None):
+            ''' Returns a PowerSupplyRecorder that samples every telemetry
+                node rate times per second, or as fast as the device answers
+                if rate is None.
+            '''
+            return PowerSupplyRecorder(self, rate, capacity, filename, capture_filename)
+
+        def _read_supply_output(self, channel):
+            self._voltage.value = 0.0
+            self._current.value = 0.0
+            if (self.dwf.FDwfAnalogIOStatus(self.hdwf) != 0):
+                self.dwf.FDwfAnalogIOChannelNodeStatus(self.hdwf, channel, AnalogIoProperty.VOLTAGE, byref(self._voltage))
+                self.dwf.FDwfAnalogIOChannelNodeStatus(self.hdwf, channel, AnalogIoProperty.CURRENT, byref(self._current))
+            return self._voltage.value, self._current.value
+
+        def _read_nodes(self):
+            ''' Reads all telemetry nodes into the preallocated values array.
+                Returns False if the device status could not be read.
+            '''
+            if (self._pointers is None):
+                self.telemetry_nodes()
+            if (self.dwf.FDwfAnalogIOStatus(self.hdwf) == 0):
+                return False
+            # The unprototyped function skips the errcheck hook, so test the
+            # return codes here
+            node_status = self._node_status
+            for channel, node, pointer in self._pointers:
+                if (not node_status(self.hdwf, channel, node, pointer)):
+                    raise _dwf_failure(self.dwf, self.hdwf, "FDwfAnalogIOChannelNodeStatus")
+            return True
+
+#------------------------------------------------------------------------------
 
     def acquire_serial_peripheral_interface(self, reset = True):
         ''' Creates and returns a new SPI session for the device. The session 
@@ -227,27 +1848,51 @@ class PyAnalogDiscovery2:
             self.sclk = Pins.DIO_1
             self.mosi = Pins.DIO_2
             self.miso = Pins.DIO_3
+            self.dq2 = Pins.DIO_4
+            self.dq3 = Pins.DIO_5
+            self.bits_per_word = 8
+            self.data_lanes = SpiDataLanes.STANDARD
+            self._transaction_dwf = outer._transaction_dwf
+            self._unchecked_dwf = outer._unchecked_dwf
+            self._write_setting = outer._write_setting
+            self._forget_settings = outer._forget_settings
+            self._cache_arguments()
 
             if (reset == True):
-                self.dwf.FDwfDigitalSpiReset()
+                self.reset_instrument()
 
-        def configure_bus(self, cs, sclk, mosi, miso, clock_rate, clock_polarity = Polarity.IDLE_LOW, clock_phase = ClockPhase.FIRST_EDGE, chip_select_polarity = Polarity.IDLE_HIGH):
+        def configure_bus(self, cs, sclk, mosi, miso, clock_rate, clock_polarity = Polarity.IDLE_LOW, clock_phase = ClockPhase.FIRST_EDGE, chip_select_polarity = Polarity.IDLE_HIGH, bits_per_word = 8, data_lanes = SpiDataLanes.STANDARD, dq2 = Pins.DIO_4, dq3 = Pins.DIO_5):
             ''' Configures the basic parameters of the SPI engine.
+
+                bits_per_word can be anything from 1 to 32.  Words of up to 8
+                bits are exchanged as bytes, up to 16 bits as 16-bit words and
+                up to 32 bits as 32-bit words.  With dual or quad data_lanes,
+                mosi and miso are DQ0 and DQ1, and quad also uses dq2 and dq3.
             '''
+            if (bits_per_word < 1 or bits_per_word > 32):
+                raise ValueError("bits_per_word must be between 1 and 32")
             self.cs = cs
             self.sclk = sclk
             self.mosi = mosi
             self.miso = miso
+            self.dq2 = dq2
+            self.dq3 = dq3
             self.clock_rate = clock_rate
             self.clock_polarity = clock_polarity
             self.clock_phase = clock_phase
             self.chip_select_polarity = chip_select_polarity
+            self.bits_per_word = bits_per_word
+            self.data_lanes = data_lanes
 
-            self.dwf.FDwfDigitalSpiFrequencySet(self.hdwf, c_double(self.clock_rate))
-            self.dwf.FDwfDigitalSpiClockSet(self.hdwf, c_int(self.sclk))
+            # Settings the device already holds are not sent again
+            self._write_setting("FDwfDigitalSpiFrequencySet", self.clock_rate)
+            self._write_setting("FDwfDigitalSpiClockSet", self.sclk)
 
-            self.dwf.FDwfDigitalSpiDataSet(self.hdwf, c_int(0), c_int(mosi)) # 0 DQ0_MOSI_SISO
-            self.dwf.FDwfDigitalSpiDataSet(self.hdwf, c_int(1), c_int(miso)) # 1 DQ1_MISO
+            self._write_setting("FDwfDigitalSpiDataSet", 0, mosi) # 0 DQ0_MOSI_SISO
+            self._write_setting("FDwfDigitalSpiDataSet", 1, miso) # 1 DQ1_MISO
+            if (data_lanes == SpiDataLanes.QUAD):
+                self._write_setting("FDwfDigitalSpiDataSet", 2, dq2) # 2 DQ2
+                self._write_setting("FDwfDigitalSpiDataSet", 3, dq3) # 3 DQ3
 
             spi_mode = 0
             if clock_polarity == Polarity.IDLE_LOW and clock_phase == ClockPhase.FIRST_EDGE:
@@ -258,43 +1903,182 @@ class PyAnalogDiscovery2:
                 spi_mode = 2
             elif clock_polarity == Polarity.IDLE_HIGH and clock_phase == ClockPhase.SECOND_EDGE:
                 spi_mode = 3
-            self.dwf.FDwfDigitalSpiModeSet(self.hdwf, c_int(spi_mode))
-            self.dwf.FDwfDigitalSpiOrderSet(self.hdwf, c_int(1)) # 1 MSB first
-            self.dwf.FDwfDigitalSpiSelect(self.hdwf, c_int(self.cs), c_int(chip_select_polarity))
+            self._write_setting("FDwfDigitalSpiModeSet", spi_mode)
+            self._write_setting("FDwfDigitalSpiOrderSet", 1) # 1 MSB first
+            # Drives chip select to its idle level, so it is sent every time
+            self.dwf.FDwfDigitalSpiSelect(self.hdwf, self.cs, chip_select_polarity)
+            self._cache_arguments()
 
         def write_read(self, write_data, read_data_size):
             ''' Completes a transaction on the bus by writing the provided data
                 to MOSI and returning the data read on MISO.
             '''
-            read_data_out = []
-            read_data = (c_uint8 * read_data_size)()
-            local_write_data = (c_uint8 * len(write_data))(*write_data)
-            # Todo: FIX ME
-            cdq = c_int(1)
-            bits_per_word = c_int(8)
-            
-            # toggle Chip Select Line - ready to start communication
-            if (self.chip_select_polarity == Polarity.IDLE_HIGH):
-                self.dwf.FDwfDigitalSpiSelect(self.hdwf, c_int(self.cs), c_int(0)) # Pull low
-            else:
-                self.dwf.FDwfDigitalSpiSelect(self.hdwf, c_int(self.cs), c_int(1)) # Pull high
+            read_data = (self._word_type * read_data_size)()
+            write_argument, write_size = self._words(write_data)
+            self._transaction(self._write_read, self._bits_per_word, write_argument, write_size, read_data, read_data_size)
+            return list(read_data)
+
+        def write(self, write_data):
+            ''' Completes a write-only transaction on the bus.  Nothing is
+                read back, which saves the time and transfer of the unused
+                direction.
+            '''
+            write_argument, write_size = self._words(write_data)
+            self._transaction(self._write, self._bits_per_word, write_argument, write_size)
+
+        def write_one(self, value, bit_count = None):
+            ''' Writes a single word of bit_count bits (by default the
+                configured word size) without building a buffer.
+            '''
+            self._transaction(self._write_one, self.bits_per_word if bit_count is None else bit_count, value)
+
+        def read(self, read_data_size):
+            ''' Completes a read-only transaction on the bus and returns the
+                words read.  Nothing is driven on the data lines.
+            '''
+            read_data = (self._word_type * read_data_size)()
+            self._transaction(self._read, self._bits_per_word, read_data, read_data_size)
+            return list(read_data)
+
+        def read_into(self, read_buffer):
+            ''' Buffer-protocol variant of read.  Fills read_buffer, which can
+                be a bytearray, memoryview or NumPy array matching the word
+                size, in place and returns it.
+            '''
+            read_argument, read_size = _buffer_argument(read_buffer)
+            self._transaction(self._read, self._bits_per_word, read_argument, read_size // self._word_size)
+            return read_buffer
+
+        def write_read_into(self, write_buffer, read_buffer):
+            ''' Completes a transaction on the bus by writing write_buffer to
+                MOSI and filling read_buffer from MISO.  Both accept bytes,
+                bytearray, memoryview or NumPy arrays matching the word size;
+                read_buffer must be writable.  Returns read_buffer.
+            '''
+            write_argument, write_size = _buffer_argument(write_buffer)
+            read_argument, read_size = _buffer_argument(read_buffer)
+            self._transaction(self._write_read, self._bits_per_word, write_argument, write_size // self._word_size, read_argument, read_size // self._word_size)
+            return read_buffer
+
+        def transfer_many(self, write_data_list, read_data_sizes):
+            ''' Completes one transaction per entry of write_data_list, toggling
+                chip select around each one, and returns a list with the data
+                read by each transaction: bytes for words of up to 8 bits,
+                array.array of 16 or 32-bit words otherwise.  Use this instead
+                of calling write_read in a loop when reading thousands of small
+                transactions, such as draining a sensor FIFO.
+            '''
+            write_data_list = [array(self._typecode, write_data) for write_data in write_data_list]
+            write_data = array(self._typecode)
+            for words in write_data_list:
+                write_data.extend(words)
+            read_data = array(self._typecode, bytes(sum(read_data_sizes) * self._word_size))
+
+            # Address every transaction inside two contiguous buffers
+            select = self._select
+            write_read = self._write_read
+            hdwf, cs, cs_active, cs_idle = self.hdwf, self._cs, self._cs_active, self._cs_idle
+            cdq, bits_per_word, word_size = self._cdq, self._bits_per_word, self._word_size
+            write_address = write_data.buffer_info()[0]
+            read_address = read_data.buffer_info()[0]
+            try:
+                for write_size, read_size in zip(map(len, write_data_list), read_data_sizes):
+                    if (not (select(hdwf, cs, cs_active) and
+                             write_read(hdwf, cdq, bits_per_word, write_address, write_size, read_address, read_size) and
+                             select(hdwf, cs, cs_idle))):
+                        raise _dwf_failure(self.dwf, hdwf, "SPI transaction")
+                    write_address += write_size * word_size
+                    read_address += read_size * word_size
+            except PyAnalogDiscovery2Exception:
+                self._deselect(hdwf, cs, cs_idle)
+                raise
 
-            self.dwf.FDwfDigitalSpiWriteRead(self.hdwf, cdq, bits_per_word, local_write_data, c_int(len(local_write_data)), byref(read_data), c_int(read_data_size))
+            results = []
+            offset = 0
+            for read_size in read_data_sizes:
+                results.append(read_data[offset:offset + read_size])
+                offset += read_size
+            if (word_size == 1):
+                return [result.tobytes() for result in results]
+            return results
+
+        def transfer_many_into(self, write_buffers, read_buffers):
+            ''' Buffer-protocol variant of transfer_many.  Reads the data of
+                each transaction into the matching entry of read_buffers in
+                place and returns read_buffers.
+            '''
+            select = self._select
+            write_read = self._write_read
+            hdwf, cs, cs_active, cs_idle = self.hdwf, self._cs, self._cs_active, self._cs_idle
+            cdq, bits_per_word, word_size = self._cdq, self._bits_per_word, self._word_size
+            try:
+                for write_buffer, read_buffer in zip(write_buffers, read_buffers):
+                    write_argument, write_size = _buffer_argument(write_buffer)
+                    read_argument, read_size = _buffer_argument(read_buffer)
+                    if (not (select(hdwf, cs, cs_active) and
+                             write_read(hdwf, cdq, bits_per_word, write_argument, write_size // word_size, read_argument, read_size // word_size) and
+                             select(hdwf, cs, cs_idle))):
+                        raise _dwf_failure(self.dwf, hdwf, "SPI transaction")
+            except PyAnalogDiscovery2Exception:
+                self._deselect(hdwf, cs, cs_idle)
+                raise
+            return read_buffers
 
-            # toggle Chip Select Line - finished communication
+        def _transaction(self, function, *arguments):
+            ''' Calls function(hdwf, cdq, *arguments) with chip select
+                asserted.  On failure the error is read before chip select is
+                released, as the release clears it.
+            '''
+            try:
+                if (not (self._select(self.hdwf, self._cs, self._cs_active) and
+                         function(self.hdwf, self._cdq, *arguments) and
+                         self._select(self.hdwf, self._cs, self._cs_idle))):
+                    raise _dwf_failure(self.dwf, self.hdwf, "SPI transaction")
+            except PyAnalogDiscovery2Exception:
+                self._deselect(self.hdwf, self._cs, self._cs_idle)
+                raise
+
+        def _words(self, data):
+            ''' Converts a sequence of integers to a ctypes argument of the
+                configured word size and returns it with its length in words.
+            '''
+            if (self._word_size == 1):
+                data = bytes(data)
+                return data, len(data)
+            data = array(self._typecode, data)
+            return (self._word_type * len(data)).from_buffer(data), len(data)
+
+        def _cache_arguments(self):
+            ''' Looks up the DWF functions and arguments reused by every transaction.
+            '''
+            if (self.bits_per_word <= 8):
+                self._word_size, self._word_type, self._typecode, suffix = 1, c_ubyte, "B", ""
+            elif (self.bits_per_word <= 16):
+                self._word_size, self._word_type, self._typecode, suffix = 2, c_ushort, "H", "16"
+            else:
+                self._word_size, self._word_type, self._typecode, suffix = 4, c_uint, _UINT32_TYPECODE, "32"
+            self._select = self._transaction_dwf.FDwfDigitalSpiSelect
+            self._deselect = self._unchecked_dwf.FDwfDigitalSpiSelect
+            self._write_read = getattr(self._transaction_dwf, "FDwfDigitalSpiWriteRead" + suffix)
+            self._write = getattr(self._transaction_dwf, "FDwfDigitalSpiWrite" + suffix)
+            self._read = getattr(self._transaction_dwf, "FDwfDigitalSpiRead" + suffix)
+            self._write_one = self._transaction_dwf.FDwfDigitalSpiWriteOne
+            self._cs = int(self.cs)
             if (self.chip_select_polarity == Polarity.IDLE_HIGH):
-                self.dwf.FDwfDigitalSpiSelect(self.hdwf, c_int(self.cs), c_int(1)) # Pull high (Idle)
+                self._cs_active = 0 # Pull low
+                self._cs_idle = 1 # Pull high (Idle)
             else:
-                self.dwf.FDwfDigitalSpiSelect(self.hdwf, c_int(self.cs), c_int(0)) # Pull low
-
-            for i in range(read_data_size): read_data_out.append(read_data[i])
-            return read_data_out
+                self._cs_active = 1 # Pull high
+                self._cs_idle = 0 # Pull low (Idle)
+            self._cdq = int(self.data_lanes)
+            self._bits_per_word = int(self.bits_per_word)
 
         def reset_instrument(self):
             ''' Resets the session configuration to default values, and resets
                 the device and driver software to a known state.
             '''
-            self.dwf.FDwfDigitalSpiReset()
+            self.dwf.FDwfDigitalSpiReset(self.hdwf)
+            self._forget_settings("FDwfDigitalSpi")
 
 
 #------------------------------------------------------------------------------
@@ -315,43 +2099,1827 @@ class PyAnalogDiscovery2:
             self.dwf =  outer.dwf
             self.hdwf = outer.hdwf
             self.address = 0
+            self.scl = Pins.DIO_0
+            self.sda = Pins.DIO_1
+
+            # Register map defaults, see configure_register_map
+            self.register_address_size = 1
+            self.max_burst_length = 32
+            self.retries = 0
+            self.retry_delay = 0.001
+            self.retry_backoff = 2.0
+
+            self._nak = c_int()
+            self._write = outer._transaction_dwf.FDwfDigitalI2cWrite
+            self._write_one = outer._transaction_dwf.FDwfDigitalI2cWriteOne
+            self._read = outer._transaction_dwf.FDwfDigitalI2cRead
+            self._write_read = outer._transaction_dwf.FDwfDigitalI2cWriteRead
+            self._write_setting = outer._write_setting
+            self._forget_settings = outer._forget_settings
             if (reset == True):
-                self.dwf.FDwfDigitalI2cReset()
+                self.reset_instrument()
 
-        def configure_bus(self, i2c_clock_rate, address, scl_pin, sda_pin, clock_stretching_enabled = True):
+        def configure_bus(self, i2c_clock_rate, address, scl_pin, sda_pin, clock_stretching_enabled = True, nak_last_read_byte = True):
             ''' Configures the basic parameters of the I2C engine.
             '''
             inak = c_int()
             self.address = address
-            self.dwf.FDwfDigitalI2cRateSet(self.hdwf, c_double(i2c_clock_rate))
-            self.dwf.FDwfDigitalI2cSclSet(self.hdwf, c_int(scl_pin))
-            self.dwf.FDwfDigitalI2cSdaSet(self.hdwf, c_int(sda_pin))
-            if (clock_stretching_enabled == True):
-                self.dwf.FDwfDigitalI2cStretchSet(self.hdwf, c_int(1))
-            else:
-                self.dwf.FDwfDigitalI2cStretchSet(self.hdwf, c_int(0))
+            self.scl = scl_pin
+            self.sda = sda_pin
+            self._write_setting("FDwfDigitalI2cRateSet", i2c_clock_rate)
+            self._write_setting("FDwfDigitalI2cSclSet", scl_pin)
+            self._write_setting("FDwfDigitalI2cSdaSet", sda_pin)
+            self._write_setting("FDwfDigitalI2cStretchSet", 1 if clock_stretching_enabled == True else 0)
+            self._write_setting("FDwfDigitalI2cReadNakSet", nak_last_read_byte)
+            # Always checked, the bus may have got stuck since the last time
             self.dwf.FDwfDigitalI2cClear(self.hdwf, byref(inak))
             if (inak.value == 0):
+                self._forget_settings("FDwfDigitalI2c")
                 raise PyAnalogDiscovery2Exception(Status.ERROR_I2C_BUS_ERROR_CHECK_THE_PULLUPS, self.dwf, self.hdwf)
 
-        def write_read(self, write_data, read_data_size):
+        def configure_register_map(self, register_address_size = 1, max_burst_length = 32, retries = 0, retry_delay = 0.001, retry_backoff = 2.0):
+            ''' Configures the register map helpers (read_registers,
+                write_registers and bulk_read).  Register addresses are sent
+                MSB first using register_address_size bytes.  A transfer of
+                any of the transfer methods that is not acknowledged is retried
+                up to retries times, waiting retry_delay seconds before the
+                first retry and multiplying the delay by retry_backoff after
+                each one.
+            '''
+            self.register_address_size = register_address_size
+            self.max_burst_length = max_burst_length
+            self.retries = retries
+            self.retry_delay = retry_delay
+            self.retry_backoff = retry_backoff
+
+        def write_read(self, write_data, read_data_size, address = None):
             ''' Performs a write followed by read (combined format) on an I2C
-                slave device.
+                slave device and returns an I2cTransfer.  Every transfer method
+                takes an optional address that overrides the one given to
+                configure_bus, so one session can talk to every device on the
+                bus.  A NAK is reported in the nak field of the I2cTransfer,
+                after the retries set by configure_register_map.
+            '''
+            read_data = (c_uint8 * read_data_size)()
+            local_write_data = bytes(write_data)
+            return self._retry(read_data, self._write_read, self._address8(address), local_write_data, len(local_write_data), read_data, read_data_size)
+
+        def write(self, write_data, address = None):
+            ''' Performs a write-only transfer and returns an I2cTransfer.
+                Single bytes go through FDwfDigitalI2cWriteOne.
+            '''
+            local_write_data = bytes(write_data)
+            if (len(local_write_data) == 1):
+                return self._retry(b"", self._write_one, self._address8(address), local_write_data[0])
+            return self._retry(b"", self._write, self._address8(address), local_write_data, len(local_write_data))
+
+        def read(self, read_data_size, address = None):
+            ''' Performs a read-only transfer and returns an I2cTransfer.
             '''
-            inak = c_int()
-            read_data_out = []
             read_data = (c_uint8 * read_data_size)()
-            write_data_len = c_int(len(write_data))
-            local_write_data = (c_uint8 * write_data_len.value)(*write_data)
-            self.dwf.FDwfDigitalI2cWriteRead(self.hdwf, c_int(self.address<<1), local_write_data, write_data_len, byref(read_data), c_int(read_data_size), byref(inak))
-            if (inak.value != 0):
-                print("Device Data NAK " + str(inak.value))
-            for i in range(read_data_size): read_data_out.append(read_data[i])
-            return read_data_out
+            return self._retry(read_data, self._read, self._address8(address), read_data, read_data_size)
+
+        def read_registers(self, start_register, register_count, address = None):
+            ''' Reads register_count consecutive registers starting at
+                start_register in one burst and returns an I2cTransfer whose
+                data holds the register values.
+            '''
+            register = start_register.to_bytes(self.register_address_size, "big")
+            read_data = (c_uint8 * register_count)()
+            return self._retry(read_data, self._write_read, self._address8(address), register, len(register), read_data, register_count)
+
+        def write_registers(self, start_register, register_data, address = None):
+            ''' Writes register_data to consecutive registers starting at
+                start_register in one burst and returns an I2cTransfer.
+            '''
+            return self.write(start_register.to_bytes(self.register_address_size, "big") + bytes(register_data), address)
+
+        def bulk_read(self, registers, max_gap = 0, address = None):
+            ''' Reads a list of registers and returns a dictionary of register
+                values.  Contiguous registers are coalesced into bursts of at
+                most max_burst_length; gaps of up to max_gap unused registers
+                are read through rather than starting a new transfer.  Registers
+                of a burst that was not acknowledged map to None.
+            '''
+            values = {}
+            for start_register, register_count in _coalesce_registers(registers, self.max_burst_length, max_gap):
+                transfer = self.read_registers(start_register, register_count, address)
+                for i in range(register_count):
+                    values[start_register + i] = None if transfer.nak else transfer.data[i]
+            return dict((register, values[register]) for register in registers)
+
+        def scan(self, addresses = range(0x08, 0x78)):
+            ''' Returns the 7-bit addresses that acknowledge a zero-length
+                write.  Reserved addresses are skipped by default.
+            '''
+            found = []
+            for address in addresses:
+                if (not self._write(self.hdwf, address << 1, None, 0, byref(self._nak))):
+                    raise _dwf_failure(self.dwf, self.hdwf, "I2C transfer")
+                if (self._nak.value == 0):
+                    found.append(address)
+            return found
+
+        def create_poller(self, targets, rate):
+            ''' Returns an I2cPoller that reads every (address, register,
+                length) tuple of targets rate times per second.
+            '''
+            return I2cPoller(self, targets, rate)
+
+        def _address8(self, address):
+            return (self.address if address is None else address) << 1
+
+        def _retry(self, read_data, function, *args):
+            ''' Calls a DWF I2C function until it is acknowledged or the
+                retries are used up, and returns read_data as an I2cTransfer.
+            '''
+            delay = self.retry_delay
+            attempt = 1
+            while True:
+                if (not function(self.hdwf, *(args + (byref(self._nak),)))):
+                    raise _dwf_failure(self.dwf, self.hdwf, "I2C transfer")
+                if (self._nak.value == 0 or attempt > self.retries):
+                    return I2cTransfer(bytes(read_data), self._nak.value, attempt)
+                time.sleep(delay)
+                delay *= self.retry_backoff
+                attempt += 1
+
+        def reset_instrument(self):
+            ''' Resets the session configuration to default values, and resets
+                the device and driver software to a known state.
+            '''
+            self.dwf.FDwfDigitalI2cReset(self.hdwf)
+            self._forget_settings("FDwfDigitalI2c")
+
+
+#------------------------------------------------------------------------------
+
+    def acquire_uart(self, reset = True):
+        ''' Creates and returns a new UART session for the device. The session
+            is used in all subsequent UART method calls. This method should be
+            called once per session.
+
+            Received bytes are drained from the device on a background thread
+            into a preallocated ring buffer, so nothing is lost while the
+            application is busy.  Call start() to begin receiving.
+        '''
+        return self.Uart(self, reset)
+
+    class Uart(object):
+        def __init__(self, outer, reset):
+            self.dwf =  outer.dwf
+            self.hdwf = outer.hdwf
+
+            # Some sensible default values
+            self.baud_rate = 9600.0
+            self.tx = Pins.DIO_0
+            self.rx = Pins.DIO_1
+            self.data_bits = 8
+            self.parity = UartParity.NONE
+            self.stop_bits = 1.0
+
+            # Counters
+            self.received_bytes = 0
+            self.overflows = 0 # bytes dropped because the ring buffer was full
+            self.device_overflows = 0 # reads where the device buffer had overflowed
+            self.parity_errors = 0 # reads that reported a parity error
+
+            self._write_setting = outer._write_setting
+            self._forget_settings = outer._forget_settings
+            self._ring = None
+            self._start = 0
+            self._length = 0
+            self._scanned = 0
+            self._condition = threading.Condition()
+            self._reader = None
+            self._count = c_int(0)
+            self._parity = c_int(0)
+
+            if (reset == True):
+                self.reset_instrument()
+
+        def configure_bus(self, baud_rate, tx_pin, rx_pin, data_bits = 8, parity = UartParity.NONE, stop_bits = 1.0):
+            ''' Configures the basic parameters of the UART engine.
+            '''
+            self.baud_rate = baud_rate
+            self.tx = tx_pin
+            self.rx = rx_pin
+            self.data_bits = data_bits
+            self.parity = parity
+            self.stop_bits = stop_bits
+            self._write_setting("FDwfDigitalUartRateSet", baud_rate)
+            self._write_setting("FDwfDigitalUartBitsSet", data_bits)
+            self._write_setting("FDwfDigitalUartParitySet", parity)
+            self._write_setting("FDwfDigitalUartStopSet", stop_bits)
+            self._write_setting("FDwfDigitalUartTxSet", tx_pin)
+            self._write_setting("FDwfDigitalUartRxSet", rx_pin)
+            self.dwf.FDwfDigitalUartTx(self.hdwf, None, 0) # drive TX idle
+
+        def start(self, buffer_size = 1 << 20, chunk_size = 4096, poll_interval = 0.001):
+            ''' Starts receiving into a ring buffer of buffer_size bytes.  The
+                device is read chunk_size bytes at a time, immediately again
+                while it has data and every poll_interval seconds otherwise.
+                When the application does not keep up, the oldest bytes are
+                dropped and counted in overflows.
+            '''
+            self.stop()
+            self._ring = bytearray(buffer_size)
+            self._start = 0
+            self._length = 0
+            self._scanned = 0
+            self._chunk = bytearray(chunk_size)
+            self._chunk_argument = (c_char * chunk_size).from_buffer(self._chunk)
+            self._rx = self.dwf.FDwfDigitalUartRx
+            self._rx(self.hdwf, None, 0, byref(self._count), byref(self._parity)) # start receiving
+            self._reader = _DrainThread(self._drain, poll_interval, "PyAnalogDiscovery2 UART", self._condition)
+            self._reader.start()
+
+        def stop(self):
+            ''' Stops receiving.  Bytes already received can still be read.
+            '''
+            if (self._reader is not None):
+                self._reader.stop()
+
+        def write(self, data):
+            ''' Transmits data, a bytes-like object.
+            '''
+            data = bytes(data)
+            self.dwf.FDwfDigitalUartTx(self.hdwf, data, len(data))
+
+        def available(self):
+            ''' Returns the number of received bytes waiting to be read.
+            '''
+            return self._length
+
+        def read(self, size = -1, timeout = 0.0):
+            ''' Returns up to size received bytes, all of them if size is -1.
+                Waits up to timeout seconds (forever if None) for size bytes
+                to arrive, then returns what is there.
+            '''
+            if (self._reader is None):
+                raise RuntimeError("The UART receiver was not started, call start() first")
+            with self._condition:
+                if (size >= 0):
+                    _wait(self._condition, lambda: self._length >= size, self._reader, timeout)
+                else:
+                    self._reader.check()
+                return self._take(self._length if size < 0 else min(size, self._length))
+
+        def readline(self, timeout = None, terminator = b"\n"):
+            ''' Returns the next line including terminator.  If no complete
+                line arrives within timeout seconds, returns the partial line.
+            '''
+            if (self._reader is None):
+                raise RuntimeError("The UART receiver was not started, call start() first")
+            with self._condition:
+                _wait(self._condition, lambda: self._find(terminator) >= 0, self._reader, timeout)
+                end = self._find(terminator)
+                return self._take(self._length if end < 0 else end + len(terminator))
+
+        def statistics(self):
+            ''' Returns a snapshot of the receive counters.
+            '''
+            return {
+                "received_bytes": self.received_bytes,
+                "available": self._length,
+                "overflows": self.overflows,
+                "device_overflows": self.device_overflows,
+                "parity_errors": self.parity_errors,
+            }
 
         def reset_instrument(self):
             ''' Resets the session configuration to default values, and resets
                 the device and driver software to a known state.
             '''
-            self.dwf.FDwfDigitalI2cReset()
+            self.dwf.FDwfDigitalUartReset(self.hdwf)
+            self._forget_settings("FDwfDigitalUart")
+
+        def _drain(self):
+            self._rx(self.hdwf, self._chunk_argument, len(self._chunk), byref(self._count), byref(self._parity))
+            if (self._parity.value < 0):
+                self.device_overflows += 1
+            elif (self._parity.value > 0):
+                self.parity_errors += 1
+            count = self._count.value
+            if (count == 0):
+                return False
+            with self._condition:
+                self._append(memoryview(self._chunk)[:count])
+                self._condition.notify_all()
+            self.received_bytes += count
+            return True
+
+        def _append(self, data):
+            size = len(self._ring)
+            if (len(data) > size):
+                self.overflows += len(data) - size
+                data = data[len(data) - size:]
+            dropped = self._length + len(data) - size
+            if (dropped > 0):
+                # Keep the newest bytes
+                self.overflows += dropped
+                self._start = (self._start + dropped) % size
+                self._length -= dropped
+                self._scanned = max(0, self._scanned - dropped)
+            end = (self._start + self._length) % size
+            first = min(len(data), size - end)
+            self._ring[end:end + first] = data[:first]
+            self._ring[:len(data) - first] = data[first:]
+            self._length += len(data)
+
+        def _peek(self, count):
+            end = self._start + count
+            if (end <= len(self._ring)):
+                return bytes(self._ring[self._start:end])
+            return bytes(self._ring[self._start:]) + bytes(self._ring[:end - len(self._ring)])
+
+        def _take(self, count):
+            data = self._peek(count)
+            self._start = (self._start + count) % len(self._ring)
+            self._length -= count
+            self._scanned = 0
+            return data
+
+        def _find(self, terminator):
+            ''' Returns the offset of terminator in the received bytes or -1.
+                Bytes already searched are not searched again.
+            '''
+            begin = max(0, self._scanned - len(terminator) + 1)
+            index = self._peek(self._length).find(terminator, begin)
+            self._scanned = self._length if index < 0 else index
+            return index
+
+#------------------------------------------------------------------------------
+
+    def acquire_can(self, reset = True):
+        ''' Creates and returns a new CAN session for the device. The session
+            is used in all subsequent CAN method calls. This method should be
+            called once per session.
+
+            Received frames are drained from the device on a background
+            thread into a preallocated structured array ring buffer.  Call
+            start() to begin receiving.
+        '''
+        return self.Can(self, reset)
+
+    class Can(object):
+        def __init__(self, outer, reset):
+            _require_numpy("the CAN receiver")
+            self.dwf =  outer.dwf
+            self.hdwf = outer.hdwf
+
+            # Some sensible default values
+            self.bit_rate = 500000.0
+            self.tx = Pins.DIO_0
+            self.rx = Pins.DIO_1
+            self.polarity_high = False
+            self.id_filter = None
+
+            # Counters
+            self.frames_received = 0
+            self.frames_filtered = 0 # frames dropped by the ID filter
+            self.overflows = 0 # frames dropped because the ring buffer was full
+            self.bit_stuffing_errors = 0
+            self.crc_errors = 0
+
+            self._write_setting = outer._write_setting
+            self._forget_settings = outer._forget_settings
+            self._ring = None
+            self._start = 0
+            self._length = 0
+            self._condition = threading.Condition()
+            self._reader = None
+            self._id = c_int(0)
+            self._extended = c_int(0)
+            self._remote = c_int(0)
+            self._dlc = c_int(0)
+            self._data = (c_ubyte * 8)()
+            self._status = c_int(0)
+
+            if (reset == True):
+                self.reset_instrument()
+
+        def configure_bus(self, bit_rate, tx_pin, rx_pin, polarity_high = False):
+            ''' Configures the basic parameters of the CAN engine.
+            '''
+            self.bit_rate = bit_rate
+            self.tx = tx_pin
+            self.rx = rx_pin
+            self.polarity_high = polarity_high
+            self._write_setting("FDwfDigitalCanRateSet", bit_rate)
+            self._write_setting("FDwfDigitalCanPolaritySet", 1 if polarity_high else 0)
+            self._write_setting("FDwfDigitalCanTxSet", tx_pin)
+            self._write_setting("FDwfDigitalCanRxSet", rx_pin)
+            self.dwf.FDwfDigitalCanTx(self.hdwf, -1, 0, 0, 0, None) # drive TX recessive
+
+        def set_id_filter(self, ids = None):
+            ''' Only keeps the frames whose identifier is in ids, or every
+                frame if ids is None.  Frames are filtered as they are drained,
+                so ignored traffic takes no space in the ring buffer.
+            '''
+            self.id_filter = None if ids is None else frozenset(ids)
+
+        def start(self, capacity = 65536, poll_interval = 0.001):
+            ''' Starts receiving into a ring buffer of capacity frames.  The
+                device is read again immediately while it has frames and every
+                poll_interval seconds otherwise.  When the application does not
+                keep up, the oldest frames are dropped and counted in overflows.
+            '''
+            self.stop()
+            self._ring = np.zeros(capacity, dtype=CAN_FRAME_DTYPE)
+            self._start = 0
+            self._length = 0
+            self._rx = self.dwf.FDwfDigitalCanRx
+            self._rx(self.hdwf, byref(self._id), byref(self._extended), byref(self._remote), byref(self._dlc), self._data, 0, byref(self._status)) # start receiving
+            self._reader = _DrainThread(self._drain, poll_interval, "PyAnalogDiscovery2 CAN", self._condition)
+            self._reader.start()
+
+        def stop(self):
+            ''' Stops receiving.  Frames already received can still be read.
+            '''
+            if (self._reader is not None):
+                self._reader.stop()
+
+        def write(self, id, data = b"", extended = False, remote = False):
+            ''' Transmits a frame with up to 8 data bytes.
+            '''
+            data = bytes(data)
+            if (len(data) > 8):
+                raise ValueError("CAN frames carry at most 8 data bytes")
+            self.dwf.FDwfDigitalCanTx(self.hdwf, id, 1 if extended else 0, 1 if remote else 0, len(data), data)
+
+        def available(self):
+            ''' Returns the number of received frames waiting to be read.
+            '''
+            return self._length
+
+        def read_frames(self, max_count = None, timeout = 0.0):
+            ''' Returns up to max_count received frames as a CAN_FRAME_DTYPE
+                array.  Waits up to timeout seconds (forever if None) for at
+                least one frame.
+            '''
+            if (self._reader is None):
+                raise RuntimeError("The CAN receiver was not started, call start() first")
+            with self._condition:
+                _wait(self._condition, lambda: self._length > 0, self._reader, timeout)
+                count = self._length if max_count is None else min(max_count, self._length)
+                index = (self._start + np.arange(count)) % len(self._ring)
+                frames = self._ring[index]
+                self._start = (self._start + count) % len(self._ring)
+                self._length -= count
+                return frames
+
+        def frames(self, timeout = None, ids = None):
+            ''' Yields the received frames as CanFrame tuples, optionally only
+                those whose identifier is in ids.  The iteration ends when no
+                frame arrives for timeout seconds (never if None).
+            '''
+            ids = None if ids is None else frozenset(ids)
+            while True:
+                frames = self.read_frames(1024, timeout)
+                if (len(frames) == 0):
+                    return
+                for frame in frames:
+                    if (ids is None or int(frame["id"]) in ids):
+                        yield CanFrame(float(frame["time"]), int(frame["id"]), bool(frame["extended"]), bool(frame["remote"]), frame["data"][:frame["dlc"]].tobytes())
+
+        def statistics(self):
+            ''' Returns a snapshot of the receive counters.
+            '''
+            return {
+                "frames_received": self.frames_received,
+                "frames_filtered": self.frames_filtered,
+                "available": self._length,
+                "overflows": self.overflows,
+                "bit_stuffing_errors": self.bit_stuffing_errors,
+                "crc_errors": self.crc_errors,
+            }
+
+        def reset_instrument(self):
+            ''' Resets the session configuration to default values, and resets
+                the device and driver software to a known state.
+            '''
+            self.dwf.FDwfDigitalCanReset(self.hdwf)
+            self._forget_settings("FDwfDigitalCan")
+
+        def _drain(self):
+            # Every call returns at most one frame.  Read until the device is
+            # empty, but at most a ring of frames so a flooded bus or a
+            # receiver stuck on errors lets the thread check for stop().
+            received = False
+            for i in range(len(self._ring)):
+                self._rx(self.hdwf, byref(self._id), byref(self._extended), byref(self._remote), byref(self._dlc), self._data, 8, byref(self._status))
+                status = self._status.value
+                if (status == CanStatus.NO_DATA):
+                    return received
+                received = True
+                if (status == CanStatus.BIT_STUFFING_ERROR):
+                    self.bit_stuffing_errors += 1
+                elif (status == CanStatus.CRC_ERROR):
+                    self.crc_errors += 1
+                elif (self.id_filter is not None and self._id.value not in self.id_filter):
+                    self.frames_filtered += 1
+                else:
+                    self.frames_received += 1
+                    with self._condition:
+                        self._append(time.perf_counter())
+                        self._condition.notify_all()
+            return received
+
+        def _append(self, timestamp):
+            capacity = len(self._ring)
+            if (self._length == capacity):
+                # Keep the newest frames
+                self.overflows += 1
+                self._start = (self._start + 1) % capacity
+                self._length -= 1
+            frame = self._ring[(self._start + self._length) % capacity]
+            frame["time"] = timestamp
+            frame["id"] = self._id.value
+            frame["extended"] = self._extended.value != 0
+            frame["remote"] = self._remote.value != 0
+            frame["dlc"] = self._dlc.value
+            frame["data"] = self._data
+            self._length += 1
+
+#------------------------------------------------------------------------------
+
+    def acquire_oscilloscope(self, reset = True):
+        ''' Creates and returns a new oscilloscope (AnalogIn) session for the
+            device. The session is used in all subsequent oscilloscope method
+            calls. This method should be called once per session.
+
+            The oscilloscope streams the device's record mode into a
+            preallocated ring buffer of raw 16-bit samples.  Samples are only
+            scaled to volts when you ask for them.
+        '''
+        return self.Oscilloscope(self, reset)
+
+    class Oscilloscope(object):
+        def __init__(self, outer, reset):
+            _require_numpy("the oscilloscope")
+            self.dwf =  outer.dwf
+            self.hdwf = outer.hdwf
+            self._device = outer
+
+            # Some sensible default values
+            self.sample_rate = 1000000.0 # 1MHz
+            self.channels = [AnalogInChannel.CHANNEL_1]
+            self.record_length = 0.0 # 0 seconds records forever
+            self.ring_buffer_size = 1 << 20 # samples per channel
+            self.samples_per_segment = 8192
+
+            # Raw samples are kept as int16 and scaled lazily by to_volts()
+            self.ring_buffer = None
+            self._channel_addresses = []
+            self.write_index = 0
+            self.total_samples = 0
+            self.lost_samples = 0
+            self.corrupt_samples = 0
+            self.scale = None
+            self.offset = None
+            self.background_reader = None
+
+            # Status arguments are allocated once and reused on every poll
+            self._state = c_ubyte(0)
+            self._available = c_int(0)
+            self._lost = c_int(0)
+            self._corrupt = c_int(0)
+
+            if (reset == True):
+                self.dwf.FDwfAnalogInReset(self.hdwf)
+
+        def configure_channel(self, channel, voltage_range = 5.0, offset = 0.0, enable = True):
+            ''' Configures the input range and offset of an oscilloscope
+                channel. This method should be called once for every channel
+                you want to acquire.
+            '''
+            self.dwf.FDwfAnalogInChannelEnableSet(self.hdwf, channel, enable)
+            self.dwf.FDwfAnalogInChannelRangeSet(self.hdwf, channel, voltage_range)
+            self.dwf.FDwfAnalogInChannelOffsetSet(self.hdwf, channel, offset)
+
+        def configure_trigger(self, channel = AnalogInChannel.CHANNEL_1, level = 0.0, slope = TriggerSlope.RISE, position = 0.0, auto_timeout = 0.0, source = TriggerSource.DETECTOR_ANALOG_IN):
+            ''' Configures an edge trigger at level volts on channel.
+                position is the time in seconds of the trigger relative to the
+                middle of the acquisition.  An auto_timeout of 0 seconds waits
+                for a trigger forever.
+            '''
+            self.dwf.FDwfAnalogInTriggerSourceSet(self.hdwf, source)
+            self.dwf.FDwfAnalogInTriggerTypeSet(self.hdwf, 0) # edge
+            self.dwf.FDwfAnalogInTriggerChannelSet(self.hdwf, channel)
+            self.dwf.FDwfAnalogInTriggerLevelSet(self.hdwf, level)
+            self.dwf.FDwfAnalogInTriggerConditionSet(self.hdwf, slope)
+            self.dwf.FDwfAnalogInTriggerPositionSet(self.hdwf, position)
+            self.dwf.FDwfAnalogInTriggerAutoTimeoutSet(self.hdwf, auto_timeout)
+
+        def configure_segments(self, sample_rate, samples_per_segment, channels = (AnalogInChannel.CHANNEL_1,)):
+            ''' Configures single acquisitions of samples_per_segment samples
+                per channel, one per trigger.  Read them with read_segments().
+            '''
+            self.sample_rate = sample_rate
+            self.channels = list(channels)
+            self.samples_per_segment = samples_per_segment
+            self.dwf.FDwfAnalogInAcquisitionModeSet(self.hdwf, AcquisitionMode.SINGLE)
+            self.dwf.FDwfAnalogInFrequencySet(self.hdwf, sample_rate)
+            self.dwf.FDwfAnalogInBufferSizeSet(self.hdwf, samples_per_segment)
+
+        def read_segments(self, segment_count = None, batch_size = 64, timeout = None, poll_interval = 0.0):
+            ''' Arms the trigger and yields (times, segments) batches of up to
+                batch_size segments, segments being a (batch x channels x
+                samples) int16 view of a preallocated buffer, valid until the
+                next batch is requested.  The oscilloscope is re-armed as soon
+                as a segment is read, and a batch is handed out whenever the
+                next trigger has not arrived yet, so the consumer works while
+                the oscilloscope waits.  The generator ends after
+                segment_count segments or when no trigger arrives for timeout
+                seconds.
+            '''
+            samples = self.samples_per_segment
+            batch = np.empty((batch_size, len(self.channels), samples), dtype=np.int16)
+            times = np.empty(batch_size)
+            self._read_scaling()
+
+            # Look the functions up once for the whole capture
+            hdwf = self.hdwf
+            configure = self.dwf.FDwfAnalogInConfigure
+            status = self.dwf.FDwfAnalogInStatus
+            read = self.dwf.FDwfAnalogInStatusData16
+            state = byref(self._state)
+            addresses = [[batch[i, c].ctypes.data for c in range(len(self.channels))] for i in range(batch_size)]
+
+            captured = 0
+            count = 0
+            configure(hdwf, 0 if self._device.auto_configure else 1, 1)
+            try:
+                waiting_since = time.perf_counter()
+                while (segment_count is None or captured < segment_count):
+                    status(hdwf, 1, state)
+                    if (self._state.value != InstrumentState.DONE):
+                        now = time.perf_counter()
+                        if (count > 0):
+                            yield times[:count], batch[:count]
+                            count = 0
+                            waiting_since = time.perf_counter()
+                        elif (timeout is not None and now - waiting_since > timeout):
+                            return
+                        elif (poll_interval > 0):
+                            time.sleep(poll_interval)
+                        continue
+                    for channel, address in zip(self.channels, addresses[count]):
+                        read(hdwf, channel, address, 0, samples)
+                    times[count] = waiting_since = time.perf_counter()
+                    captured += 1
+                    count += 1
+                    if (segment_count is None or captured < segment_count):
+                        configure(hdwf, 0, 1) # re-arm for the next trigger
+                    if (count == batch_size):
+                        yield times[:count], batch[:count]
+                        count = 0
+                if (count > 0):
+                    yield times[:count], batch[:count]
+            finally:
+                configure(hdwf, 0, 0)
+
+        def configure_record(self, sample_rate, channels = (AnalogInChannel.CHANNEL_1,), record_length = 0.0, ring_buffer_size = 1 << 20):
+            ''' Configures a continuous (record mode) acquisition on the given
+                channels.  A record_length of 0 seconds records until stop()
+                is called.  ring_buffer_size is the number of samples per
+                channel kept in memory.
+            '''
+            self.sample_rate = sample_rate
+            self.channels = list(channels)
+            self.record_length = record_length
+            self.ring_buffer_size = ring_buffer_size
+            self.ring_buffer = np.zeros((len(self.channels), ring_buffer_size), dtype=np.int16)
+            self._channel_addresses = [row.ctypes.data for row in self.ring_buffer]
+
+            self.dwf.FDwfAnalogInAcquisitionModeSet(self.hdwf, AcquisitionMode.RECORD)
+            self.dwf.FDwfAnalogInFrequencySet(self.hdwf, sample_rate)
+            self.dwf.FDwfAnalogInRecordLengthSet(self.hdwf, record_length)
+
+        def start(self):
+            ''' Starts the acquisition and clears the sample counters.
+            '''
+            if (self.ring_buffer is None):
+                self.configure_record(self.sample_rate, self.channels, self.record_length, self.ring_buffer_size)
+            self.write_index = 0
+            self.total_samples = 0
+            self.lost_samples = 0
+            self.corrupt_samples = 0
+            self._read_scaling()
+            self.dwf.FDwfAnalogInConfigure(self.hdwf, 0 if self._device.auto_configure else 1, 1)
+
+        def stop(self):
+            ''' Stops the acquisition and the background reader, if any.
+            '''
+            if (self.background_reader is not None):
+                self.background_reader.stop()
+                self.background_reader = None
+            self.dwf.FDwfAnalogInConfigure(self.hdwf, 0, 0)
+
+        def start_background(self, block_size = 65536, block_count = 16, poll_interval = 0.001):
+            ''' Starts the acquisition and drains the device from a dedicated
+                thread.  Returns the BackgroundReader; iterate over its
+                blocks() to consume (channels x block_size) int16 blocks.
+                Do not call read_chunks() while the reader is running.
+            '''
+            self.start()
+            self.background_reader = BackgroundReader(self._drain_chunks, len(self.channels), block_size, block_count, np.int16, poll_interval)
+            self.background_reader.start()
+            return self.background_reader
+
+        def read_chunks(self):
+            ''' Drains the device into the ring buffer and yields each newly
+                acquired block as a (channels x samples) int16 view of the ring
+                buffer.  No samples are copied, so a chunk is only valid until
+                the ring buffer wraps around onto it; copy it if you need to
+                keep it.  The generator ends once a finite record is done.
+            '''
+            while True:
+                state, segments = self._drain()
+                for start, stop in segments:
+                    yield self.ring_buffer[:, start:stop]
+                if (state == InstrumentState.DONE and len(segments) == 0):
+                    return
+
+        def read_samples(self, sample_count):
+            ''' Acquires sample_count samples per channel and returns them as a
+                newly allocated (channels x samples) int16 array.
+            '''
+            samples = np.empty((len(self.channels), sample_count), dtype=np.int16)
+            index = 0
+            for chunk in self.read_chunks():
+                count = min(chunk.shape[1], sample_count - index)
+                samples[:, index:index + count] = chunk[:, :count]
+                index += count
+                if (index == sample_count):
+                    break
+            return samples[:, :index]
+
+        def capture(self, filename, sample_count = None, chunk_size = 65536, metadata = None):
+            ''' Starts the acquisition and writes it to a capture file (see
+                pyanalogdiscovery2_capture) until sample_count samples per
+                channel were written or a finite record is done.  The file
+                keeps the raw samples with their scaling, and the gaps left by
+                lost samples.  Returns the number of samples written.
+            '''
+            from pyanalogdiscovery2_capture import CaptureWriter
+            self.start()
+            try:
+                writer = CaptureWriter(filename, [str(channel) for channel in self.channels], np.int16, self.sample_rate, self.scale, self.offset,
+                                       self._device._capture_serial_number(), self._device.configuration, chunk_size, metadata)
+                with writer:
+                    _write_capture(writer, self.read_chunks(), self, sample_count)
+            finally:
+                self.stop()
+            return writer.samples
+
+        def to_volts(self, raw_samples):
+            ''' Scales a (channels x samples) block of raw samples to volts.
+            '''
+            return raw_samples * self.scale + self.offset
+
+        def _read_scaling(self):
+            scale = np.empty((len(self.channels), 1))
+            offset = np.empty((len(self.channels), 1))
+            voltage_range = c_double(0.0)
+            voltage_offset = c_double(0.0)
+            for i, channel in enumerate(self.channels):
+                self.dwf.FDwfAnalogInChannelRangeGet(self.hdwf, channel, byref(voltage_range))
+                self.dwf.FDwfAnalogInChannelOffsetGet(self.hdwf, channel, byref(voltage_offset))
+                scale[i] = voltage_range.value / 65536.0
+                offset[i] = voltage_offset.value
+            self.scale = scale
+            self.offset = offset
+
+        def _drain_chunks(self):
+            state, segments = self._drain()
+            done = (state == InstrumentState.DONE and len(segments) == 0)
+            return done, [self.ring_buffer[:, start:stop] for start, stop in segments]
+
+        def _drain(self):
+            ''' Reads everything the device has available into the ring buffer
+                and returns the instrument state and the (start, stop) ring
+                buffer segments that were written.
+            '''
+            self.dwf.FDwfAnalogInStatus(self.hdwf, 1, byref(self._state))
+            self.dwf.FDwfAnalogInStatusRecord(self.hdwf, byref(self._available), byref(self._lost), byref(self._corrupt))
+            self.lost_samples += self._lost.value
+            self.corrupt_samples += self._corrupt.value
+
+            available = self._available.value
+            if (available > self.ring_buffer_size):
+                # More than a whole ring buffer arrived, keep the newest samples
+                self.lost_samples += available - self.ring_buffer_size
+                skip = available - self.ring_buffer_size
+                available = self.ring_buffer_size
+            else:
+                skip = 0
+
+            segments = []
+            index = skip
+            while (available > 0):
+                count = min(available, self.ring_buffer_size - self.write_index)
+                for channel, address in zip(self.channels, self._channel_addresses):
+                    self.dwf.FDwfAnalogInStatusData16(self.hdwf, channel, address + self.write_index * 2, index, count)
+                segments.append((self.write_index, self.write_index + count))
+                self.write_index = (self.write_index + count) % self.ring_buffer_size
+                self.total_samples += count
+                index += count
+                available -= count
+            return self._state.value, segments
+
+#------------------------------------------------------------------------------
+
+    def acquire_logic_analyzer(self, reset = True):
+        ''' Creates and returns a new logic analyzer (DigitalIn) session for
+            the device. The session is used in all subsequent logic analyzer
+            method calls. This method should be called once per session.
+
+            Samples of all 16 digital I/O pins are recorded as packed uint16
+            words, bit n holding Pins.DIO_n.  Use digital_pins(),
+            digital_pin() and digital_edges() to look at single pins without
+            unpacking bits in Python.
+        '''
+        return self.LogicAnalyzer(self, reset)
+
+    class LogicAnalyzer(object):
+        def __init__(self, outer, reset):
+            _require_numpy("the logic analyzer")
+            self.dwf =  outer.dwf
+            self.hdwf = outer.hdwf
+            self._device = outer
+
+            # Some sensible default values
+            self.sample_rate = 1000000.0 # 1MHz
+            self.sample_count = 0 # 0 records until stop() is called
+            self.ring_buffer_size = 1 << 22 # samples
+
+            self.ring_buffer = None
+            self.write_index = 0
+            self.total_samples = 0
+            self.lost_samples = 0
+            self.corrupt_samples = 0
+
+            # Status arguments are allocated once and reused on every poll
+            self._state = c_ubyte(0)
+            self._available = c_int(0)
+            self._lost = c_int(0)
+            self._corrupt = c_int(0)
+
+            if (reset == True):
+                self.dwf.FDwfDigitalInReset(self.hdwf)
+
+        def configure_record(self, sample_rate, sample_count = 0, ring_buffer_size = 1 << 22):
+            ''' Configures a continuous (record mode) acquisition of all 16
+                pins.  sample_count of 0 records until stop() is called.  The
+                actual sample rate is the internal clock divided by an integer,
+                see the sample_rate attribute after this call.
+            '''
+            internal_clock = c_double(0.0)
+            self.dwf.FDwfDigitalInInternalClockInfo(self.hdwf, byref(internal_clock))
+            divider = max(1, int(round(internal_clock.value / sample_rate)))
+            self.sample_rate = internal_clock.value / divider
+            self.sample_count = sample_count
+            self.ring_buffer_size = ring_buffer_size
+            self.ring_buffer = None
+
+            self.dwf.FDwfDigitalInAcquisitionModeSet(self.hdwf, AcquisitionMode.RECORD)
+            self.dwf.FDwfDigitalInDividerSet(self.hdwf, divider)
+            self.dwf.FDwfDigitalInSampleFormatSet(self.hdwf, 16)
+            self.dwf.FDwfDigitalInTriggerPositionSet(self.hdwf, sample_count)
+
+        def start(self):
+            ''' Starts the acquisition and clears the sample counters.
+            '''
+            self.write_index = 0
+            self.total_samples = 0
+            self.lost_samples = 0
+            self.corrupt_samples = 0
+            self.dwf.FDwfDigitalInConfigure(self.hdwf, 0 if self._device.auto_configure else 1, 1)
+
+        def stop(self):
+            ''' Stops the acquisition.
+            '''
+            self.dwf.FDwfDigitalInConfigure(self.hdwf, 0, 0)
+
+        def read_chunks(self):
+            ''' Drains the device into the ring buffer and yields each newly
+                acquired block as a uint16 view of the ring buffer.  No samples
+                are copied, so a chunk is only valid until the ring buffer
+                wraps around onto it.  The generator ends once a finite record
+                is done.
+            '''
+            if (self.ring_buffer is None):
+                self.ring_buffer = np.zeros(self.ring_buffer_size, dtype=np.uint16)
+            while True:
+                state, available = self._status()
+                if (available > self.ring_buffer_size):
+                    self.lost_samples += available - self.ring_buffer_size
+                index = max(0, available - self.ring_buffer_size)
+                while (index < available):
+                    count = min(available - index, self.ring_buffer_size - self.write_index)
+                    self._read_data(self.ring_buffer, self.write_index, index, count)
+                    yield self.ring_buffer[self.write_index:self.write_index + count]
+                    self.write_index = (self.write_index + count) % self.ring_buffer_size
+                    index += count
+                if (state == InstrumentState.DONE and available == 0):
+                    return
+
+        def record(self, sample_count, filename = None):
+            ''' Starts an acquisition and records sample_count samples straight
+                into a uint16 array, which is returned.  With a filename the
+                array is a memory-mapped .npy file, so captures larger than
+                memory never pass through Python integers or lists.
+            '''
+            if (filename is None):
+                samples = np.empty(sample_count, dtype=np.uint16)
+            else:
+                samples = np.lib.format.open_memmap(filename, mode="w+", dtype=np.uint16, shape=(sample_count,))
+            self.start()
+            index = 0
+            try:
+                while (index < sample_count):
+                    state, available = self._status()
+                    count = min(available, sample_count - index)
+                    self._read_data(samples, index, 0, count)
+                    index += count
+                    if (state == InstrumentState.DONE and available == 0):
+                        break
+            finally:
+                self.stop()
+            if (filename is not None):
+                samples.flush()
+            return samples[:index]
+
+        def capture(self, filename, sample_count = None, chunk_size = 65536, metadata = None):
+            ''' Starts the acquisition and writes it to a capture file (see
+                pyanalogdiscovery2_capture) until sample_count samples were
+                written or a finite record is done.  Returns the number of
+                samples written.
+            '''
+            from pyanalogdiscovery2_capture import CaptureWriter
+            self.start()
+            try:
+                writer = CaptureWriter(filename, ["DIO 0-15"], np.uint16, self.sample_rate, None, None,
+                                       self._device._capture_serial_number(), self._device.configuration, chunk_size, metadata)
+                with writer:
+                    _write_capture(writer, self.read_chunks(), self, sample_count)
+            finally:
+                self.stop()
+            return writer.samples
+
+        def _status(self):
+            self.dwf.FDwfDigitalInStatus(self.hdwf, 1, byref(self._state))
+            self.dwf.FDwfDigitalInStatusRecord(self.hdwf, byref(self._available), byref(self._lost), byref(self._corrupt))
+            self.lost_samples += self._lost.value
+            self.corrupt_samples += self._corrupt.value
+            return self._state.value, self._available.value
+
+        def _read_data(self, samples, position, index, count):
+            ''' Copies count samples, starting at index in the data the device
+                made available, to samples[position:].
+            '''
+            if (count > 0):
+                address = samples.ctypes.data + position * 2
+                self.dwf.FDwfDigitalInStatusData2(self.hdwf, address, index, count * 2)
+                self.total_samples += count
+
+#------------------------------------------------------------------------------
+
+    def acquire_waveform_generator(self, reset = True):
+        ''' Creates and returns a new waveform generator (AnalogOut) session
+            for the device. The session is used in all subsequent waveform
+            generator method calls. This method should be called once per
+            session.
+
+            Besides the standard waveforms, play() streams arbitrarily long
+            waveforms from NumPy arrays, memory-mapped .npy files or
+            generators of chunks, keeping the device FIFO topped up.
+        '''
+        return self.WaveformGenerator(self, reset)
+
+    class WaveformGenerator(object):
+        def __init__(self, outer, reset):
+            self.dwf =  outer.dwf
+            self.hdwf = outer.hdwf
+
+            # Some sensible default values
+            self.channel = AnalogOutChannel.CHANNEL_1
+            self.amplitude = 1.0 # volts
+            self.offset = 0.0 # volts
+            self.buffer_size = 0 # samples in the device FIFO, set by play()
+
+            self.total_samples = 0
+            self.lost_samples = 0
+            self.corrupt_samples = 0
+
+            # Status arguments are allocated once and reused on every poll
+            self._state = c_ubyte(0)
+            self._free = c_int(0)
+            self._lost = c_int(0)
+            self._corrupt = c_int(0)
+
+            if (reset == True):
+                self.dwf.FDwfAnalogOutReset(self.hdwf, -1)
+
+        def configure_channel(self, channel, amplitude = 1.0, offset = 0.0):
+            ''' Selects the output channel and its amplitude and offset in
+                volts.  Played samples are given in volts and must stay within
+                offset +/- amplitude.
+            '''
+            self.channel = channel
+            self.amplitude = amplitude
+            self.offset = offset
+            self.dwf.FDwfAnalogOutNodeEnableSet(self.hdwf, channel, AnalogOutNode.CARRIER, 1)
+            self.dwf.FDwfAnalogOutNodeAmplitudeSet(self.hdwf, channel, AnalogOutNode.CARRIER, amplitude)
+            self.dwf.FDwfAnalogOutNodeOffsetSet(self.hdwf, channel, AnalogOutNode.CARRIER, offset)
+
+        def configure_waveform(self, function, frequency):
+            ''' Configures a standard waveform on the selected channel.  Call
+                start() to output it.
+            '''
+            self.dwf.FDwfAnalogOutNodeFunctionSet(self.hdwf, self.channel, AnalogOutNode.CARRIER, function)
+            self.dwf.FDwfAnalogOutNodeFrequencySet(self.hdwf, self.channel, AnalogOutNode.CARRIER, frequency)
+
+        def start(self):
+            ''' Starts the selected channel.
+            '''
+            self.dwf.FDwfAnalogOutConfigure(self.hdwf, self.channel, 1)
+
+        def stop(self):
+            ''' Stops the selected channel.
+            '''
+            self.dwf.FDwfAnalogOutConfigure(self.hdwf, self.channel, 0)
+
+        def play(self, source, sample_rate, chunk_size = 65536, poll_interval = 0.001):
+            ''' Streams source to the selected channel at sample_rate and
+                returns once every sample has been played.  source is a NumPy
+                array (a memory-mapped array or the filename of a .npy file
+                work too) or an iterable of array chunks, in volts.
+
+                Chunks are converted to the device format on a separate
+                thread into two alternating buffers, so the next chunk is
+                ready while the current one is being written to the FIFO.
+                Underruns show up in the lost_samples and corrupt_samples
+                counters.
+            '''
+            _require_numpy("waveform playback")
+            if (isinstance(source, str)):
+                source = np.load(source, mmap_mode="r")
+            if (isinstance(source, np.ndarray)):
+                # The length is known, let the device stop on its own
+                samples = source
+                run_time = len(samples) / float(sample_rate)
+                source = (samples[i:i + chunk_size] for i in range(0, len(samples), chunk_size))
+            else:
+                run_time = 0.0
+
+            channel = self.channel
+            carrier = AnalogOutNode.CARRIER
+            self.total_samples = 0
+            self.lost_samples = 0
+            self.corrupt_samples = 0
+
+            self.dwf.FDwfAnalogOutNodeEnableSet(self.hdwf, channel, carrier, 1)
+            self.dwf.FDwfAnalogOutNodeFunctionSet(self.hdwf, channel, carrier, WaveformFunction.PLAY)
+            self.dwf.FDwfAnalogOutNodeFrequencySet(self.hdwf, channel, carrier, sample_rate)
+            self.dwf.FDwfAnalogOutRepeatSet(self.hdwf, channel, 1)
+            self.dwf.FDwfAnalogOutRunSet(self.hdwf, channel, run_time)
+            minimum = c_int(0)
+            maximum = c_int(0)
+            self.dwf.FDwfAnalogOutNodeDataInfo(self.hdwf, channel, carrier, byref(minimum), byref(maximum))
+            self.buffer_size = maximum.value
+
+            converter = _PlaybackConverter(source, chunk_size, self.amplitude, self.offset)
+            converter.start()
+            try:
+                # Prefill the device buffer before starting the output
+                prefill = np.zeros(self.buffer_size)
+                count = converter.read_into(prefill)
+                self.dwf.FDwfAnalogOutNodeDataSet(self.hdwf, channel, carrier, prefill.ctypes.data, count)
+                self.total_samples += count
+                self.dwf.FDwfAnalogOutConfigure(self.hdwf, channel, 1)
+
+                while True:
+                    self.dwf.FDwfAnalogOutStatus(self.hdwf, channel, byref(self._state))
+                    self.dwf.FDwfAnalogOutNodePlayStatus(self.hdwf, channel, carrier, byref(self._free), byref(self._lost), byref(self._corrupt))
+                    self.lost_samples += self._lost.value
+                    self.corrupt_samples += self._corrupt.value
+                    if (self._state.value == InstrumentState.DONE):
+                        break
+                    if (converter.exhausted()):
+                        if (run_time == 0.0 and self._free.value >= self.buffer_size):
+                            # Open-ended playback, stop once the FIFO drained
+                            break
+                        time.sleep(poll_interval)
+                        continue
+
+                    free = self._free.value
+                    while (free > 0):
+                        address, count = converter.next_segment(free)
+                        if (count == 0):
+                            break
+                        self.dwf.FDwfAnalogOutNodePlayData(self.hdwf, channel, carrier, address, count)
+                        self.total_samples += count
+                        free -= count
+                    if (free > 0):
+                        time.sleep(poll_interval)
+            finally:
+                converter.stop()
+                if (run_time == 0.0):
+                    self.stop()
+
+#------------------------------------------------------------------------------
+
+    def acquire_pattern_generator(self, reset = True):
+        ''' Creates and returns a new pattern generator (DigitalOut) session
+            for the device. The session is used in all subsequent pattern
+            generator method calls. This method should be called once per
+            session.
+
+            Patterns are NumPy (samples x pins) matrices of bools or 0/1
+            values, column n driving Pins.DIO_n.  They are packed into the
+            device's bit layout once and cached by content, so replaying the
+            same test vectors never packs them again.
+        '''
+        return self.PatternGenerator(self, reset)
+
+    class PatternGenerator(object):
+        BITS_PER_SAMPLE = (1, 2, 4, 8, 16)
+
+        def __init__(self, outer, reset):
+            _require_numpy("the pattern generator")
+            self.dwf =  outer.dwf
+            self.hdwf = outer.hdwf
+
+            # Some sensible default values
+            self.idle = DigitalOutIdle.INIT
+            self.cache_size = 32 # packed patterns kept in the cache
+            self.sample_rate = 0.0
+
+            self.cache_hits = 0
+            self.cache_misses = 0
+            self._cache = OrderedDict()
+            self._enabled_pins = 0
+            self._state = c_ubyte(0)
+
+            if (reset == True):
+                self.dwf.FDwfDigitalOutReset(self.hdwf)
+
+        def pack(self, pattern, bits_per_sample = None):
+            ''' Packs a (samples x pins) pattern into the play mode layout and
+                returns it as a uint8 array.  Each sample takes bits_per_sample
+                bits, least significant bit (Pins.DIO_0) first.  By default the
+                smallest supported width that holds all the pins is used;
+                fewer bits per sample means less data to transfer.
+            '''
+            pattern = np.ascontiguousarray(pattern)
+            if (pattern.ndim == 1):
+                pattern = pattern.reshape(-1, 1)
+            pins = pattern.shape[1]
+            bits_per_sample = self._bits_per_sample(pins, bits_per_sample)
+
+            key = (hashlib.sha1(pattern.view(np.uint8)).digest(), pattern.shape, pattern.dtype.str, bits_per_sample)
+            packed = self._cache.get(key)
+            if (packed is not None):
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return packed
+            self.cache_misses += 1
+
+            bits = np.zeros((pattern.shape[0], bits_per_sample), dtype=np.bool_)
+            np.not_equal(pattern, 0, out=bits[:, :pins])
+            packed = np.packbits(bits.reshape(-1), bitorder="little")
+            packed.setflags(write=False)
+            self._cache[key] = packed
+            if (len(self._cache) > self.cache_size):
+                self._cache.popitem(last=False)
+            return packed
+
+        def play(self, pattern, sample_rate, bits_per_sample = None, repeat = 1):
+            ''' Outputs pattern at sample_rate samples per second, repeat
+                times (0 repeats forever).  Only the pins covered by
+                bits_per_sample are driven.  Returns immediately; use wait()
+                to block until the pattern is done.
+            '''
+            pattern = np.asarray(pattern)
+            if (pattern.ndim == 1):
+                pattern = pattern.reshape(-1, 1)
+            bits_per_sample = self._bits_per_sample(pattern.shape[1], bits_per_sample)
+            packed = self.pack(pattern, bits_per_sample)
+            sample_count = pattern.shape[0]
+
+            for pin in range(max(self._enabled_pins, bits_per_sample)):
+                enable = pin < bits_per_sample
+                self.dwf.FDwfDigitalOutEnableSet(self.hdwf, pin, enable)
+                if (enable):
+                    self.dwf.FDwfDigitalOutTypeSet(self.hdwf, pin, DigitalOutType.PLAY)
+                    self.dwf.FDwfDigitalOutIdleSet(self.hdwf, pin, self.idle)
+            self._enabled_pins = bits_per_sample
+
+            self.sample_rate = sample_rate
+            self.dwf.FDwfDigitalOutPlayRateSet(self.hdwf, sample_rate)
+            self.dwf.FDwfDigitalOutRunSet(self.hdwf, sample_count / float(sample_rate))
+            self.dwf.FDwfDigitalOutRepeatSet(self.hdwf, repeat)
+            self.dwf.FDwfDigitalOutPlayDataSet(self.hdwf, packed.ctypes.data, bits_per_sample, sample_count)
+            self.dwf.FDwfDigitalOutConfigure(self.hdwf, 1)
+
+        def wait(self, poll_interval = 0.001):
+            ''' Blocks until the pattern is done.
+            '''
+            while True:
+                self.dwf.FDwfDigitalOutStatus(self.hdwf, byref(self._state))
+                if (self._state.value == InstrumentState.DONE):
+                    return
+                time.sleep(poll_interval)
+
+        def stop(self):
+            ''' Stops the pattern generator.
+            '''
+            self.dwf.FDwfDigitalOutConfigure(self.hdwf, 0)
+
+        def _bits_per_sample(self, pins, bits_per_sample):
+            if (bits_per_sample is None):
+                return min(bits for bits in self.BITS_PER_SAMPLE if bits >= pins)
+            if (bits_per_sample not in self.BITS_PER_SAMPLE or bits_per_sample < pins):
+                raise ValueError("bits_per_sample must be one of %s and hold %d pins" % (self.BITS_PER_SAMPLE, pins))
+            return bits_per_sample
+
+#------------------------------------------------------------------------------
+
+    def acquire_impedance_analyzer(self, reset = True):
+        ''' Creates and returns a new impedance analyzer session for the
+            device. The session is used in all subsequent impedance analyzer
+            method calls. This method should be called once per session.
+
+            A whole frequency sweep is measured by one call to sweep(), which
+            returns NumPy arrays.  Open and short compensation sweeps are kept
+            by the device per configuration, so they are only measured once.
+        '''
+        return self.ImpedanceAnalyzer(self, reset)
+
+    class ImpedanceAnalyzer(object):
+        def __init__(self, outer, reset):
+            _require_numpy("the impedance analyzer")
+            self.dwf =  outer.dwf
+            self.hdwf = outer.hdwf
+            self._device = outer
+
+            # Some sensible default values
+            self.mode = ImpedanceMode.W1_C1_DUT_C2_R_GND
+            self.reference_resistance = 1000.0 # ohms
+            self.amplitude = 1.0 # volts
+            self.offset = 0.0 # volts
+            self.minimum_periods = 16
+            self.probe_resistance = 1000000.0 # ohms
+            self.probe_capacitance = 0.0 # farads
+            self.settle_time = 0.0 # seconds
+            self.frequencies = np.logspace(2, 6, 101) # 100Hz to 1MHz
+
+            self._write_setting = outer._write_setting
+            self._forget_settings = outer._forget_settings
+            self._compensations = outer._impedance_compensations
+
+            # Status arguments are allocated once and reused on every point
+            self._state = c_ubyte(0)
+            self._impedance = c_double(0.0)
+            self._phase = c_double(0.0)
+
+            if (reset == True):
+                self.reset_instrument()
+
+        def configure(self, reference_resistance = 1000.0, amplitude = 1.0, offset = 0.0, mode = ImpedanceMode.W1_C1_DUT_C2_R_GND, minimum_periods = 16, probe_resistance = 1000000.0, probe_capacitance = 0.0, settle_time = 0.0):
+            ''' Configures the measurement.  Every point is measured over at
+                least minimum_periods periods of the stimulus, after waiting
+                settle_time seconds for the DUT to settle at the new frequency.
+            '''
+            self.mode = mode
+            self.reference_resistance = reference_resistance
+            self.amplitude = amplitude
+            self.offset = offset
+            self.minimum_periods = minimum_periods
+            self.probe_resistance = probe_resistance
+            self.probe_capacitance = probe_capacitance
+            self.settle_time = settle_time
+            self._write_setting("FDwfAnalogImpedanceModeSet", mode)
+            self._write_setting("FDwfAnalogImpedanceReferenceSet", reference_resistance)
+            self._write_setting("FDwfAnalogImpedanceAmplitudeSet", amplitude)
+            self._write_setting("FDwfAnalogImpedanceOffsetSet", offset)
+            self._write_setting("FDwfAnalogImpedancePeriodSet", minimum_periods)
+            self.dwf.FDwfAnalogImpedanceProbeSet(self.hdwf, probe_resistance, probe_capacitance)
+
+        def configure_sweep(self, start_frequency, stop_frequency, steps, logarithmic = True):
+            ''' Sets the frequencies of the sweep: steps points from
+                start_frequency to stop_frequency, evenly spaced on a
+                logarithmic or a linear scale.  Returns the frequencies.
+            '''
+            if (logarithmic == True):
+                self.frequencies = np.geomspace(start_frequency, stop_frequency, steps)
+            else:
+                self.frequencies = np.linspace(start_frequency, stop_frequency, steps)
+            return self.frequencies
+
+        def sweep(self, compensate = True, pipelined = False, poll_interval = 0.0):
+            ''' Measures every frequency of the sweep and returns an
+                ImpedanceSweep.  With compensate, the open and short
+                compensation of this configuration is applied when both were
+                measured.
+
+                Every point is read as soon as its capture is done.  The
+                acquisition is then restarted at the next frequency.  When
+                pipelined, it keeps running instead and the capture that was
+                in flight when the frequency changed is dropped.  This saves
+                the restart but is not verified on hardware yet.
+            '''
+            impedance, phase = self._sweep(pipelined, poll_interval)
+            if (compensate == True):
+                compensation = self._compensations.get(self._compensation_key(), {})
+                if ("open" in compensation and "short" in compensation):
+                    impedance, phase = self._compensate(impedance, phase, compensation["open"], compensation["short"])
+            return ImpedanceSweep(self.frequencies.copy(), impedance, phase, impedance * np.cos(phase), impedance * np.sin(phase))
+
+        def measure_open_compensation(self, pipelined = False):
+            ''' Sweeps the fixture with the DUT removed and keeps the result as
+                the open compensation of the current configuration.
+            '''
+            self._measure_compensation("open", pipelined)
+
+        def measure_short_compensation(self, pipelined = False):
+            ''' Sweeps the fixture with the DUT terminals shorted and keeps the
+                result as the short compensation of the current configuration.
+            '''
+            self._measure_compensation("short", pipelined)
+
+        def is_compensated(self):
+            ''' Returns True if both the open and the short compensation of the
+                current configuration were measured.
+            '''
+            compensation = self._compensations.get(self._compensation_key(), {})
+            return ("open" in compensation and "short" in compensation)
+
+        def clear_compensation(self):
+            ''' Forgets the compensation of every configuration, for example
+                after changing the fixture.
+            '''
+            self._compensations.clear()
+
+        def stop(self):
+            ''' Stops the impedance analyzer.
+            '''
+            self.dwf.FDwfAnalogImpedanceConfigure(self.hdwf, 0)
+
+        def reset_instrument(self):
+            ''' Resets the session configuration to default values, and resets
+                the device and driver software to a known state.
+            '''
+            self.dwf.FDwfAnalogImpedanceReset(self.hdwf)
+            self._forget_settings("FDwfAnalogImpedance")
+
+        def _measure_compensation(self, fixture, pipelined):
+            impedance, phase = self._sweep(pipelined, 0.0)
+            self._compensations.setdefault(self._compensation_key(), {})[fixture] = impedance * np.exp(1j * phase)
+
+        def _compensation_key(self):
+            return (self.mode, self.reference_resistance, self.amplitude, self.offset, self.minimum_periods,
+                    self.probe_resistance, self.probe_capacitance, self.frequencies.tobytes())
+
+        def _compensate(self, impedance, phase, open_impedance, short_impedance):
+            ''' Open/short compensation: the fixture is modelled as the short
+                impedance in series with the DUT, and the open admittance in
+                parallel with it.
+            '''
+            measured = impedance * np.exp(1j * phase) - short_impedance
+            dut = measured / (1 - measured / (open_impedance - short_impedance))
+            return np.abs(dut), np.angle(dut)
+
+        def _sweep(self, pipelined, poll_interval):
+            ''' Measures |Z| and its phase at every frequency.  Only these two
+                are read per point, the rest is derived from them with NumPy.
+            '''
+            frequencies = self.frequencies
+            count = len(frequencies)
+            impedance = np.empty(count)
+            phase = np.empty(count)
+
+            # Look the functions up once for the whole sweep
+            dwf = self.dwf
+            hdwf = self.hdwf
+            set_frequency = dwf.FDwfAnalogImpedanceFrequencySet
+            configure = dwf.FDwfAnalogImpedanceConfigure
+            status = dwf.FDwfAnalogImpedanceStatus
+            measure = dwf.FDwfAnalogImpedanceStatusMeasure
+            state = byref(self._state)
+            impedance_value = byref(self._impedance)
+            phase_value = byref(self._phase)
+            # Without auto-configure, a new frequency only applies on restart
+            restart = (pipelined == False or self._device.auto_configure == False)
+
+            def wait_done():
+                while True:
+                    status(hdwf, state)
+                    if (self._state.value == InstrumentState.DONE):
+                        return
+                    if (poll_interval > 0):
+                        time.sleep(poll_interval)
+
+            set_frequency(hdwf, float(frequencies[0]))
+            configure(hdwf, 1)
+            for i in range(count):
+                if (i > 0):
+                    set_frequency(hdwf, float(frequencies[i]))
+                if (self.settle_time > 0):
+                    time.sleep(self.settle_time)
+                if (i > 0 or self.settle_time > 0):
+                    # The capture in flight started before the frequency
+                    # change or while the DUT was settling
+                    if (restart):
+                        configure(hdwf, 1)
+                    else:
+                        wait_done()
+                wait_done()
+                measure(hdwf, ImpedanceMeasure.IMPEDANCE, impedance_value)
+                measure(hdwf, ImpedanceMeasure.IMPEDANCE_PHASE, phase_value)
+                impedance[i] = self._impedance.value
+                phase[i] = self._phase.value
+            configure(hdwf, 0)
+            return impedance, phase
+
+#------------------------------------------------------------------------------
+
+class DeviceCache(object):
+    ''' Keeps devices open between test cases.  Opening a device loads its
+        FPGA configuration, which takes hundreds of milliseconds; the cache
+        opens each (serial number, Configuration) once and returns the same
+        PyAnalogDiscovery2 until close() is called.  Asking for another
+        configuration of a cached serial number closes the old handle first.
+
+        Devices are opened with auto configure disabled, so settings are sent
+        together when an instrument is configured or started.  Acquire the
+        SPI and I2C sessions with reset = False to keep the engine state of
+        the previous test: configure_bus then only sends the settings that
+        changed.
+
+            cache = DeviceCache()
+
+            def test_sensor():
+                device = cache.open(serial_number, configuration)
+                spi = device.acquire_serial_peripheral_interface(reset = False)
+                spi.configure_bus(...)
+
+        Do not release the cached devices yourself, close the cache instead.
+    '''
+    def __init__(self, auto_configure = False, backend = None, error_checking = ErrorChecking.EVERY_CALL):
+        self.auto_configure = auto_configure
+        self.backend = backend
+        self.error_checking = error_checking
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._devices = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def open(self, serial_number, configuration):
+        ''' Returns the open device with the given serial number and
+            configuration, opening it if it is not cached.
+        '''
+        with self._lock:
+            device = self._devices.get((serial_number, configuration))
+            if (device is not None and device.dwf is not None):
+                self.cache_hits += 1
+                return device
+            self._close(serial_number)
+            device = PyAnalogDiscovery2(configuration, find_device_index(serial_number, self.backend), backend = self.backend, error_checking = self.error_checking,
+                                        serial_number = serial_number)
+            device.enable_auto_configure(self.auto_configure)
+            self._devices[(serial_number, configuration)] = device
+            self.cache_misses += 1
+            return device
+
+    def close(self, serial_number = None):
+        ''' Releases the cached devices, or only the one with serial_number.
+        '''
+        with self._lock:
+            if (serial_number is not None):
+                self._close(serial_number)
+            else:
+                for serial_number in set(key[0] for key in self._devices):
+                    self._close(serial_number)
+
+    def _close(self, serial_number):
+        for key in [key for key in self._devices if key[0] == serial_number]:
+            device = self._devices.pop(key)
+            if (device.dwf is not None):
+                device.release()
+
+#------------------------------------------------------------------------------
+
+class DevicePool(object):
+    ''' Opens every device in its own worker process and routes operations to
+        them by serial number, so the same SPI/I2C/power-supply script can run
+        on N boards in parallel.
+
+        Operations are plain functions taking the worker's PyAnalogDiscovery2
+        as their first argument.  They are sent to the workers with pickle, so
+        they must be defined at module level:
+
+            def read_supply(analogdiscovery2, voltage_level):
+                ps = analogdiscovery2.acquire_power_supply()
+                ps.configure_positive_voltage_supply_output(voltage_level, 0.5)
+                ps.enable_all_outputs(True)
+                return ps.read_positive_supply_output()
+
+            with DevicePool(configuration) as pool:
+                results = pool.run_all(read_supply, 1.0)
+    '''
+    def __init__(self, configuration, serial_numbers = None, backend = None):
+        ''' Starts one worker per serial number.  By default every device that
+            is not already opened by another process is used.  backend is
+            passed to PyAnalogDiscovery2 in every worker, so it must be a
+            backend name or library path rather than a backend object.
+        '''
+        if (serial_numbers is None):
+            serial_numbers = [device.serial_number for device in enumerate_devices(backend) if not device.is_opened]
+        self.serial_numbers = list(serial_numbers)
+        self._workers = {}
+        context = multiprocessing.get_context("spawn")
+        try:
+            for serial_number in self.serial_numbers:
+                connection, worker_connection = context.Pipe()
+                process = context.Process(target=_device_pool_worker, args=(configuration, serial_number, backend, worker_connection), name="PyAnalogDiscovery2 " + serial_number)
+                process.daemon = True
+                process.start()
+                worker_connection.close()
+                self._workers[serial_number] = (process, connection)
+            # Wait until every device is open so failures surface here
+            for serial_number in self.serial_numbers:
+                self._receive(serial_number)
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def submit(self, serial_number, function, *args, **kwargs):
+        ''' Sends an operation to the worker of the given device without
+            waiting for it.  Collect the result with result().
+        '''
+        self._workers[serial_number][1].send((function, args, kwargs))
+
+    def result(self, serial_number):
+        ''' Waits for and returns the result of the oldest operation submitted
+            to the given device.
+        '''
+        return self._receive(serial_number)
+
+    def call(self, serial_number, function, *args, **kwargs):
+        ''' Runs function(analogdiscovery2, *args, **kwargs) on the given
+            device and returns its result.
+        '''
+        self.submit(serial_number, function, *args, **kwargs)
+        return self.result(serial_number)
+
+    def run_all(self, function, *args, **kwargs):
+        ''' Runs function(analogdiscovery2, *args, **kwargs) on every device
+            in parallel and returns a dictionary of results keyed by serial
+            number.  Pass return_exceptions=True to get failures back as
+            exception objects instead of raising the first one.
+        '''
+        return_exceptions = kwargs.pop("return_exceptions", False)
+        for serial_number in self.serial_numbers:
+            self.submit(serial_number, function, *args, **kwargs)
+        results = {}
+        error = None
+        for serial_number in self.serial_numbers:
+            try:
+                results[serial_number] = self._receive(serial_number)
+            except PyAnalogDiscovery2Exception as e:
+                results[serial_number] = e
+                error = error or e
+        if (error is not None and not return_exceptions):
+            raise error
+        return results
+
+    def close(self):
+        ''' Releases every device and stops the worker processes.
+        '''
+        for process, connection in self._workers.values():
+            try:
+                connection.send(None)
+            except (OSError, ValueError):
+                pass
+        for process, connection in self._workers.values():
+            process.join(5)
+            if (process.is_alive()):
+                process.terminate()
+            connection.close()
+        self._workers = {}
+
+    def _receive(self, serial_number):
+        process, connection = self._workers[serial_number]
+        try:
+            response = connection.recv()
+        except EOFError:
+            raise PyAnalogDiscovery2Exception(Status.ERROR_DEVICE_POOL_WORKER_FAILED, None, None, "Worker for " + serial_number + " exited")
+        if (response[0] == "ok"):
+            return response[1]
+        raise PyAnalogDiscovery2Exception(response[1], None, None, serial_number + ": " + response[2], response[3])
+
+def _device_pool_worker(configuration, serial_number, backend, connection):
+    analogdiscovery2 = None
+    try:
+        analogdiscovery2 = PyAnalogDiscovery2(configuration, find_device_index(serial_number, backend), backend = backend, serial_number = serial_number)
+        connection.send(("ok", None))
+    except Exception as e:
+        if (isinstance(e, PyAnalogDiscovery2Exception)):
+            connection.send(("error", e.status, e.error_message(), e.error_code))
+        else:
+            connection.send(("error", Status.ERROR_FAILED_TO_OPEN_DEVICE, traceback.format_exc(), None))
+        return
+    try:
+        while True:
+            request = connection.recv()
+            if (request is None):
+                break
+            function, args, kwargs = request
+            try:
+                connection.send(("ok", function(analogdiscovery2, *args, **kwargs)))
+            except PyAnalogDiscovery2Exception as e:
+                connection.send(("error", e.status, e.error_message(), e.error_code))
+            except Exception:
+                connection.send(("error", Status.ERROR_DEVICE_POOL_WORKER_FAILED, traceback.format_exc(), None))
+    except EOFError:
+        pass
+    finally:
+        analogdiscovery2.release()
+        connection.close()
+
+#------------------------------------------------------------------------------
+
+# Protocol decoders for packed uint16 logic analyzer samples.  Every decoder
+# works on whole arrays at once; times are in seconds from the first sample.
+
+SPI_WORD_DTYPE = [("start", "f8"), ("end", "f8"), ("frame", "i8"), ("cs_start", "f8"), ("cs_end", "f8"), ("mosi", "u4"), ("miso", "u4")]
+I2C_BYTE_DTYPE = [("start", "f8"), ("end", "f8"), ("transaction", "i8"), ("index", "i4"), ("address", "u1"), ("read", "?"), ("value", "u1"), ("ack", "?")]
+UART_FRAME_DTYPE = [("start", "f8"), ("end", "f8"), ("value", "u2"), ("parity_error", "?"), ("framing_error", "?")]
+
+def _windows(active):
+    ''' Returns the [start, end) sample indexes of the runs where active is
+        true, including runs cut off by the start or end of the capture.
+    '''
+    changes = np.flatnonzero(np.diff(active.astype(np.int8))) + 1
+    starts = changes[active[changes]]
+    ends = changes[~active[changes]]
+    if (len(active) > 0 and active[0]):
+        starts = np.concatenate(([0], starts))
+    if (len(active) > 0 and active[-1]):
+        ends = np.concatenate((ends, [len(active)]))
+    return starts, ends
+
+def _group_bits(edges, segment, bits_per_group):
+    ''' Keeps the edges that form complete groups of bits_per_group inside
+        their segment and returns them reshaped to (groups x bits_per_group),
+        along with the segment and position within the segment of each group.
+    '''
+    if (len(edges) == 0):
+        return edges.reshape(0, bits_per_group), segment[:0], segment[:0]
+    first = np.concatenate(([True], segment[1:] != segment[:-1]))
+    first_index = np.flatnonzero(first)
+    counts = np.diff(np.concatenate((first_index, [len(edges)])))
+    position = np.arange(len(edges)) - np.repeat(first_index, counts)
+    keep = position < np.repeat(counts // bits_per_group * bits_per_group, counts)
+    groups = edges[keep].reshape(-1, bits_per_group)
+    group_segment = segment[keep][::bits_per_group]
+    group_index = position[keep][::bits_per_group] // bits_per_group
+    return groups, group_segment, group_index
+
+def _pack_bits(levels, msb_first = True):
+    bit_count = levels.shape[1]
+    shifts = np.arange(bit_count - 1, -1, -1) if msb_first else np.arange(bit_count)
+    return (levels.astype(np.uint32) << shifts.astype(np.uint32)).sum(axis=1, dtype=np.uint32)
+
+def decode_spi(samples, spi, sample_rate):
+    ''' Decodes the SPI traffic of a SerialPeripheralInterface session from
+        packed logic analyzer samples, using the session's pins, clock
+        polarity/phase, chip select polarity and word size.  Returns a record
+        array (SPI_WORD_DTYPE) with one entry per complete word; frame numbers
+        the chip select windows and cs_start/cs_end give their times.
+        Standard (MOSI/MISO) lanes and MSB first order are supported.
+    '''
+    _require_numpy("the protocol decoders")
+    samples = np.asarray(samples)
+    active_level = 0 if spi.chip_select_polarity == Polarity.IDLE_HIGH else 1
+    cs_starts, cs_ends = _windows(digital_pin(samples, spi.cs) == active_level)
+
+    # Data is sampled on the rising edge in modes 0 and 3, falling in 1 and 2
+    sample_on_rise = (spi.clock_polarity == Polarity.IDLE_LOW) == (spi.clock_phase == ClockPhase.FIRST_EDGE)
+    edges = digital_edges(samples, spi.sclk, TriggerSlope.RISE if sample_on_rise else TriggerSlope.FALL)
+    frame = np.searchsorted(cs_starts, edges, side="right") - 1
+    inside = (frame >= 0)
+    inside[inside] = edges[inside] < cs_ends[frame[inside]]
+    edges, frame = edges[inside], frame[inside]
+
+    words, word_frame, word_index = _group_bits(edges, frame, spi.bits_per_word)
+    result = np.zeros(len(words), dtype=SPI_WORD_DTYPE).view(np.recarray)
+    if (len(words) > 0):
+        result.start = words[:, 0] / sample_rate
+        result.end = words[:, -1] / sample_rate
+        result.frame = word_frame
+        result.cs_start = cs_starts[word_frame] / sample_rate
+        result.cs_end = cs_ends[word_frame] / sample_rate
+        result.mosi = _pack_bits((samples[words] >> spi.mosi) & 1)
+        result.miso = _pack_bits((samples[words] >> spi.miso) & 1)
+    return result
+
+def decode_i2c(samples, i2c, sample_rate):
+    ''' Decodes I2C traffic from packed logic analyzer samples.  Returns a
+        record array (I2C_BYTE_DTYPE) with one entry per byte; index 0 of each
+        transaction is the address byte, and ack is False where the byte was
+        not acknowledged.  A repeated start begins a new transaction.  The SCL
+        and SDA pins are taken from the InterIntegratedCircuit session.
+    '''
+    _require_numpy("the protocol decoders")
+    samples = np.asarray(samples)
+    scl, sda = i2c.scl, i2c.sda
+    scl_levels = digital_pin(samples, scl)
+    sda_edges = digital_edges(samples, sda)
+    # A SDA transition while SCL stays high is a START (falling) or a STOP (rising)
+    condition = sda_edges[(scl_levels[sda_edges] == 1) & (scl_levels[sda_edges - 1] == 1)]
+    is_start = digital_pin(samples[condition], sda) == 0
+
+    edges = digital_edges(samples, scl, TriggerSlope.RISE)
+    segment = np.searchsorted(condition, edges, side="right") - 1
+    inside = (segment >= 0)
+    inside[inside] = is_start[segment[inside]]
+    edges, segment = edges[inside], segment[inside]
+
+    groups, transaction, index = _group_bits(edges, segment, 9)
+    result = np.zeros(len(groups), dtype=I2C_BYTE_DTYPE).view(np.recarray)
+    if (len(groups) > 0):
+        levels = (samples[groups] >> sda) & 1
+        values = _pack_bits(levels[:, :8]).astype(np.uint8)
+        # Number the transactions and find their address bytes
+        transaction = np.unique(transaction, return_inverse=True)[1].reshape(-1)
+        address_byte = values[np.flatnonzero(index == 0)][np.cumsum(index == 0) - 1]
+        result.start = groups[:, 0] / sample_rate
+        result.end = groups[:, -1] / sample_rate
+        result.transaction = transaction
+        result.index = index
+        result.address = address_byte >> 1
+        result.read = (address_byte & 1) == 1
+        result.value = values
+        result.ack = levels[:, 8] == 0
+    return result
+
+def decode_uart(samples, rx, baud_rate, sample_rate, data_bits = 8, parity = 0, stop_bits = 1):
+    ''' Decodes UART frames (idle high, LSB first) received on pin rx from
+        packed logic analyzer samples.  parity is 0 for none, 1 for odd and 2
+        for even, stop_bits is 1, 1.5 or 2.  Returns a record array
+        (UART_FRAME_DTYPE) with one entry per frame.
+    '''
+    _require_numpy("the protocol decoders")
+    samples = np.asarray(samples)
+    levels = digital_pin(samples, rx)
+    bit_length = sample_rate / float(baud_rate)
+    head_bits = 1 + data_bits + (1 if parity else 0) # start, data and parity bits
+    frame_length = (head_bits + stop_bits) * bit_length # stop_bits may be fractional
+    stop_center = (head_bits + stop_bits / 2.0) * bit_length
+    candidates = digital_edges(samples, rx, TriggerSlope.FALL)
+
+    # A start bit is the first falling edge after the middle of the previous
+    # frame's stop bits.  Find each candidate's successor at once, then mark
+    # the candidates reached from the first one by pointer doubling: after
+    # round r, reached holds the frames less than 2**r frames in, and jump
+    # skips 2**r frames.  The end of the capture is a last, absorbing node.
+    count = len(candidates)
+    jump = np.append(np.searchsorted(candidates, candidates + max(1, int(stop_center))), count)
+    reached = np.zeros(count + 1, dtype=bool)
+    reached[0] = True
+    while (np.any(jump[:count] < count)):
+        reached[jump[reached]] = True
+        jump = jump[jump]
+    starts = candidates[reached[:count]]
+    starts = starts[starts + int(frame_length) <= len(samples)]
 
+    centers = (starts[:, None] + ((np.arange(head_bits) + 0.5) * bit_length).astype(np.int64)).clip(0, len(samples) - 1)
+    bits = levels[centers]
+    stop = levels[(starts + int(stop_center)).clip(0, len(samples) - 1)]
+    data = bits[:, 1:1 + data_bits]
+    result = np.zeros(len(starts), dtype=UART_FRAME_DTYPE).view(np.recarray)
+    result.start = starts / sample_rate
+    result.end = (starts + frame_length) / sample_rate
+    result.value = _pack_bits(data, msb_first=False)
+    if (parity):
+        ones = data.sum(axis=1) + bits[:, 1 + data_bits]
+        result.parity_error = (ones % 2) != (1 if parity == 1 else 0)
+    result.framing_error = (bits[:, 0] != 0) | (stop != 1)
+    return result
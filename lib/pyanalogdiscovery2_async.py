@@ -0,0 +1,148 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+''' asyncio front-end for pyanalogdiscovery2.
+
+    AsyncPyAnalogDiscovery2 runs every call of a device on a dedicated
+    executor thread and exposes the device and its sessions as coroutines.
+    It is kept out of pyanalogdiscovery2 so the core library still imports on
+    the Python versions listed in the README; this module needs Python 3.7
+    or later.
+'''
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import inspect
+
+from pyanalogdiscovery2 import BackgroundReader, ErrorChecking, PyAnalogDiscovery2
+
+class AsyncPyAnalogDiscovery2(object):
+    ''' asyncio front-end for PyAnalogDiscovery2.  Every method of the device
+        and of the sessions it acquires is exposed as a coroutine.  All DWF
+        calls for one device run on a single dedicated executor thread, so
+        they stay serialized while the event loop keeps running.  Generators
+        such as Oscilloscope.read_chunks() become async iterators:
+
+            async for chunk in scope.read_chunks():
+                ...
+
+        Use the open() coroutine to create an instance:
+
+            device = await AsyncPyAnalogDiscovery2.open(configuration)
+            ps = await device.acquire_power_supply()
+            voltage, current = await ps.read_positive_supply_output()
+            await device.release()
+    '''
+    def __init__(self, device, executor = None):
+        self.device = device
+        self.executor = executor or ThreadPoolExecutor(max_workers=1)
+
+    @classmethod
+    async def open(cls, configuration, device_index = -1, device_name = '', backend = None, error_checking = ErrorChecking.EVERY_CALL, instrumentation = None, serial_number = None):
+        ''' Opens the device on a new dedicated executor thread.  The
+            arguments are those of PyAnalogDiscovery2.
+        '''
+        executor = ThreadPoolExecutor(max_workers=1)
+        loop = asyncio.get_running_loop()
+        try:
+            device = await loop.run_in_executor(executor, partial(PyAnalogDiscovery2, configuration, device_index, device_name,
+                                                                  backend = backend, error_checking = error_checking, instrumentation = instrumentation,
+                                                                  serial_number = serial_number))
+        except Exception:
+            executor.shutdown(wait=False)
+            raise
+        return cls(device, executor)
+
+    async def release(self):
+        ''' Finalize the AnalogDiscovery2 library and shut down the executor.
+        '''
+        try:
+            await self.run(self.device.release)
+        finally:
+            self.executor.shutdown(wait=False)
+
+    async def run(self, function, *args, **kwargs):
+        ''' Runs function(*args, **kwargs) on the device's executor thread.
+            Use it to batch several blocking calls into a single hop.
+        '''
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(function, *args, **kwargs))
+
+    def __getattr__(self, name):
+        return _async_attribute(self, getattr(self.device, name))
+
+class AsyncSession(object):
+    ''' Wraps a session returned by one of the acquire_* methods so that its
+        methods become coroutines running on the device's executor thread.
+        Plain attributes such as lost_samples are returned as-is.
+    '''
+    def __init__(self, device, session):
+        self._device = device
+        self.session = session
+
+    def __getattr__(self, name):
+        return _async_attribute(self._device, getattr(self.session, name))
+
+class AsyncIterator(object):
+    ''' Drives a blocking generator one item at a time on the device's
+        executor thread.
+    '''
+    def __init__(self, device, generator):
+        self._device = device
+        self._generator = generator
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = await self._device.run(next, self._generator, _END_OF_ITERATION)
+        if (item is _END_OF_ITERATION):
+            raise StopAsyncIteration
+        return item
+
+    async def aclose(self):
+        await self._device.run(self._generator.close)
+
+_END_OF_ITERATION = object()
+
+def _async_attribute(device, attribute):
+    if (not callable(attribute)):
+        return attribute
+
+    if (inspect.isgeneratorfunction(attribute)):
+        # Creating the generator does not touch the device, only iterating does
+        def iterator(*args, **kwargs):
+            return AsyncIterator(device, attribute(*args, **kwargs))
+        return iterator
+
+    async def method(*args, **kwargs):
+        result = await device.run(attribute, *args, **kwargs)
+        if (inspect.isgenerator(result)):
+            return AsyncIterator(device, result)
+        if (getattr(attribute, "__name__", "").startswith("acquire_") or isinstance(result, BackgroundReader)):
+            return AsyncSession(device, result)
+        return result
+    return method
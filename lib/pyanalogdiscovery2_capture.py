@@ -0,0 +1,343 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+''' Chunked, indexed capture files for pyanalogdiscovery2 acquisitions.
+
+    A capture file holds the raw samples of one acquisition, the oscilloscope
+    int16 samples, the logic analyzer uint16 words or the power supply
+    telemetry, with everything needed to interpret them:
+
+    * a header with the device serial number, Configuration, sample rate,
+      channel names and the scale and offset that turn raw samples into volts
+    * the samples, interleaved by channel, in chunks of chunk_size samples
+      per channel.  A chunk is cut short where the device lost samples.
+    * an index with the first sample, the sample position and the wall clock
+      time of every chunk; samples lost by the device leave a gap in the
+      positions
+    * the minimum and maximum of every channel over every chunk
+
+    The samples form one contiguous (samples x channels) array, so
+    CaptureReader memory-maps the file and returns zero-copy NumPy views of
+    any time range, and draws decimated overviews from the chunk summaries
+    without reading the samples.
+
+    The index and summaries are written when the file is closed.  A file that
+    was not closed, for example after a crash, can still be read: its chunks
+    are found from the file size, without the gaps of the lost samples, and
+    its summaries are computed on demand.
+'''
+
+import json
+import os
+import struct
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b"PAD2CAP\x00"
+END_MAGIC = b"PAD2END\x00"
+VERSION = 1
+
+# The samples start at a multiple of this offset
+_ALIGNMENT = 4096
+
+# Header: magic, version, JSON length.  Trailer: index offset, chunk count,
+# sample count, magic.
+_HEADER = struct.Struct("<8sII")
+_TRAILER = struct.Struct("<QQQ8s")
+
+# row is the index of the first sample of the chunk in the file, position the
+# same counting the samples that were lost
+INDEX_DTYPE = [("row", "<u8"), ("position", "<u8"), ("time", "<f8")]
+
+class CaptureWriter(object):
+    ''' Writes a capture file.  Append (channels x samples) blocks, or 1-D
+        blocks for a single channel, with write(), report samples the device
+        lost with skip(), and close() the file to write the index and the
+        summaries.
+
+            with CaptureWriter("scope.pad2", ["Channel 1"], np.int16, sample_rate, scale, offset) as capture:
+                for chunk in scope.read_chunks():
+                    capture.write(chunk)
+    '''
+    def __init__(self, filename, channels, dtype, sample_rate, scale = None, offset = None, serial_number = None, configuration = None, chunk_size = 65536, metadata = None):
+        if (np is None):
+            raise ImportError("NumPy is required for capture files")
+        self.filename = filename
+        self.channels = list(channels)
+        self.dtype = np.dtype(dtype).newbyteorder("<")
+        self.sample_rate = float(sample_rate)
+        self.chunk_size = chunk_size
+        self.samples = 0 # samples per channel written
+        self.position = 0 # samples per channel including the lost ones
+
+        header = {
+            "version": VERSION,
+            "serial_number": serial_number,
+            "configuration": None if configuration is None else int(configuration),
+            "configuration_name": getattr(configuration, "name", None),
+            "dtype": self.dtype.str,
+            "channels": self.channels,
+            "sample_rate": self.sample_rate,
+            "scale": [float(value) for value in (np.ones(len(self.channels)) if scale is None else np.ravel(scale))],
+            "offset": [float(value) for value in (np.zeros(len(self.channels)) if offset is None else np.ravel(offset))],
+            "chunk_size": chunk_size,
+            "start_time": time.time(),
+            "metadata": metadata or {},
+        }
+        encoded = json.dumps(header).encode("utf-8")
+        self.data_offset = (_HEADER.size + len(encoded) + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+        self._file = open(filename, "wb")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, len(encoded)) + encoded.ljust(self.data_offset - _HEADER.size, b" "))
+
+        # Samples are gathered into one chunk, interleaved, before being written
+        self._chunk = np.empty((chunk_size, len(self.channels)), dtype=self.dtype)
+        self._fill = 0
+        self._chunk_position = 0
+        self._chunk_time = 0.0
+        self._index = []
+        self._minimum = []
+        self._maximum = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def write(self, samples):
+        ''' Appends a (channels x samples) block of raw samples.
+        '''
+        samples = np.asarray(samples)
+        if (samples.ndim == 1):
+            samples = samples[None, :]
+        count = samples.shape[1]
+        index = 0
+        while (index < count):
+            if (self._fill == 0):
+                self._chunk_position = self.position
+                self._chunk_time = time.time()
+            n = min(count - index, self.chunk_size - self._fill)
+            self._chunk[self._fill:self._fill + n] = samples[:, index:index + n].T
+            self._fill += n
+            index += n
+            self.samples += n
+            self.position += n
+            if (self._fill == self.chunk_size):
+                self._write_chunk()
+
+    def skip(self, count):
+        ''' Records that count samples per channel were lost before the next
+            samples written.  The current chunk is cut short, so the gap falls
+            between two chunks.
+        '''
+        if (count <= 0):
+            return
+        if (self._fill > 0):
+            self._write_chunk()
+        self.position += count
+
+    def close(self):
+        ''' Writes the last chunk, the index and the summaries, and closes
+            the file.
+        '''
+        if (self._file is None):
+            return
+        if (self._fill > 0):
+            self._write_chunk()
+        index_offset = self._file.tell()
+        np.array(self._index, dtype=INDEX_DTYPE).tofile(self._file)
+        summaries = np.empty((len(self._index), len(self.channels), 2), dtype=self.dtype)
+        if (len(self._index) > 0):
+            summaries[:, :, 0] = self._minimum
+            summaries[:, :, 1] = self._maximum
+        summaries.tofile(self._file)
+        self._file.write(_TRAILER.pack(index_offset, len(self._index), self.samples, END_MAGIC))
+        self._file.close()
+        self._file = None
+
+    def _write_chunk(self):
+        chunk = self._chunk[:self._fill]
+        self._file.write(chunk.data)
+        self._index.append((self.samples - self._fill, self._chunk_position, self._chunk_time))
+        self._minimum.append(chunk.min(axis=0))
+        self._maximum.append(chunk.max(axis=0))
+        self._fill = 0
+
+class CaptureReader(object):
+    ''' Reads a capture file through a read-only memory map.  Samples are
+        returned as zero-copy (channels x samples) views of the file.
+    '''
+    def __init__(self, filename):
+        if (np is None):
+            raise ImportError("NumPy is required for capture files")
+        self.filename = filename
+        with open(filename, "rb") as f:
+            magic, version, length = _HEADER.unpack(f.read(_HEADER.size))
+            if (magic != MAGIC):
+                raise ValueError("%s is not a capture file" % filename)
+            if (version > VERSION):
+                raise ValueError("%s is a version %d capture file, this reader supports version %d" % (filename, version, VERSION))
+            self.header = json.loads(f.read(length).decode("utf-8"))
+            self.data_offset = (_HEADER.size + length + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - _TRAILER.size))
+            trailer = f.read(_TRAILER.size)
+
+        self.channels = self.header["channels"]
+        self.dtype = np.dtype(self.header["dtype"])
+        self.sample_rate = self.header["sample_rate"]
+        self.chunk_size = self.header["chunk_size"]
+        self.scale = np.array(self.header["scale"])[:, None]
+        self.offset = np.array(self.header["offset"])[:, None]
+        self.serial_number = self.header["serial_number"]
+        self.configuration = self.header["configuration"]
+        self.start_time = self.header["start_time"]
+        self.metadata = self.header["metadata"]
+        row_size = self.dtype.itemsize * len(self.channels)
+
+        if (len(trailer) == _TRAILER.size and trailer[-8:] == END_MAGIC):
+            index_offset, chunk_count, sample_count, magic = _TRAILER.unpack(trailer)
+            self.closed_cleanly = True
+            self.index = np.fromfile(filename, dtype=INDEX_DTYPE, count=chunk_count, offset=index_offset)
+            summaries_offset = index_offset + chunk_count * np.dtype(INDEX_DTYPE).itemsize
+            self._summaries = np.fromfile(filename, dtype=self.dtype, count=chunk_count * len(self.channels) * 2, offset=summaries_offset).reshape(chunk_count, len(self.channels), 2)
+        else:
+            # The writer did not close the file, keep the whole chunks
+            self.closed_cleanly = False
+            sample_count = (size - self.data_offset) // row_size // self.chunk_size * self.chunk_size
+            chunk_count = sample_count // self.chunk_size
+            self.index = np.zeros(chunk_count, dtype=INDEX_DTYPE)
+            self.index["row"] = np.arange(chunk_count) * self.chunk_size
+            self.index["position"] = self.index["row"]
+            self.index["time"] = np.nan
+            self._summaries = None
+
+        self.sample_count = sample_count
+        self.chunk_count = chunk_count
+        if (sample_count > 0):
+            self.data = np.memmap(filename, dtype=self.dtype, mode="r", offset=self.data_offset, shape=(sample_count, len(self.channels)))
+        else:
+            self.data = np.zeros((0, len(self.channels)), dtype=self.dtype)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.close()
+
+    def close(self):
+        ''' Releases the memory map.  Views returned earlier stay valid until
+            they are released too.
+        '''
+        self.data = None
+
+    def duration(self):
+        ''' Returns the time in seconds from the first to past the last
+            sample, including the samples that were lost.
+        '''
+        if (self.chunk_count == 0):
+            return 0.0
+        last = self.sample_count - int(self.index["row"][-1])
+        return (int(self.index["position"][-1]) + last) / self._rate()
+
+    def read_samples(self, first = 0, count = None):
+        ''' Returns a (channels x samples) view of count samples starting at
+            sample first of the file, not counting lost samples.
+        '''
+        stop = self.sample_count if count is None else min(self.sample_count, first + count)
+        return self.data[first:stop].T
+
+    def read(self, start = 0.0, stop = None):
+        ''' Returns a (channels x samples) view of the samples acquired from
+            start to stop seconds after the acquisition started.  Lost samples
+            are not in the view.
+        '''
+        first = self._sample_at(start * self._rate())
+        last = self.sample_count if stop is None else self._sample_at(stop * self._rate())
+        return self.data[first:max(first, last)].T
+
+    def times(self, first = 0, count = None):
+        ''' Returns the time in seconds of the samples read_samples() returns.
+        '''
+        stop = self.sample_count if count is None else min(self.sample_count, first + count)
+        samples = np.arange(first, stop)
+        chunks = np.searchsorted(self.index["row"], samples, side="right") - 1
+        return (self.index["position"][chunks] + (samples - self.index["row"][chunks])) / self._rate()
+
+    def to_volts(self, raw_samples):
+        ''' Scales a (channels x samples) block of raw samples to volts.
+        '''
+        return raw_samples * self.scale + self.offset
+
+    def summaries(self):
+        ''' Returns the (chunks x channels x 2) raw minimum and maximum of
+            every chunk.  For a file that was not closed they are computed
+            from the samples the first time.
+        '''
+        if (self._summaries is None):
+            chunks = self.data[:self.chunk_count * self.chunk_size].reshape(self.chunk_count, self.chunk_size, len(self.channels))
+            self._summaries = np.stack([chunks.min(axis=1), chunks.max(axis=1)], axis=-1)
+        return self._summaries
+
+    def overview(self, points = 1000, start = 0.0, stop = None):
+        ''' Returns (times, minimum, maximum) for drawing the capture from
+            start to stop seconds at up to points points, one point per group
+            of whole chunks.  minimum and maximum are (channels x points) raw
+            samples computed from the chunk summaries alone.
+        '''
+        positions = self.index["position"]
+        first = max(0, int(np.searchsorted(positions, start * self._rate(), side="right")) - 1)
+        last = self.chunk_count if stop is None else max(first + 1, int(np.searchsorted(positions, stop * self._rate(), side="left")))
+        last = min(last, self.chunk_count)
+        if (last <= first):
+            empty = np.zeros((len(self.channels), 0), dtype=self.dtype)
+            return np.zeros(0), empty, empty
+        summaries = self.summaries()[first:last]
+        groups = np.unique(np.linspace(0, last - first, min(points, last - first), endpoint=False).astype(np.int64))
+        minimum = np.minimum.reduceat(summaries[:, :, 0], groups, axis=0).T
+        maximum = np.maximum.reduceat(summaries[:, :, 1], groups, axis=0).T
+        return positions[first + groups] / self._rate(), minimum, maximum
+
+    def _sample_at(self, position):
+        ''' Returns the index in the file of the first sample at or after
+            the sample position, which counts the lost samples.
+        '''
+        positions = self.index["position"]
+        rows = self.index["row"]
+        chunk = int(np.searchsorted(positions, position, side="right")) - 1
+        if (chunk < 0):
+            return 0
+        size = (rows[chunk + 1] if chunk < self.chunk_count - 1 else self.sample_count) - rows[chunk]
+        return int(rows[chunk]) + min(int(size), max(0, int(np.ceil(position - positions[chunk]))))
+
+    def _rate(self):
+        if (self.sample_rate <= 0):
+            raise ValueError("%s has no sample rate, use read_samples()" % self.filename)
+        return self.sample_rate
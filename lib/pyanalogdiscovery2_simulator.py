@@ -0,0 +1,864 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+''' A simulated DWF library for running pyanalogdiscovery2 without a device.
+
+    SimulatedDwf implements the dwf.h functions the wrapper calls in Python,
+    accepting the same ctypes arguments as the real library.  It models one
+    Analog Discovery 2:
+
+    * device enumeration, open and close, and the last error message
+    * the power supplies and the USB monitor (AnalogIO)
+    * SPI and I2C transfers answered by scriptable slave models
+    * UART and CAN with transmissions looped back to the receiver and
+      injectable received data and errors
+    * record mode AnalogIn and DigitalIn acquisitions generated from
+      functions of time, with injectable data loss
+    * triggered single AnalogIn acquisitions, one trigger every
+      analog_in_trigger_interval seconds of simulated time
+    * AnalogOut playback and DigitalOut patterns
+    * an impedance analyzer measuring a DUT model through a fixture with
+      open and short parasitics
+
+    By default every status poll makes a fixed number of samples available,
+    so runs are deterministic and limited only by the speed of the wrapper.
+    Select it with PyAnalogDiscovery2(..., backend = "simulator"), or by
+    setting the PYANALOGDISCOVERY2_BACKEND environment variable to
+    "simulator".  Pass a SimulatedDwf instance as the backend to script the
+    slave models and signals.
+'''
+
+from ctypes import POINTER, c_double, c_int, c_ubyte, c_uint, c_ushort, c_void_p, cast, memmove, string_at, _SimpleCData
+from collections import deque
+import math
+import threading
+import time
+
+from pyanalogdiscovery2 import _load_prototypes
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# DwfState values
+_READY = 0
+_ARMED = 1
+_DONE = 2
+_RUNNING = 3
+
+# AnalogIO node types (ANALOGIO in dwf.h)
+_ENABLE = 1
+_VOLTAGE = 2
+_CURRENT = 3
+_TEMPERATURE = 5
+
+def _address(pointer):
+    ''' Returns the address of a ctypes pointer argument: a byref(), a ctypes
+        object, c_void_p, bytes or a plain integer address.
+    '''
+    if (pointer is None):
+        return None
+    if (isinstance(pointer, int)):
+        return pointer
+    return cast(pointer, c_void_p).value
+
+def _store(pointer, value, ctype = c_int):
+    ''' Stores value through an output pointer argument.
+    '''
+    target = getattr(pointer, "_obj", None)
+    if (isinstance(target, _SimpleCData)):
+        target.value = value
+    else:
+        cast(pointer, POINTER(ctype))[0] = value
+
+def _value(argument):
+    return argument.value if isinstance(argument, _SimpleCData) else argument
+
+def _read_words(pointer, count, ctype):
+    if (count <= 0 or pointer is None):
+        return []
+    return list((ctype * count).from_address(_address(pointer)))
+
+def _write_words(pointer, words, ctype):
+    if (len(words) > 0):
+        (ctype * len(words)).from_address(_address(pointer))[:] = words
+
+#------------------------------------------------------------------------------
+
+class SpiSlave(object):
+    ''' SPI slave model.  The default answers every transaction with the
+        words it received (a MOSI to MISO loopback).  Override transfer() to
+        script a device.
+    '''
+    def select(self, level):
+        ''' Called with the new chip select level around each transaction.
+        '''
+        pass
+
+    def transfer(self, words, read_count, bits_per_word):
+        ''' Receives the words written by the master and returns read_count
+            words to shift back.
+        '''
+        return (list(words) + [0] * read_count)[:read_count]
+
+class I2cSlave(object):
+    ''' I2C slave model.  write() and read() return False/None to not
+        acknowledge the transfer.
+    '''
+    def write(self, data):
+        return True
+
+    def read(self, count):
+        return bytes(count)
+
+class I2cRegisterMap(I2cSlave):
+    ''' A register-mapped I2C device.  A write sets the register pointer from
+        the first register_address_size bytes and stores the remaining bytes
+        at consecutive registers; a read returns consecutive registers from
+        the pointer.  Both auto-increment the pointer.
+    '''
+    def __init__(self, registers = None, register_address_size = 1, size = 256):
+        self.registers = bytearray(size)
+        self.register_address_size = register_address_size
+        self.pointer = 0
+        for register, value in (registers or {}).items():
+            self.registers[register] = value
+
+    def write(self, data):
+        if (len(data) >= self.register_address_size):
+            self.pointer = int.from_bytes(bytes(data[:self.register_address_size]), "big") % len(self.registers)
+            for value in data[self.register_address_size:]:
+                self.registers[self.pointer] = value
+                self.pointer = (self.pointer + 1) % len(self.registers)
+        return True
+
+    def read(self, count):
+        data = bytearray()
+        for i in range(count):
+            data.append(self.registers[self.pointer])
+            self.pointer = (self.pointer + 1) % len(self.registers)
+        return bytes(data)
+
+#------------------------------------------------------------------------------
+
+class _Record(object):
+    ''' Sample bookkeeping of a simulated record mode acquisition.
+    '''
+    def __init__(self):
+        self.state = _READY
+        self.sample_rate = 1000000.0
+        self.sample_limit = 0 # 0 records forever
+        self.position = 0 # samples produced since the start
+        self.block_start = 0 # sample index of the data made available
+        self.available = 0
+        self.lost = 0
+        self.corrupt = 0
+        self.pending_lost = 0
+        self.pending_corrupt = 0
+        self.last_time = 0.0
+
+    def start(self):
+        self.state = _RUNNING
+        self.position = 0
+        self.available = 0
+        self.last_time = time.perf_counter()
+
+    def status(self, samples_per_status):
+        if (self.state != _RUNNING):
+            self.available = 0
+            self.lost = self.corrupt = 0
+            return
+        if (samples_per_status is None):
+            now = time.perf_counter()
+            count = int((now - self.last_time) * self.sample_rate)
+            self.last_time += count / self.sample_rate
+        else:
+            count = samples_per_status
+        self.lost, self.pending_lost = self.pending_lost, 0
+        self.corrupt, self.pending_corrupt = self.pending_corrupt, 0
+        if (self.sample_limit > 0):
+            remaining = self.sample_limit - self.position
+            self.lost = min(self.lost, remaining)
+            count = min(count, remaining - self.lost)
+        # Lost samples are skipped over, as on the device
+        self.position += self.lost
+        self.block_start = self.position
+        self.available = count
+        self.position += count
+        if (self.sample_limit > 0 and self.position >= self.sample_limit):
+            self.state = _DONE
+
+class SimulatedDwf(object):
+    ''' Simulated DWF library.  spi_slave answers SPI transfers, i2c_slaves
+        maps 7-bit addresses to I2C slave models, and analog_signals maps
+        oscilloscope channels to functions returning volts for an array of
+        times in seconds.  digital_signal returns the uint16 logic analyzer
+        samples for an array of sample indices.  samples_per_status is the
+        number of samples each record mode status poll makes available; None
+        paces the acquisitions by the real time elapsed instead.
+        uart_buffer_size is the receive buffer of the UART, bytes arriving
+        while it is full are dropped and reported as an overflow.
+    '''
+    def __init__(self, spi_slave = None, i2c_slaves = None, analog_signals = None, digital_signal = None, samples_per_status = 4096, serial_numbers = ("SD2SIM000001",), analog_out_buffer_size = 4096, uart_buffer_size = 4096):
+        self.spi_slave = spi_slave if spi_slave is not None else SpiSlave()
+        self.i2c_slaves = dict(i2c_slaves) if i2c_slaves is not None else {}
+        self.i2c_bus_free = True # False simulates a bus held low
+        self.analog_signals = analog_signals if analog_signals is not None else {
+            0: lambda t: np.sin(2 * np.pi * 1000.0 * t),
+            1: lambda t: 0.5 * np.sign(np.sin(2 * np.pi * 250.0 * t)),
+        }
+        self.digital_signal = digital_signal if digital_signal is not None else (lambda index: index.astype(np.uint16))
+        self.samples_per_status = samples_per_status
+        self.serial_numbers = list(serial_numbers)
+        self.last_error = ""
+        self.opened = set()
+        self.settings = {}
+
+        self.analog_in = _Record()
+        self.analog_in_ranges = {0: 5.0, 1: 5.0}
+        self.analog_in_offsets = {0: 0.0, 1: 0.0}
+        self.analog_in_record_length = 0.0
+        self.analog_in_mode = 0 # single
+        self.analog_in_buffer_size = 8192
+        self.analog_in_trigger_interval = 0.01 # seconds between triggers
+        self.analog_in_triggers = 0
+        self.digital_in = _Record()
+        self.digital_in_clock = 100000000.0
+        self.digital_in_trigger_position = 0
+
+        self.analog_out_buffer_size = analog_out_buffer_size
+        self.analog_out_state = _READY
+        self.analog_out_rate = 1000.0
+        self.analog_out_run = 0.0
+        self.analog_out_queued = 0
+        self.analog_out_played = 0
+        self.analog_out_expected = 0
+        self.analog_out_lost = 0
+        self.analog_out_pending_lost = 0
+        self.analog_out_time = 0.0
+
+        self.digital_out_state = _READY
+        self.digital_out_pattern = b""
+        self.digital_out_bits_per_sample = 0
+        self.digital_out_sample_count = 0
+
+        # UART and CAN are received on the drain thread of the wrapper
+        self.bus_lock = threading.Lock()
+        self.uart_buffer_size = uart_buffer_size
+        self.uart_rx = bytearray()
+        self.uart_overflow = False
+        self.uart_parity_error = False
+        self.can_rx = deque() # (status, id, extended, remote, data)
+
+        # Impedance analyzer: functions of the frequency in Hz.  The DUT is
+        # seen through the short impedance in series and the open admittance
+        # in parallel; a DUT of None is an open fixture.
+        self.impedance_dut = lambda frequency: 1000.0 / (1 + 2j * math.pi * frequency * 1000.0 * 100e-9) # 1k || 100nF
+        self.impedance_short = lambda frequency: 0.05 + 2j * math.pi * frequency * 20e-9
+        self.impedance_open = lambda frequency: 2j * math.pi * frequency * 5e-12
+        self.impedance_frequency = 1000.0
+        self.impedance_capture_frequency = None # of the capture in flight
+        self.impedance_running = False
+        self.impedance_measured = None
+
+        # AnalogIO: channel -> (label, [(name, units, type)])
+        self.analog_io_channels = [
+            ("V+", [("Enable", "", _ENABLE), ("Voltage", "V", _VOLTAGE), ("Current", "A", _CURRENT)]),
+            ("V-", [("Enable", "", _ENABLE), ("Voltage", "V", _VOLTAGE), ("Current", "A", _CURRENT)]),
+            ("USB", [("Voltage", "V", _VOLTAGE), ("Current", "A", _CURRENT), ("Temperature", "degC", _TEMPERATURE)]),
+        ]
+        self.analog_io_enable = False
+        self.analog_io_values = {}
+        self.load_resistance = 1000.0 # ohms on each supply
+
+    def inject_loss(self, instrument, lost, corrupt = 0):
+        ''' Makes the next status poll of instrument ("analog_in",
+            "digital_in" or "analog_out") report lost and corrupt samples.
+        '''
+        if (instrument == "analog_out"):
+            self.analog_out_pending_lost += lost
+            return
+        record = getattr(self, instrument)
+        record.pending_lost += lost
+        record.pending_corrupt += corrupt
+
+    def __getattr__(self, name):
+        # Only functions declared in dwf.h exist, as in the real library
+        if (name.startswith("FDwf") and name not in _load_prototypes()):
+            raise AttributeError("dwf.h does not declare " + name)
+        # Settings that do not change the simulation are accepted and kept
+        if (name.startswith("FDwf") and (name.endswith("Set") or name.endswith("Reset"))):
+            def setter(*args):
+                self.settings[name] = tuple(_value(argument) for argument in args[1:])
+                return 1
+            return setter
+        raise AttributeError("The simulator does not implement " + name)
+
+    def uart_receive(self, data, parity_error = False):
+        ''' Makes the UART receive data, as if sent by another device.
+        '''
+        with self.bus_lock:
+            free = self.uart_buffer_size - len(self.uart_rx)
+            if (len(data) > free):
+                self.uart_overflow = True
+            self.uart_rx += bytes(data)[:max(0, free)]
+            self.uart_parity_error = self.uart_parity_error or parity_error
+
+    def can_receive(self, id, data = b"", extended = False, remote = False, status = 1):
+        ''' Makes the CAN receiver get a frame, as if sent by another device.
+            A status of 2 or 3 reports a bit stuffing or CRC error instead.
+        '''
+        with self.bus_lock:
+            self.can_rx.append((status, id, extended, remote, bytes(data)))
+
+    def _fail(self, message):
+        self.last_error = message
+        return 0
+
+    # Device --------------------------------------------------------------
+
+    def FDwfGetLastError(self, perror):
+        _store(perror, 0 if self.last_error == "" else 1)
+        return 1
+
+    def FDwfGetLastErrorMsg(self, message):
+        message.value = self.last_error.encode("utf-8")
+        return 1
+
+    def FDwfEnum(self, enumfilter, pcount):
+        _store(pcount, len(self.serial_numbers))
+        return 1
+
+    def FDwfEnumSN(self, index, serial_number):
+        serial_number.value = self.serial_numbers[_value(index)].encode("utf-8")
+        return 1
+
+    def FDwfEnumDeviceName(self, index, device_name):
+        device_name.value = b"Analog Discovery 2"
+        return 1
+
+    def FDwfEnumUserName(self, index, user_name):
+        user_name.value = b"Simulated"
+        return 1
+
+    def FDwfEnumDeviceIsOpened(self, index, pis_opened):
+        _store(pis_opened, int(_value(index) in self.opened))
+        return 1
+
+    def FDwfDeviceConfigOpen(self, index, configuration, phdwf):
+        index = _value(index)
+        if (index < 0):
+            index = next((i for i in range(len(self.serial_numbers)) if i not in self.opened), len(self.serial_numbers))
+        if (index >= len(self.serial_numbers) or index in self.opened):
+            _store(phdwf, 0)
+            return self._fail("Device not found or already opened")
+        self.opened.add(index)
+        self.last_error = ""
+        _store(phdwf, index + 1)
+        return 1
+
+    def FDwfDeviceOpen(self, index, phdwf):
+        return self.FDwfDeviceConfigOpen(index, 0, phdwf)
+
+    def FDwfDeviceClose(self, hdwf):
+        self.opened.discard(_value(hdwf) - 1)
+        return 1
+
+    def FDwfDeviceCloseAll(self):
+        self.opened.clear()
+        return 1
+
+    def FDwfDeviceReset(self, hdwf):
+        self.settings.clear()
+        return 1
+
+    def FDwfDeviceAutoConfigureSet(self, hdwf, auto_configure):
+        self.settings["FDwfDeviceAutoConfigureSet"] = (_value(auto_configure),)
+        return 1
+
+    # AnalogIO ------------------------------------------------------------
+
+    def FDwfAnalogIOEnableSet(self, hdwf, enable):
+        self.analog_io_enable = bool(_value(enable))
+        return 1
+
+    def FDwfAnalogIOStatus(self, hdwf):
+        return 1
+
+    def FDwfAnalogIOConfigure(self, hdwf):
+        return 1
+
+    def FDwfAnalogIOChannelCount(self, hdwf, pcount):
+        _store(pcount, len(self.analog_io_channels))
+        return 1
+
+    def FDwfAnalogIOChannelName(self, hdwf, channel, name, label):
+        channel_label = self.analog_io_channels[_value(channel)][0]
+        name.value = channel_label.encode("utf-8")
+        label.value = channel_label.encode("utf-8")
+        return 1
+
+    def FDwfAnalogIOChannelInfo(self, hdwf, channel, pnodes):
+        _store(pnodes, len(self.analog_io_channels[_value(channel)][1]))
+        return 1
+
+    def FDwfAnalogIOChannelNodeName(self, hdwf, channel, node, name, units):
+        node_name, node_units, node_type = self.analog_io_channels[_value(channel)][1][_value(node)]
+        name.value = node_name.encode("utf-8")
+        units.value = node_units.encode("utf-8")
+        return 1
+
+    def FDwfAnalogIOChannelNodeInfo(self, hdwf, channel, node, ptype):
+        _store(ptype, self.analog_io_channels[_value(channel)][1][_value(node)][2], c_ubyte)
+        return 1
+
+    def FDwfAnalogIOChannelNodeStatusInfo(self, hdwf, channel, node, pminimum, pmaximum, psteps):
+        monitored = self.analog_io_channels[_value(channel)][1][_value(node)][2] != _ENABLE
+        _store(pminimum, -5.0 if monitored else 0.0, c_double)
+        _store(pmaximum, 5.0 if monitored else 1.0, c_double)
+        _store(psteps, 4096 if monitored else 0)
+        return 1
+
+    def FDwfAnalogIOChannelNodeSet(self, hdwf, channel, node, value):
+        self.analog_io_values[(_value(channel), _value(node))] = float(_value(value))
+        return 1
+
+    def FDwfAnalogIOChannelNodeGet(self, hdwf, channel, node, pvalue):
+        _store(pvalue, self.analog_io_values.get((_value(channel), _value(node)), 0.0), c_double)
+        return 1
+
+    def FDwfAnalogIOChannelNodeStatus(self, hdwf, channel, node, pvalue):
+        _store(pvalue, self._analog_io_status(_value(channel), _value(node)), c_double)
+        return 1
+
+    def _analog_io_status(self, channel, node):
+        node_type = self.analog_io_channels[channel][1][node][2]
+        if (channel == 2):
+            supplies = [self._analog_io_status(supply, 2) for supply in (0, 1)]
+            return {_VOLTAGE: 5.0, _CURRENT: 0.2 + abs(supplies[0]) + abs(supplies[1]), _TEMPERATURE: 40.0}[node_type]
+        enabled = self.analog_io_enable and self.analog_io_values.get((channel, 0), 0.0) != 0.0
+        voltage = self.analog_io_values.get((channel, 1), 0.0) if enabled else 0.0
+        if (node_type == _VOLTAGE):
+            return voltage
+        if (node_type == _CURRENT):
+            current = voltage / self.load_resistance
+            limit = self.analog_io_values.get((channel, 2), 0.0)
+            return math.copysign(min(abs(current), limit), current) if limit > 0 else current
+        return float(enabled)
+
+    # SPI -----------------------------------------------------------------
+
+    def FDwfDigitalSpiSelect(self, hdwf, channel, level):
+        self.spi_slave.select(_value(level))
+        return 1
+
+    def _spi(self, bits_per_word, write_pointer, write_count, read_pointer, read_count, ctype):
+        words = _read_words(write_pointer, _value(write_count), ctype)
+        read_count = _value(read_count)
+        read_words = self.spi_slave.transfer(words, read_count, _value(bits_per_word))
+        if (read_count > 0):
+            _write_words(read_pointer, list(read_words)[:read_count], ctype)
+        return 1
+
+    def FDwfDigitalSpiWriteRead(self, hdwf, cdq, bits_per_word, write_data, write_count, read_data, read_count):
+        return self._spi(bits_per_word, write_data, write_count, read_data, read_count, c_ubyte)
+
+    def FDwfDigitalSpiWriteRead16(self, hdwf, cdq, bits_per_word, write_data, write_count, read_data, read_count):
+        return self._spi(bits_per_word, write_data, write_count, read_data, read_count, c_ushort)
+
+    def FDwfDigitalSpiWriteRead32(self, hdwf, cdq, bits_per_word, write_data, write_count, read_data, read_count):
+        return self._spi(bits_per_word, write_data, write_count, read_data, read_count, c_uint)
+
+    def FDwfDigitalSpiRead(self, hdwf, cdq, bits_per_word, read_data, read_count):
+        return self._spi(bits_per_word, None, 0, read_data, read_count, c_ubyte)
+
+    def FDwfDigitalSpiRead16(self, hdwf, cdq, bits_per_word, read_data, read_count):
+        return self._spi(bits_per_word, None, 0, read_data, read_count, c_ushort)
+
+    def FDwfDigitalSpiRead32(self, hdwf, cdq, bits_per_word, read_data, read_count):
+        return self._spi(bits_per_word, None, 0, read_data, read_count, c_uint)
+
+    def FDwfDigitalSpiWrite(self, hdwf, cdq, bits_per_word, write_data, write_count):
+        return self._spi(bits_per_word, write_data, write_count, None, 0, c_ubyte)
+
+    def FDwfDigitalSpiWrite16(self, hdwf, cdq, bits_per_word, write_data, write_count):
+        return self._spi(bits_per_word, write_data, write_count, None, 0, c_ushort)
+
+    def FDwfDigitalSpiWrite32(self, hdwf, cdq, bits_per_word, write_data, write_count):
+        return self._spi(bits_per_word, write_data, write_count, None, 0, c_uint)
+
+    def FDwfDigitalSpiWriteOne(self, hdwf, cdq, bits_per_word, value):
+        self.spi_slave.transfer([_value(value)], 0, _value(bits_per_word))
+        return 1
+
+    # I2C -----------------------------------------------------------------
+
+    def FDwfDigitalI2cClear(self, hdwf, pfree):
+        _store(pfree, 1 if self.i2c_bus_free else 0)
+        return 1
+
+    def _i2c(self, address8, write_data, read_pointer, read_count, pnak):
+        slave = self.i2c_slaves.get(_value(address8) >> 1)
+        nak = 0
+        if (slave is None):
+            nak = 1
+        elif (write_data is not None and not slave.write(write_data)):
+            nak = 2
+        elif (read_count > 0):
+            data = slave.read(read_count)
+            if (data is None):
+                nak = 1
+            else:
+                _write_words(read_pointer, list(data)[:read_count], c_ubyte)
+        _store(pnak, nak)
+        return 1
+
+    def FDwfDigitalI2cWriteRead(self, hdwf, address8, write_data, write_count, read_data, read_count, pnak):
+        return self._i2c(address8, bytes(_read_words(write_data, _value(write_count), c_ubyte)), read_data, _value(read_count), pnak)
+
+    def FDwfDigitalI2cRead(self, hdwf, address8, read_data, read_count, pnak):
+        return self._i2c(address8, None, read_data, _value(read_count), pnak)
+
+    def FDwfDigitalI2cWrite(self, hdwf, address8, write_data, write_count, pnak):
+        return self._i2c(address8, bytes(_read_words(write_data, _value(write_count), c_ubyte)), None, 0, pnak)
+
+    def FDwfDigitalI2cWriteOne(self, hdwf, address8, value, pnak):
+        return self._i2c(address8, bytes([_value(value)]), None, 0, pnak)
+
+    # UART ----------------------------------------------------------------
+
+    def FDwfDigitalUartTx(self, hdwf, data, count):
+        count = _value(count)
+        if (count > 0):
+            self.uart_receive(string_at(_address(data), count))
+        return 1
+
+    def FDwfDigitalUartRx(self, hdwf, data, count, preceived, pparity):
+        count = _value(count)
+        with self.bus_lock:
+            if (count == 0):
+                # Starts the receiver
+                del self.uart_rx[:]
+                self.uart_overflow = False
+                self.uart_parity_error = False
+                received = b""
+            else:
+                received = bytes(self.uart_rx[:count])
+                del self.uart_rx[:count]
+            parity = -1 if self.uart_overflow else (1 if self.uart_parity_error else 0)
+            self.uart_overflow = False
+            self.uart_parity_error = False
+        if (len(received) > 0):
+            memmove(_address(data), received, len(received))
+        _store(preceived, len(received))
+        _store(pparity, parity)
+        return 1
+
+    # CAN -----------------------------------------------------------------
+
+    def FDwfDigitalCanTx(self, hdwf, id, extended, remote, dlc, data):
+        id = _value(id)
+        if (id >= 0):
+            # -1 only initializes the transmitter
+            dlc = _value(dlc)
+            payload = b"" if _value(remote) else string_at(_address(data), dlc)
+            self.can_receive(id, payload, bool(_value(extended)), bool(_value(remote)))
+        return 1
+
+    def FDwfDigitalCanRx(self, hdwf, pid, pextended, premote, pdlc, data, count, pstatus):
+        count = _value(count)
+        with self.bus_lock:
+            if (count == 0):
+                # Starts the receiver
+                self.can_rx.clear()
+                frame = None
+            else:
+                frame = self.can_rx.popleft() if len(self.can_rx) > 0 else None
+        if (frame is None):
+            _store(pstatus, 0)
+            return 1
+        status, id, extended, remote, payload = frame
+        payload = payload[:count]
+        if (len(payload) > 0):
+            memmove(_address(data), payload, len(payload))
+        _store(pid, id)
+        _store(pextended, int(extended))
+        _store(premote, int(remote))
+        _store(pdlc, len(payload))
+        _store(pstatus, status)
+        return 1
+
+    # Impedance -----------------------------------------------------------
+
+    def FDwfAnalogImpedanceFrequencySet(self, hdwf, frequency):
+        # The last capture no longer matches the instrument
+        self.impedance_frequency = _value(frequency)
+        self.impedance_measured = None
+        return 1
+
+    def FDwfAnalogImpedanceConfigure(self, hdwf, start):
+        self.impedance_running = bool(_value(start))
+        self.impedance_capture_frequency = self.impedance_frequency
+        return 1
+
+    def FDwfAnalogImpedanceStatus(self, hdwf, pstate):
+        if (not self.impedance_running):
+            return self._fail("The impedance analyzer is not running")
+        # Every status completes the capture in flight, which keeps the
+        # frequency it was started at, and starts the next one
+        frequency = self.impedance_capture_frequency
+        self.impedance_capture_frequency = self.impedance_frequency
+        dut = None if self.impedance_dut is None else self.impedance_dut(frequency)
+        if (dut == 0):
+            fixture = 0
+        else:
+            admittance = self.impedance_open(frequency) + (0 if dut is None else 1.0 / dut)
+            fixture = 1.0 / admittance if admittance != 0 else complex(float("inf"))
+        self.impedance_measured = (frequency, complex(self.impedance_short(frequency) + fixture))
+        if (pstate is not None):
+            _store(pstate, _DONE, c_ubyte)
+        return 1
+
+    def FDwfAnalogImpedanceStatusMeasure(self, hdwf, measure, pvalue):
+        if (self.impedance_measured is None):
+            return self._fail("No impedance capture")
+        frequency, z = self.impedance_measured
+        omega = 2 * math.pi * frequency
+        y = 1.0 / z if z != 0 else complex(float("inf"))
+        values = [abs(z), math.atan2(z.imag, z.real), z.real, z.imag,
+                  abs(y), math.atan2(y.imag, y.real), y.real, y.imag,
+                  -1.0 / (omega * z.imag) if z.imag != 0 else float("inf"),
+                  y.imag / omega,
+                  z.imag / omega,
+                  -1.0 / (omega * y.imag) if y.imag != 0 else float("inf"),
+                  abs(z.real / z.imag) if z.imag != 0 else float("inf"),
+                  abs(z.imag / z.real) if z.real != 0 else float("inf")]
+        _store(pvalue, values[_value(measure)], c_double)
+        return 1
+
+    # AnalogIn ------------------------------------------------------------
+
+    def FDwfAnalogInFrequencySet(self, hdwf, frequency):
+        self.analog_in.sample_rate = float(_value(frequency))
+        return 1
+
+    def FDwfAnalogInRecordLengthSet(self, hdwf, length):
+        self.analog_in_record_length = float(_value(length))
+        return 1
+
+    def FDwfAnalogInChannelRangeSet(self, hdwf, channel, voltage_range):
+        self.analog_in_ranges[_value(channel)] = float(_value(voltage_range))
+        return 1
+
+    def FDwfAnalogInChannelRangeGet(self, hdwf, channel, prange):
+        _store(prange, self.analog_in_ranges.get(_value(channel), 5.0), c_double)
+        return 1
+
+    def FDwfAnalogInChannelOffsetSet(self, hdwf, channel, offset):
+        self.analog_in_offsets[_value(channel)] = float(_value(offset))
+        return 1
+
+    def FDwfAnalogInChannelOffsetGet(self, hdwf, channel, poffset):
+        _store(poffset, self.analog_in_offsets.get(_value(channel), 0.0), c_double)
+        return 1
+
+    def FDwfAnalogInAcquisitionModeSet(self, hdwf, mode):
+        self.analog_in_mode = _value(mode)
+        return 1
+
+    def FDwfAnalogInBufferSizeSet(self, hdwf, size):
+        self.analog_in_buffer_size = _value(size)
+        return 1
+
+    def FDwfAnalogInConfigure(self, hdwf, reconfigure, start):
+        if (_value(start) and self.analog_in_mode == 0):
+            # Single acquisitions wait for the next trigger
+            self.analog_in.state = _ARMED
+        elif (_value(start)):
+            self.analog_in.sample_limit = int(round(self.analog_in_record_length * self.analog_in.sample_rate))
+            self.analog_in.start()
+        else:
+            self.analog_in.state = _READY
+        return 1
+
+    def FDwfAnalogInStatus(self, hdwf, read_data, pstate):
+        if (self.analog_in_mode == 0):
+            if (_value(read_data) and self.analog_in.state == _ARMED):
+                # Every status poll of an armed acquisition sees a trigger,
+                # the trigger is in the middle of the buffer
+                trigger = int(round(self.analog_in_triggers * self.analog_in_trigger_interval * self.analog_in.sample_rate))
+                self.analog_in_triggers += 1
+                self.analog_in.block_start = trigger - self.analog_in_buffer_size // 2
+                self.analog_in.available = self.analog_in_buffer_size
+                self.analog_in.state = _DONE
+        elif (_value(read_data)):
+            self.analog_in.status(self.samples_per_status)
+        _store(pstate, self.analog_in.state, c_ubyte)
+        return 1
+
+    def FDwfAnalogInStatusRecord(self, hdwf, pavailable, plost, pcorrupt):
+        _store(pavailable, self.analog_in.available)
+        _store(plost, self.analog_in.lost)
+        _store(pcorrupt, self.analog_in.corrupt)
+        return 1
+
+    def FDwfAnalogInStatusData16(self, hdwf, channel, buffer, first, count):
+        channel, first, count = _value(channel), _value(first), _value(count)
+        if (count <= 0):
+            return 1
+        if (first + count > self.analog_in.available):
+            return self._fail("Requested more samples than available")
+        index = np.arange(self.analog_in.block_start + first, self.analog_in.block_start + first + count)
+        volts = self.analog_signals[channel](index / self.analog_in.sample_rate)
+        raw = np.clip(np.round((volts - self.analog_in_offsets.get(channel, 0.0)) * 65536.0 / self.analog_in_ranges.get(channel, 5.0)), -32768, 32767).astype(np.int16)
+        memmove(_address(buffer), raw.ctypes.data, count * 2)
+        return 1
+
+    # DigitalIn -----------------------------------------------------------
+
+    def FDwfDigitalInInternalClockInfo(self, hdwf, pfrequency):
+        _store(pfrequency, self.digital_in_clock, c_double)
+        return 1
+
+    def FDwfDigitalInDividerSet(self, hdwf, divider):
+        self.digital_in.sample_rate = self.digital_in_clock / max(1, _value(divider))
+        return 1
+
+    def FDwfDigitalInTriggerPositionSet(self, hdwf, position):
+        self.digital_in_trigger_position = _value(position)
+        return 1
+
+    def FDwfDigitalInConfigure(self, hdwf, reconfigure, start):
+        if (_value(start)):
+            self.digital_in.sample_limit = self.digital_in_trigger_position
+            self.digital_in.start()
+        else:
+            self.digital_in.state = _READY
+        return 1
+
+    def FDwfDigitalInStatus(self, hdwf, read_data, pstate):
+        if (_value(read_data)):
+            self.digital_in.status(self.samples_per_status)
+        _store(pstate, self.digital_in.state, c_ubyte)
+        return 1
+
+    def FDwfDigitalInStatusRecord(self, hdwf, pavailable, plost, pcorrupt):
+        _store(pavailable, self.digital_in.available)
+        _store(plost, self.digital_in.lost)
+        _store(pcorrupt, self.digital_in.corrupt)
+        return 1
+
+    def FDwfDigitalInStatusData2(self, hdwf, buffer, first, byte_count):
+        first, count = _value(first), _value(byte_count) // 2
+        if (count <= 0):
+            return 1
+        if (first + count > self.digital_in.available):
+            return self._fail("Requested more samples than available")
+        index = np.arange(self.digital_in.block_start + first, self.digital_in.block_start + first + count)
+        samples = np.ascontiguousarray(self.digital_signal(index), dtype=np.uint16)
+        memmove(_address(buffer), samples.ctypes.data, count * 2)
+        return 1
+
+    # AnalogOut -----------------------------------------------------------
+
+    def FDwfAnalogOutNodeFrequencySet(self, hdwf, channel, node, frequency):
+        self.analog_out_rate = float(_value(frequency))
+        return 1
+
+    def FDwfAnalogOutRunSet(self, hdwf, channel, run_time):
+        self.analog_out_run = float(_value(run_time))
+        return 1
+
+    def FDwfAnalogOutNodeDataInfo(self, hdwf, channel, node, pminimum, pmaximum):
+        _store(pminimum, 1)
+        _store(pmaximum, self.analog_out_buffer_size)
+        return 1
+
+    def FDwfAnalogOutNodeDataSet(self, hdwf, channel, node, data, count):
+        self.analog_out_queued = min(_value(count), self.analog_out_buffer_size)
+        return 1
+
+    def FDwfAnalogOutNodePlayData(self, hdwf, channel, node, data, count):
+        count = _value(count)
+        if (self.analog_out_queued + count > self.analog_out_buffer_size):
+            return self._fail("Play data overflows the device buffer")
+        self.analog_out_queued += count
+        return 1
+
+    def FDwfAnalogOutConfigure(self, hdwf, channel, start):
+        if (_value(start)):
+            self.analog_out_state = _RUNNING
+            self.analog_out_played = 0
+            self.analog_out_time = time.perf_counter()
+            self.analog_out_expected = int(round(self.analog_out_run * self.analog_out_rate))
+        else:
+            self.analog_out_state = _READY
+            self.analog_out_queued = 0
+        return 1
+
+    def FDwfAnalogOutStatus(self, hdwf, channel, pstate):
+        self.analog_out_lost, self.analog_out_pending_lost = self.analog_out_pending_lost, 0
+        if (self.analog_out_state == _RUNNING):
+            if (self.samples_per_status is None):
+                now = time.perf_counter()
+                count = int((now - self.analog_out_time) * self.analog_out_rate)
+                self.analog_out_time += count / self.analog_out_rate
+            else:
+                count = self.samples_per_status
+            if (self.analog_out_expected > 0):
+                count = min(count, self.analog_out_expected - self.analog_out_played)
+            played = min(count, self.analog_out_queued)
+            if (self.samples_per_status is None):
+                # In real time the output keeps going when the FIFO runs dry
+                self.analog_out_lost += count - played
+                played = count
+            self.analog_out_queued = max(0, self.analog_out_queued - played)
+            self.analog_out_played += played
+            if (self.analog_out_expected > 0 and self.analog_out_played >= self.analog_out_expected):
+                self.analog_out_state = _DONE
+        _store(pstate, self.analog_out_state, c_ubyte)
+        return 1
+
+    def FDwfAnalogOutNodePlayStatus(self, hdwf, channel, node, pfree, plost, pcorrupt):
+        _store(pfree, self.analog_out_buffer_size - self.analog_out_queued)
+        _store(plost, self.analog_out_lost)
+        _store(pcorrupt, 0)
+        return 1
+
+    # DigitalOut ----------------------------------------------------------
+
+    def FDwfDigitalOutPlayDataSet(self, hdwf, data, bits_per_sample, sample_count):
+        self.digital_out_bits_per_sample = _value(bits_per_sample)
+        self.digital_out_sample_count = _value(sample_count)
+        self.digital_out_pattern = string_at(_address(data), (self.digital_out_bits_per_sample * self.digital_out_sample_count + 7) // 8)
+        return 1
+
+    def FDwfDigitalOutConfigure(self, hdwf, start):
+        self.digital_out_state = _DONE if _value(start) else _READY
+        return 1
+
+    def FDwfDigitalOutStatus(self, hdwf, pstate):
+        _store(pstate, self.digital_out_state, c_ubyte)
+        return 1
@@ -0,0 +1,113 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+''' Record mode, background, segmented and logic analyzer acquisitions, and
+    AnalogOut and DigitalOut playback.
+'''
+
+import numpy as np
+
+from pyanalogdiscovery2 import AnalogInChannel, Pins, SegmentedCapture, digital_pin, segment_peak_to_peak, segment_rise_time, segment_rms
+
+def test_read_samples_skips_lost_samples(device, simulator):
+    scope = device.acquire_oscilloscope()
+    scope.configure_channel(AnalogInChannel.CHANNEL_1, 5.0)
+    scope.configure_record(1e6, (AnalogInChannel.CHANNEL_1,), record_length=0.01)
+    scope.start()
+    simulator.inject_loss("analog_in", 100)
+    samples = scope.read_samples(20000)
+    assert samples.shape == (1, 9900)
+    assert scope.lost_samples == 100
+    # The data after the loss continues at the sample time it was acquired
+    expected = np.sin(2 * np.pi * 1000.0 * (np.arange(1000) + 100) / 1e6)
+    assert np.allclose(scope.to_volts(samples[:, :1000])[0], expected, atol=1e-3)
+
+def test_read_chunks_are_views_of_the_ring_buffer(device):
+    scope = device.acquire_oscilloscope()
+    scope.configure_record(1e6, (AnalogInChannel.CHANNEL_1, AnalogInChannel.CHANNEL_2), record_length=0.01, ring_buffer_size=5000)
+    scope.start()
+    total = 0
+    for chunk in scope.read_chunks():
+        assert chunk.shape[0] == 2
+        assert np.shares_memory(chunk, scope.ring_buffer)
+        total += chunk.shape[1]
+    assert total == 10000
+    assert scope.total_samples == 10000
+
+def test_background_reader_hands_over_every_sample(device):
+    scope = device.acquire_oscilloscope()
+    scope.configure_record(1e6, (AnalogInChannel.CHANNEL_1,), record_length=0.01)
+    reader = scope.start_background(block_size=1000, block_count=16)
+    blocks = [block.copy() for block in reader.blocks(timeout=10)]
+    reader.stop()
+    assert sum(block.shape[1] for block in blocks) == 10000
+    assert reader.statistics()["blocks_dropped"] == 0
+
+def test_segmented_capture_reduces_every_segment(device):
+    scope = device.acquire_oscilloscope()
+    scope.configure_segments(1e6, 100, (AnalogInChannel.CHANNEL_1, AnalogInChannel.CHANNEL_2))
+    capture = SegmentedCapture(scope, {"rms": segment_rms, "pp": segment_peak_to_peak})
+    capture.run(segment_count=10, batch_size=4)
+    reductions = capture.reductions()
+    assert capture.segments == 10
+    assert reductions["rms"].shape == (10, 2)
+    assert reductions["pp"].shape == (10, 2)
+
+def test_segment_rise_time():
+    segments = np.zeros((1, 1, 100))
+    segments[0, 0, 40:61] = np.linspace(0.0, 1.0, 21)
+    segments[0, 0, 61:] = 1.0
+    # 10% to 90% of a 20 sample ramp at 1 MHz
+    assert np.allclose(segment_rise_time(segments, 1e6), 16e-6)
+
+def test_logic_analyzer_record(device):
+    logic = device.acquire_logic_analyzer()
+    logic.configure_record(1e6, 50000)
+    samples = logic.record(50000)
+    assert samples.dtype == np.uint16
+    assert len(samples) == 50000
+    # The simulated pins count up by one every sample
+    assert np.all(np.diff(samples.astype(np.int64)) % 65536 == 1)
+    assert np.array_equal(digital_pin(samples[:4], Pins.DIO_0), [0, 1, 0, 1])
+
+def test_waveform_generator_plays_arrays_and_generators(device):
+    wavegen = device.acquire_waveform_generator()
+    wavegen.configure_channel(0, 1.0, 0.0)
+    wavegen.play(np.sin(np.arange(100000) / 10.0), 1e6, poll_interval=0)
+    assert wavegen.total_samples == 100000
+    assert wavegen.lost_samples == 0
+    wavegen.play((np.zeros(5000) for i in range(4)), 1e6, poll_interval=0)
+    assert wavegen.total_samples == 20000
+
+def test_pattern_generator_packs_samples(device, simulator):
+    patterns = device.acquire_pattern_generator()
+    pattern = np.eye(4, dtype=bool)
+    patterns.play(pattern, 1e6)
+    patterns.wait()
+    assert simulator.digital_out_bits_per_sample == 4
+    # Four bits per sample, DIO_0 in the least significant bit
+    assert bytes(simulator.digital_out_pattern) == b"\x21\x84"
+    patterns.play(pattern, 1e6)
+    assert patterns.cache_hits == 1
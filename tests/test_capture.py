@@ -0,0 +1,118 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+''' Capture files: writing from the instruments and memory-mapped readback.
+'''
+
+import numpy as np
+import pytest
+
+from pyanalogdiscovery2 import AnalogInChannel, Configuration, DeviceCache
+from pyanalogdiscovery2_capture import CaptureReader, CaptureWriter
+from pyanalogdiscovery2_simulator import SimulatedDwf
+
+def test_oscilloscope_capture_round_trip(tmp_path):
+    simulator = SimulatedDwf(samples_per_status=5000)
+    cache = DeviceCache(backend=simulator)
+    device = cache.open("SD2SIM000001", Configuration.SCOPE_16K_WAVEGEN_1K_LOGIC_1K_PATTERNS_NONE)
+    scope = device.acquire_oscilloscope()
+    scope.configure_channel(AnalogInChannel.CHANNEL_1, 5.0)
+    scope.configure_channel(AnalogInChannel.CHANNEL_2, 5.0)
+    scope.configure_record(1e6, [AnalogInChannel.CHANNEL_1, AnalogInChannel.CHANNEL_2], record_length=0.1, ring_buffer_size=1 << 16)
+    simulator.inject_loss("analog_in", 1000)
+    filename = str(tmp_path / "scope.pad2")
+    written = scope.capture(filename, chunk_size=8192)
+    cache.close()
+
+    with CaptureReader(filename) as reader:
+        assert reader.serial_number == "SD2SIM000001"
+        assert reader.configuration == Configuration.SCOPE_16K_WAVEGEN_1K_LOGIC_1K_PATTERNS_NONE
+        assert reader.closed_cleanly
+        assert reader.sample_count == written == 99000
+        assert reader.sample_rate == 1e6
+        samples = reader.read(0.05, 0.0501)
+        assert np.shares_memory(samples, reader.data)
+        # Times account for the lost samples
+        times = reader.times(reader._sample_at(0.05 * 1e6), samples.shape[1])
+        assert np.allclose(reader.to_volts(samples)[0], np.sin(2 * np.pi * 1000.0 * times), atol=1e-3)
+        assert reader.times(0, 1)[0] == pytest.approx(1000e-6)
+        times, minimum, maximum = reader.overview(10)
+        assert minimum.shape == maximum.shape == (2, 10)
+        assert reader.to_volts(maximum)[0].max() == pytest.approx(1.0, abs=1e-3)
+
+def test_partial_capture(tmp_path, device):
+    scope = device.acquire_oscilloscope()
+    scope.configure_record(1e6, [AnalogInChannel.CHANNEL_1])
+    filename = str(tmp_path / "partial.pad2")
+    assert scope.capture(filename, sample_count=12345, chunk_size=1000) == 12345
+    reader = CaptureReader(filename)
+    assert reader.sample_count == 12345
+    assert reader.chunk_count == 13
+    assert reader.read_samples(12000).shape == (1, 345)
+
+def test_unclosed_capture_is_recovered(tmp_path):
+    filename = str(tmp_path / "unclosed.pad2")
+    writer = CaptureWriter(filename, ["a", "b"], np.int16, 1000.0, chunk_size=100)
+    writer.write(np.arange(2 * 550, dtype=np.int16).reshape(2, 550))
+    writer._file.flush()
+    reader = CaptureReader(filename)
+    assert not reader.closed_cleanly
+    assert reader.sample_count == 500
+    writer.close()
+    reader = CaptureReader(filename)
+    assert reader.closed_cleanly
+    assert reader.sample_count == 550
+    assert reader.chunk_count == 6
+    assert np.array_equal(reader.read_samples(0, 550)[1], np.arange(550, 1100))
+
+def test_empty_capture(tmp_path):
+    filename = str(tmp_path / "empty.pad2")
+    CaptureWriter(filename, ["a"], np.int16, 1000.0).close()
+    reader = CaptureReader(filename)
+    assert reader.sample_count == 0
+    assert reader.read().shape == (1, 0)
+
+def test_logic_analyzer_capture(tmp_path, device):
+    logic = device.acquire_logic_analyzer()
+    logic.configure_record(1e6, 100000)
+    filename = str(tmp_path / "logic.pad2")
+    assert logic.capture(filename) == 100000
+    reader = CaptureReader(filename)
+    assert reader.dtype == np.uint16
+    assert list(reader.read_samples(0, 5)[0]) == [0, 1, 2, 3, 4]
+
+def test_power_supply_capture(tmp_path, device):
+    power_supply = device.acquire_power_supply()
+    power_supply.configure_positive_voltage_supply_output(3.3, 0.5)
+    power_supply.enable_all_outputs(True)
+    filename = str(tmp_path / "telemetry.pad2")
+    recorder = power_supply.create_recorder(capacity=64, capture_filename=filename)
+    recorder.run(samples=200)
+    recorder.close()
+    reader = CaptureReader(filename)
+    assert reader.channels[:2] == ["time", "V+ Voltage"]
+    assert reader.sample_count == 200
+    with pytest.raises(ValueError):
+        reader.read(0, 1)
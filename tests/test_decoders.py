@@ -0,0 +1,105 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+''' Protocol decoders over packed logic analyzer samples.
+'''
+
+import numpy as np
+import pytest
+
+from pyanalogdiscovery2 import I2cClockRate, Pins, decode_i2c, decode_spi, decode_uart
+
+def samples(levels):
+    ''' Packs a list of {pin: level} dictionaries into uint16 samples.
+    '''
+    return np.array([sum(level << pin for pin, level in sample.items()) for sample in levels], dtype=np.uint16)
+
+def spi_signal(words, cs, sclk, mosi, miso):
+    # Mode 0: data changes while SCLK is low and is sampled on the rising edge
+    levels = [{cs: 1, sclk: 0, mosi: 0, miso: 0}] * 4
+    for word in words:
+        for bit in range(7, -1, -1):
+            value = (word >> bit) & 1
+            levels += [{cs: 0, sclk: 0, mosi: value, miso: 1 - value}] * 2
+            levels += [{cs: 0, sclk: 1, mosi: value, miso: 1 - value}] * 2
+    levels += [{cs: 1, sclk: 0, mosi: 0, miso: 0}] * 4
+    return samples(levels)
+
+def i2c_signal(data, scl, sda, acks):
+    levels = [{scl: 1, sda: 1}] * 2 + [{scl: 1, sda: 0}] * 2 # START
+    for value, ack in zip(data, acks):
+        for bit in [(value >> bit) & 1 for bit in range(7, -1, -1)] + [0 if ack else 1]:
+            levels += [{scl: 0, sda: bit}] * 2 + [{scl: 1, sda: bit}] * 2
+    levels += [{scl: 0, sda: 0}] * 2 + [{scl: 1, sda: 0}] * 2 + [{scl: 1, sda: 1}] * 2 # STOP
+    return samples(levels)
+
+def uart_signal(values, samples_per_bit, stop_bits = 1, parity = 0, framing_error = None):
+    levels = [1] * (3 * samples_per_bit)
+    for index, value in enumerate(values):
+        bits = [0] + [(value >> bit) & 1 for bit in range(8)]
+        if (parity):
+            bits.append((sum(bits[1:]) + (1 if parity == 1 else 0)) % 2)
+        for bit in bits:
+            levels += [bit] * samples_per_bit
+        levels += [0 if index == framing_error else 1] * int(round(stop_bits * samples_per_bit))
+    levels += [1] * (3 * samples_per_bit)
+    return np.array(levels, dtype=np.uint16)
+
+def test_decode_spi(device):
+    spi = device.acquire_serial_peripheral_interface()
+    spi.configure_bus(Pins.DIO_0, Pins.DIO_1, Pins.DIO_2, Pins.DIO_3, 1e6)
+    words = decode_spi(spi_signal([0xa5, 0x3c], 0, 1, 2, 3), spi, 1e6)
+    assert list(words.mosi) == [0xa5, 0x3c]
+    assert list(words.miso) == [0x5a, 0xc3]
+    assert list(words.frame) == [0, 0]
+
+def test_decode_i2c(device):
+    i2c = device.acquire_inter_integrated_circuit()
+    i2c.configure_bus(I2cClockRate.ONE_HUNDRED_KHZ, 0x18, Pins.DIO_0, Pins.DIO_1)
+    transfer = decode_i2c(i2c_signal([0x18 << 1, 0x0f, 0x55], 0, 1, [True, True, False]), i2c, 1e6)
+    assert list(transfer.value) == [0x30, 0x0f, 0x55]
+    assert list(transfer.index) == [0, 1, 2]
+    assert list(transfer.address) == [0x18] * 3
+    assert not transfer.read.any()
+    assert list(transfer.ack) == [True, True, False]
+
+@pytest.mark.parametrize("stop_bits", [1, 1.5, 2])
+@pytest.mark.parametrize("parity", [0, 1, 2])
+def test_decode_uart(stop_bits, parity):
+    values = [0x55, 0x00, 0xff, 0x41, 0x80, 0x01]
+    frames = decode_uart(uart_signal(values, 10, stop_bits, parity), Pins.DIO_0, 1e5, 1e6, parity=parity, stop_bits=stop_bits)
+    assert list(frames.value) == values
+    assert not frames.parity_error.any()
+    assert not frames.framing_error.any()
+
+def test_decode_uart_framing_error():
+    frames = decode_uart(uart_signal([0x55, 0x00, 0xff, 0x41], 10, framing_error=2), Pins.DIO_0, 1e5, 1e6)
+    assert list(frames.framing_error[:4]) == [False, False, True, False]
+
+def test_decode_uart_long_capture():
+    rng = np.random.RandomState(1)
+    values = list(rng.randint(0, 256, 2000))
+    frames = decode_uart(uart_signal(values, 4), Pins.DIO_0, 1.0, 4.0)
+    assert list(frames.value) == values
@@ -0,0 +1,248 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+''' Device open, error reporting, the settings cache, instrumentation, the
+    asyncio front-end, the device pool and the simulator itself.
+'''
+
+from ctypes import string_at
+import asyncio
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+from pyanalogdiscovery2 import (Configuration, DeviceCache, DevicePool, ErrorChecking, I2cClockRate, Instrumentation, Pins,
+                                PyAnalogDiscovery2, PyAnalogDiscovery2Exception, Status, _load_prototypes, enumerate_devices)
+from pyanalogdiscovery2_async import AsyncPyAnalogDiscovery2
+from pyanalogdiscovery2_simulator import SimulatedDwf
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+import run_benchmarks
+
+CONFIGURATION = Configuration.SCOPE_8K_WAVEGEN_4K_LOGIC_4K_PATTERNS_1K
+
+def configure_spi(spi, clock_rate = 1e6):
+    spi.configure_bus(Pins.DIO_0, Pins.DIO_1, Pins.DIO_2, Pins.DIO_3, clock_rate)
+
+def calls(instrumentation, name):
+    return instrumentation.stats()["functions"].get(name, {}).get("calls", 0)
+
+def serial_number(device):
+    return device.serial_number
+
+def test_enumerate_devices():
+    devices = enumerate_devices(SimulatedDwf(serial_numbers=("SD2SIM000001", "SD2SIM000002")))
+    assert [device.serial_number for device in devices] == ["SD2SIM000001", "SD2SIM000002"]
+    assert not any(device.is_opened for device in devices)
+
+def test_open_missing_device_raises():
+    with pytest.raises(PyAnalogDiscovery2Exception) as error:
+        PyAnalogDiscovery2(CONFIGURATION, device_index=5, backend=SimulatedDwf())
+    assert error.value.status == Status.ERROR_FAILED_TO_OPEN_DEVICE
+    assert error.value.error_message() != ""
+
+def test_failed_call_raises_with_its_error(device):
+    with pytest.raises(PyAnalogDiscovery2Exception) as error:
+        device.dwf.FDwfAnalogImpedanceStatus(device.hdwf, None)
+    assert error.value.status == Status.ERROR_DWF_CALL_FAILED
+    assert "FDwfAnalogImpedanceStatus" in str(error.value)
+
+def test_prototypes_are_parsed_once():
+    prototypes = _load_prototypes()
+    assert prototypes is _load_prototypes()
+    assert len(prototypes["FDwfDigitalSpiWriteRead"]) == 7
+
+def test_simulator_accepts_only_dwf_functions(simulator):
+    simulator.FDwfDigitalSpiFrequencySet(0, 1e6)
+    assert simulator.settings["FDwfDigitalSpiFrequencySet"] == (1e6,)
+    with pytest.raises(AttributeError):
+        simulator.FDwfDigitalSpiFrequencyTypoSet
+    with pytest.raises(AttributeError):
+        simulator.FDwfAnalogInStatusSamplesLeft
+
+def test_settings_are_sent_once():
+    instrumentation = Instrumentation()
+    device = PyAnalogDiscovery2(CONFIGURATION, backend=SimulatedDwf(), instrumentation=instrumentation)
+    spi = device.acquire_serial_peripheral_interface()
+    for i in range(3):
+        configure_spi(spi)
+    assert calls(instrumentation, "FDwfDigitalSpiFrequencySet") == 1
+    # Chip select is driven to its idle level every time
+    assert calls(instrumentation, "FDwfDigitalSpiSelect") == 3
+    configure_spi(spi, 2e6)
+    assert calls(instrumentation, "FDwfDigitalSpiFrequencySet") == 2
+    # Resetting the instrument forgets its settings
+    spi = device.acquire_serial_peripheral_interface()
+    configure_spi(spi, 2e6)
+    assert calls(instrumentation, "FDwfDigitalSpiFrequencySet") == 3
+    device.release()
+
+def test_settings_are_sent_again_after_a_device_reset():
+    instrumentation = Instrumentation()
+    simulator = SimulatedDwf()
+    device = PyAnalogDiscovery2(CONFIGURATION, backend=simulator, instrumentation=instrumentation)
+    uart = device.acquire_uart()
+    uart.configure_bus(9600, Pins.DIO_0, Pins.DIO_1)
+    uart.configure_bus(9600, Pins.DIO_0, Pins.DIO_1)
+    assert calls(instrumentation, "FDwfDigitalUartRateSet") == 1
+    device.reset_device()
+    assert "FDwfDigitalUartRateSet" not in simulator.settings
+    uart.configure_bus(9600, Pins.DIO_0, Pins.DIO_1)
+    assert calls(instrumentation, "FDwfDigitalUartRateSet") == 2
+    # A reset the device object did not see needs forget_settings
+    simulator.FDwfDeviceReset(device.hdwf)
+    device.forget_settings()
+    uart.configure_bus(9600, Pins.DIO_0, Pins.DIO_1)
+    assert calls(instrumentation, "FDwfDigitalUartRateSet") == 3
+    device.release()
+    assert device._settings == {}
+
+def test_i2c_bus_is_cleared_every_time():
+    instrumentation = Instrumentation()
+    device = PyAnalogDiscovery2(CONFIGURATION, backend=SimulatedDwf(), instrumentation=instrumentation)
+    i2c = device.acquire_inter_integrated_circuit()
+    i2c.configure_bus(I2cClockRate.ONE_HUNDRED_KHZ, 0x18, Pins.DIO_0, Pins.DIO_1)
+    i2c.configure_bus(I2cClockRate.ONE_HUNDRED_KHZ, 0x18, Pins.DIO_0, Pins.DIO_1)
+    assert calls(instrumentation, "FDwfDigitalI2cClear") == 2
+    assert calls(instrumentation, "FDwfDigitalI2cRateSet") == 1
+    device.release()
+
+def test_device_cache_reuses_open_devices():
+    simulator = SimulatedDwf(serial_numbers=("SD2SIM000001", "SD2SIM000002"))
+    cache = DeviceCache(backend=simulator)
+    device = cache.open("SD2SIM000002", CONFIGURATION)
+    assert cache.open("SD2SIM000002", CONFIGURATION) is device
+    assert (cache.cache_hits, cache.cache_misses) == (1, 1)
+    assert device.serial_number == "SD2SIM000002"
+    # Another configuration reopens the device
+    reopened = cache.open("SD2SIM000002", Configuration.SCOPE_16K_WAVEGEN_1K_LOGIC_1K_PATTERNS_NONE)
+    assert reopened is not device
+    assert device.dwf is None
+    cache.close()
+    assert reopened.dwf is None
+
+def test_serial_number_is_enumerated_only_for_captures():
+    instrumentation = Instrumentation()
+    device = PyAnalogDiscovery2(CONFIGURATION, backend=SimulatedDwf(), instrumentation=instrumentation)
+    assert device.serial_number is None
+    assert calls(instrumentation, "FDwfEnum") == 0
+    assert device._capture_serial_number() == "SD2SIM000001"
+    device.release()
+    # With several devices attached, device_index -1 cannot be told apart
+    device = PyAnalogDiscovery2(CONFIGURATION, backend=SimulatedDwf(serial_numbers=("A1", "B2")))
+    assert device._capture_serial_number() is None
+    device.release()
+
+def test_batch_error_checking_stops_at_the_failed_transfer():
+    simulator = SimulatedDwf()
+    write_read = simulator.FDwfDigitalSpiWriteRead
+    def failing_write_read(hdwf, cdq, bits_per_word, write_data, write_count, read_data, read_count):
+        if (string_at(write_data, write_count) == b"\xff"):
+            return simulator._fail("transfer failed")
+        return write_read(hdwf, cdq, bits_per_word, write_data, write_count, read_data, read_count)
+    simulator.FDwfDigitalSpiWriteRead = failing_write_read
+    instrumentation = Instrumentation()
+    device = PyAnalogDiscovery2(CONFIGURATION, backend=simulator, error_checking=ErrorChecking.BATCH, instrumentation=instrumentation)
+    spi = device.acquire_serial_peripheral_interface()
+    configure_spi(spi)
+    with pytest.raises(PyAnalogDiscovery2Exception) as error:
+        spi.transfer_many([[1], [0xff], [3]], [1, 1, 1])
+    assert error.value.message == "SPI transaction failed: transfer failed"
+    assert calls(instrumentation, "FDwfDigitalSpiWriteRead") == 2
+    device.release()
+
+def test_instrumentation_counts_calls_and_bytes(tmp_path):
+    instrumentation = Instrumentation(trace=True)
+    device = PyAnalogDiscovery2(CONFIGURATION, backend=SimulatedDwf(), instrumentation=instrumentation)
+    spi = device.acquire_serial_peripheral_interface()
+    configure_spi(spi)
+    spi.write_read([1, 2, 3], 3)
+    function = device.stats()["functions"]["FDwfDigitalSpiWriteRead"]
+    assert (function["calls"], function["bytes_written"], function["bytes_read"]) == (1, 3, 3)
+    events = [event for event in instrumentation.trace_events() if event["name"] == "FDwfDigitalSpiWriteRead"]
+    assert len(events) == 1
+    filename = str(tmp_path / "trace.json")
+    instrumentation.export_chrome_trace(filename)
+    with open(filename) as trace:
+        assert len(json.load(trace)["traceEvents"]) > 0
+    instrumentation.enabled = False
+    spi.write_read([1], 1)
+    assert calls(instrumentation, "FDwfDigitalSpiWriteRead") == 1
+    device.release()
+    assert PyAnalogDiscovery2(CONFIGURATION, backend=SimulatedDwf()).stats() is None
+
+def test_power_supply_reads_every_node(device):
+    power_supply = device.acquire_power_supply()
+    power_supply.configure_positive_voltage_supply_output(3.3, 0.5)
+    power_supply.enable_all_outputs(True)
+    voltage, current = power_supply.read_positive_supply_output()
+    assert voltage == pytest.approx(3.3)
+    values = power_supply.read_all()
+    assert len(values) == len(power_supply.telemetry_nodes())
+
+def test_power_supply_recorder(device, tmp_path):
+    power_supply = device.acquire_power_supply()
+    power_supply.configure_positive_voltage_supply_output(3.3, 0.5)
+    power_supply.enable_all_outputs(True)
+    filename = str(tmp_path / "telemetry.npy")
+    recorder = power_supply.create_recorder(capacity=64, filename=filename)
+    recorder.run(samples=200)
+    recorder.close()
+    assert recorder.latest().shape == (len(recorder.columns), 64)
+    assert recorder.statistics()["V+ Voltage"]["mean"] == pytest.approx(3.3)
+    records = np.load(filename)
+    assert len(records) == 200
+    assert np.all(np.diff(records["time"]) >= 0)
+
+def test_async_front_end():
+    async def main():
+        device = await AsyncPyAnalogDiscovery2.open(CONFIGURATION, backend="simulator", error_checking=ErrorChecking.BATCH)
+        assert device.device.error_checking == ErrorChecking.BATCH
+        spi = await device.acquire_serial_peripheral_interface()
+        await spi.configure_bus(Pins.DIO_0, Pins.DIO_1, Pins.DIO_2, Pins.DIO_3, 1e6)
+        result = await spi.write_read([5], 1)
+        await device.release()
+        return result
+    assert asyncio.run(main()) == [5]
+
+def test_device_pool_runs_on_every_device():
+    with DevicePool(CONFIGURATION, backend="simulator") as pool:
+        assert pool.run_all(serial_number) == {"SD2SIM000001": "SD2SIM000001"}
+
+def test_benchmark_comparison_flags_regressions(capsys):
+    baseline = {"backend": "shim", "results": {
+        "spi": run_benchmarks.result(1000.0, "calls/s", True),
+        "memory": run_benchmarks.result(10.0, "bytes/call", False),
+    }}
+    current = {"backend": "shim", "results": {
+        "spi": run_benchmarks.result(800.0, "calls/s", True),
+        "memory": run_benchmarks.result(10.5, "bytes/call", False),
+    }}
+    assert run_benchmarks.compare(baseline, current, 0.10) == ["spi"]
+    assert "REGRESSION" in capsys.readouterr().out
@@ -0,0 +1,93 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+''' Impedance analyzer frequency sweeps and open/short compensation.
+'''
+
+import numpy as np
+import pytest
+
+from pyanalogdiscovery2 import Configuration, PyAnalogDiscovery2
+from pyanalogdiscovery2_simulator import SimulatedDwf
+
+def measured(simulator, frequency):
+    ''' The DUT seen through the fixture parasitics of the simulator.
+    '''
+    return simulator.impedance_short(frequency) + 1 / (simulator.impedance_open(frequency) + 1 / simulator.impedance_dut(frequency))
+
+@pytest.mark.parametrize("auto_configure", [True, False])
+@pytest.mark.parametrize("pipelined", [False, True])
+@pytest.mark.parametrize("settle_time", [0.0, 0.001])
+def test_sweep_measures_every_frequency(auto_configure, pipelined, settle_time):
+    simulator = SimulatedDwf()
+    device = PyAnalogDiscovery2(Configuration.SCOPE_8K_WAVEGEN_4K_LOGIC_4K_PATTERNS_1K, backend=simulator)
+    device.enable_auto_configure(auto_configure)
+    analyzer = device.acquire_impedance_analyzer()
+    analyzer.configure(settle_time=settle_time)
+    frequencies = analyzer.configure_sweep(100, 1e6, 21)
+    result = analyzer.sweep(compensate=False, pipelined=pipelined)
+    assert np.array_equal(result.frequency, frequencies)
+    assert np.allclose(result.impedance, [abs(measured(simulator, frequency)) for frequency in frequencies])
+    device.release()
+
+def test_configure_sweep_frequencies(device):
+    analyzer = device.acquire_impedance_analyzer()
+    assert np.allclose(analyzer.configure_sweep(100, 1e5, 5, logarithmic=False), [100, 25075, 50050, 75025, 1e5])
+    assert np.allclose(analyzer.configure_sweep(100, 1e6, 5), [1e2, 1e3, 1e4, 1e5, 1e6])
+
+def test_open_short_compensation(device, simulator):
+    analyzer = device.acquire_impedance_analyzer()
+    analyzer.configure(reference_resistance=1000)
+    frequencies = analyzer.configure_sweep(100, 1e6, 41)
+    dut = simulator.impedance_dut
+    assert not analyzer.is_compensated()
+    simulator.impedance_dut = None
+    analyzer.measure_open_compensation()
+    simulator.impedance_dut = lambda frequency: 0
+    analyzer.measure_short_compensation()
+    simulator.impedance_dut = dut
+    assert analyzer.is_compensated()
+
+    result = analyzer.sweep()
+    expected = np.array([dut(frequency) for frequency in frequencies])
+    assert np.allclose(result.resistance + 1j * result.reactance, expected, rtol=1e-6)
+    # Without compensation the fixture parasitics are measured too
+    result = analyzer.sweep(compensate=False)
+    assert not np.allclose(result.resistance + 1j * result.reactance, expected, rtol=1e-6)
+
+def test_compensation_is_kept_per_configuration(device, simulator):
+    analyzer = device.acquire_impedance_analyzer()
+    analyzer.configure()
+    analyzer.configure_sweep(100, 1e6, 41)
+    simulator.impedance_dut = None
+    analyzer.measure_open_compensation()
+    simulator.impedance_dut = lambda frequency: 0
+    analyzer.measure_short_compensation()
+    analyzer = device.acquire_impedance_analyzer(reset=False)
+    analyzer.configure()
+    analyzer.configure_sweep(100, 1e6, 41)
+    assert analyzer.is_compensated()
+    analyzer.configure_sweep(100, 1e6, 42)
+    assert not analyzer.is_compensated()
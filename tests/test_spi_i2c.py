@@ -0,0 +1,136 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+''' SPI and I2C sessions.
+'''
+
+import numpy as np
+import pytest
+
+from pyanalogdiscovery2 import Configuration, ErrorChecking, I2cClockRate, Pins, PyAnalogDiscovery2, PyAnalogDiscovery2Exception, SpiDataLanes, Status
+from pyanalogdiscovery2_simulator import SimulatedDwf
+
+def spi_session(device, bits_per_word = 8, data_lanes = SpiDataLanes.STANDARD):
+    spi = device.acquire_serial_peripheral_interface()
+    spi.configure_bus(Pins.DIO_0, Pins.DIO_1, Pins.DIO_2, Pins.DIO_3, 1e6, bits_per_word=bits_per_word, data_lanes=data_lanes)
+    return spi
+
+def i2c_session(device):
+    i2c = device.acquire_inter_integrated_circuit()
+    i2c.configure_bus(I2cClockRate.ONE_HUNDRED_KHZ, 0x18, Pins.DIO_0, Pins.DIO_1)
+    return i2c
+
+def test_spi_transfers(device):
+    spi = spi_session(device)
+    # The simulated slave loops MOSI back to MISO
+    assert spi.write_read([1, 2, 3], 3) == [1, 2, 3]
+    assert bytes(spi.write_read_into(b"abc", bytearray(3))) == b"abc"
+    assert spi.read(2) == [0, 0]
+
+def test_spi_transfer_many(device):
+    spi = spi_session(device)
+    assert spi.transfer_many([[1, 2], [3]], [2, 1]) == [b"\x01\x02", b"\x03"]
+    read_buffers = [np.zeros(2, dtype=np.uint8), bytearray(1)]
+    spi.transfer_many_into([b"\x04\x05", b"\x06"], read_buffers)
+    assert list(read_buffers[0]) == [4, 5]
+    assert read_buffers[1] == b"\x06"
+
+def test_spi_wide_words(device):
+    spi = spi_session(device, bits_per_word=12)
+    assert spi.write_read([0xabc, 0x123], 2) == [0xabc, 0x123]
+    assert [list(words) for words in spi.transfer_many([[0xfff]], [1])] == [[0xfff]]
+    spi = spi_session(device, bits_per_word=32)
+    assert spi.write_read([0xdeadbeef], 1) == [0xdeadbeef]
+    with pytest.raises(ValueError):
+        spi_session(device, bits_per_word=33)
+
+def test_spi_quad_lanes(device, simulator):
+    transfers = []
+    write = simulator.FDwfDigitalSpiWrite16
+    def recording_write(hdwf, cdq, bits_per_word, write_data, write_count):
+        transfers.append((cdq, bits_per_word))
+        return write(hdwf, cdq, bits_per_word, write_data, write_count)
+    simulator.FDwfDigitalSpiWrite16 = recording_write
+    spi = spi_session(device, bits_per_word=16, data_lanes=SpiDataLanes.QUAD)
+    spi.write([0x1234])
+    assert transfers == [(SpiDataLanes.QUAD, 16)]
+    assert simulator.settings["FDwfDigitalSpiDataSet"] == (3, Pins.DIO_5)
+
+def test_i2c_register_map(device):
+    i2c = i2c_session(device)
+    assert i2c.read_registers(0x0f, 1).data == b"\x33"
+    assert i2c.write_registers(0x20, [1, 2, 3]).nak == 0
+    assert i2c.bulk_read([0x20, 0x21, 0x22, 0x0f]) == {0x20: 1, 0x21: 2, 0x22: 3, 0x0f: 0x33}
+
+def test_i2c_nak_does_not_raise(device):
+    i2c = i2c_session(device)
+    for transfer in (i2c.write_read([0], 2, address=0x19), i2c.write([0], address=0x19), i2c.read(2, address=0x19)):
+        assert transfer.nak != 0
+        assert transfer.attempts == 1
+    assert i2c.bulk_read([0, 1], address=0x19) == {0: None, 1: None}
+
+def test_i2c_nak_is_retried(device):
+    i2c = i2c_session(device)
+    i2c.configure_register_map(retries=2, retry_delay=0.0)
+    transfer = i2c.write_read([0x0f], 1, address=0x19)
+    assert transfer.nak != 0
+    assert transfer.attempts == 3
+    transfer = i2c.write_read([0x0f], 1)
+    assert transfer == (b"\x33", 0, 1)
+
+def test_i2c_failed_call_raises():
+    simulator = SimulatedDwf()
+    simulator.FDwfDigitalI2cWriteRead = lambda *arguments: simulator._fail("bus error")
+    for error_checking in (ErrorChecking.EVERY_CALL, ErrorChecking.BATCH):
+        device = PyAnalogDiscovery2(Configuration.SCOPE_8K_WAVEGEN_4K_LOGIC_4K_PATTERNS_1K, backend=simulator, error_checking=error_checking)
+        i2c = i2c_session(device)
+        with pytest.raises(PyAnalogDiscovery2Exception) as error:
+            i2c.write_read([0], 1)
+        assert error.value.status == Status.ERROR_DWF_CALL_FAILED
+        assert "bus error" in error.value.error_message()
+        device.release()
+
+def test_i2c_stuck_bus_raises(device, simulator):
+    i2c = i2c_session(device)
+    simulator.i2c_bus_free = False
+    with pytest.raises(PyAnalogDiscovery2Exception) as error:
+        i2c.configure_bus(I2cClockRate.ONE_HUNDRED_KHZ, 0x18, Pins.DIO_0, Pins.DIO_1)
+    assert error.value.status == Status.ERROR_I2C_BUS_ERROR_CHECK_THE_PULLUPS
+
+def test_i2c_scan(device):
+    i2c = i2c_session(device)
+    assert i2c.scan() == [0x18]
+    assert i2c.scan(range(0x10, 0x18)) == []
+
+def test_i2c_poller(device):
+    i2c = i2c_session(device)
+    results = []
+    poller = i2c.create_poller([(0x18, 0x0f, 1), (0x19, 0x00, 2)], rate=1000)
+    poller.run(cycles=5, callback=lambda timestamp, values: results.append(values))
+    statistics = poller.statistics()
+    assert statistics["cycles"] == 5
+    assert sum(statistics["latency_histograms"][0x18]) == 5
+    assert results[-1][(0x18, 0x0f)].data == b"\x33"
+    assert results[-1][(0x19, 0x00)].nak != 0
@@ -0,0 +1,136 @@
+# The MIT License (MIT)
+#
+# Copyright (c) 2020 Charles Armstrap <charles@armstrap.org>
+# If you like this library, consider donating to: http://bit.ly/pyanalogdiscovery2
+# Anything helps.
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+''' Buffered UART and CAN receive sessions.
+'''
+
+import time
+
+import pytest
+
+from pyanalogdiscovery2 import Configuration, Pins, PyAnalogDiscovery2
+from pyanalogdiscovery2_simulator import SimulatedDwf
+
+def uart_session(device):
+    uart = device.acquire_uart()
+    uart.configure_bus(115200, Pins.DIO_0, Pins.DIO_1)
+    return uart
+
+def can_session(device):
+    can = device.acquire_can()
+    can.configure_bus(500000, Pins.DIO_2, Pins.DIO_3)
+    return can
+
+def test_reading_before_start_raises(device):
+    uart = device.acquire_uart()
+    can = device.acquire_can()
+    for read in (uart.read, uart.readline, can.read_frames, lambda: list(can.frames())):
+        with pytest.raises(RuntimeError):
+            read()
+
+def test_uart_read_and_readline(device, simulator):
+    uart = uart_session(device)
+    uart.start(buffer_size=32, chunk_size=8)
+    uart.write(b"hello\nworld\n")
+    assert uart.readline(timeout=1) == b"hello\n"
+    assert uart.readline(timeout=1) == b"world\n"
+    assert uart.readline(timeout=0.05) == b""
+    simulator.uart_receive(b"abc", parity_error=True)
+    assert uart.read(3, timeout=1) == b"abc"
+    assert uart.statistics()["parity_errors"] == 1
+    uart.stop()
+
+def test_uart_ring_overflow_keeps_the_newest_bytes(device, simulator):
+    uart = uart_session(device)
+    uart.start(buffer_size=32, chunk_size=8)
+    simulator.uart_receive(bytes(range(100)))
+    deadline = time.perf_counter() + 1
+    while (uart.statistics()["received_bytes"] < 100 and time.perf_counter() < deadline):
+        time.sleep(0.001)
+    assert uart.read() == bytes(range(68, 100))
+    statistics = uart.statistics()
+    assert statistics["received_bytes"] == 100
+    assert statistics["overflows"] == 68
+    uart.stop()
+
+def test_uart_device_overflow_is_counted():
+    simulator = SimulatedDwf(uart_buffer_size=16)
+    device = PyAnalogDiscovery2(Configuration.SCOPE_8K_WAVEGEN_4K_LOGIC_4K_PATTERNS_1K, backend=simulator)
+    uart = uart_session(device)
+    uart.start()
+    simulator.uart_receive(bytes(20))
+    assert len(uart.read(16, timeout=1)) == 16
+    assert uart.statistics()["device_overflows"] == 1
+    uart.stop()
+    device.release()
+
+def test_can_frames_and_filter(device, simulator):
+    can = can_session(device)
+    can.start(capacity=16)
+    can.write(0x123, b"\x01\x02")
+    can.write(0x1abcdef, b"12345678", extended=True)
+    frames = can.read_frames(max_count=2, timeout=1)
+    assert list(frames["id"]) == [0x123, 0x1abcdef]
+    assert list(frames["dlc"]) == [2, 8]
+    can.set_id_filter([5])
+    can.write(4)
+    can.write(5, b"a")
+    simulator.can_receive(5, status=3)
+    frames = list(can.frames(timeout=0.1))
+    assert [frame.id for frame in frames] == [5]
+    statistics = can.statistics()
+    assert statistics["frames_filtered"] == 1
+    assert statistics["crc_errors"] == 1
+    with pytest.raises(ValueError):
+        can.write(1, b"123456789")
+    can.stop()
+
+def test_can_ring_overflow_keeps_the_newest_frames(device, simulator):
+    can = can_session(device)
+    can.start(capacity=4)
+    for id in range(10):
+        simulator.can_receive(id, bytes([id]))
+    deadline = time.perf_counter() + 1
+    while (can.statistics()["frames_received"] < 10 and time.perf_counter() < deadline):
+        time.sleep(0.001)
+    frames = can.read_frames()
+    assert list(frames["id"]) == [6, 7, 8, 9]
+    assert can.statistics()["overflows"] == 6
+    can.stop()
+
+def test_can_stop_with_a_receiver_reporting_errors(device, simulator):
+    receive = simulator.FDwfDigitalCanRx
+    def stuck(hdwf, pid, pextended, premote, pdlc, data, size, pstatus):
+        receive(hdwf, pid, pextended, premote, pdlc, data, size, pstatus)
+        pstatus._obj.value = 3 # CRC error on every call
+        return 1
+    simulator.FDwfDigitalCanRx = stuck
+    can = can_session(device)
+    can.start(capacity=16)
+    time.sleep(0.01)
+    start = time.perf_counter()
+    can.stop()
+    assert time.perf_counter() - start < 1
+    assert can.statistics()["crc_errors"] > 0